@@ -1,6 +1,6 @@
 """Response formatter agent for generating user-readable responses from SQL query results."""
 
-from typing import List, Dict
+from typing import List, Dict, Optional
 from litellm import completion
 from api.config import Config
 
@@ -46,21 +46,27 @@ class ResponseFormatterAgent:
     def __init__(self):
         """Initialize the response formatter agent."""
 
-    def format_response(self, user_query: str, sql_query: str,
-                       query_results: List[Dict], db_description: str = "") -> str:
+    def format_response(self, user_query: str, sql_query: str,  # pylint: disable=too-many-arguments,too-many-positional-arguments
+                       query_results: List[Dict], db_description: str = "",
+                       total_rows: Optional[int] = None) -> str:
         """
         Generate a user-readable response based on the SQL query results.
 
         Args:
             user_query: The original user question
             sql_query: The SQL query that was executed
-            query_results: The results from the SQL query execution
+            query_results: The results from the SQL query execution (possibly
+                only a leading preview of them)
             db_description: Description of the database context
+            total_rows: Number of rows the query returned, when query_results
+                is only a preview
 
         Returns:
             A formatted, user-readable response string
         """
-        prompt = self._build_response_prompt(user_query, sql_query, query_results, db_description)
+        prompt = self._build_response_prompt(
+            user_query, sql_query, query_results, db_description, total_rows
+        )
 
         messages = [{"role": "user", "content": prompt}]
 
@@ -74,12 +80,13 @@ class ResponseFormatterAgent:
         response = completion_result.choices[0].message.content
         return response.strip()
 
-    def _build_response_prompt(self, user_query: str, sql_query: str,
-                              query_results: List[Dict], db_description: str) -> str:
+    def _build_response_prompt(self, user_query: str, sql_query: str,  # pylint: disable=too-many-arguments,too-many-positional-arguments
+                              query_results: List[Dict], db_description: str,
+                              total_rows: Optional[int] = None) -> str:
         """Build the prompt for generating user-readable responses."""
 
         # Format the query results for better readability
-        formatted_results = self._format_query_results(query_results)
+        formatted_results = self._format_query_results(query_results, total_rows)
 
         # Determine the type of SQL operation
         sql_type = sql_query.strip().split()[0].upper() if sql_query else "UNKNOWN"
@@ -94,7 +101,8 @@ class ResponseFormatterAgent:
 
         return prompt
 
-    def _format_query_results(self, query_results: List[Dict]) -> str:
+    def _format_query_results(self, query_results: List[Dict],
+                              total_rows: Optional[int] = None) -> str:
         """Format query results for inclusion in the prompt."""
         if not query_results:
             return "No results found."
@@ -129,7 +137,8 @@ class ResponseFormatterAgent:
 
         result_text = "\n".join(formatted)
 
-        if len(query_results) > max_results_to_show:
-            result_text += f"\n... and {len(query_results) - max_results_to_show} more results"
+        total = max(total_rows or 0, len(query_results))
+        if total > len(results_to_show):
+            result_text += f"\n... and {total - len(results_to_show)} more results"
 
         return result_text
@@ -2,6 +2,7 @@
 
 import logging
 import os
+from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
 from fastapi import FastAPI, Request, HTTPException
@@ -16,9 +17,16 @@ from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 
 from api.auth.oauth_handlers import setup_oauth_handlers
 from api.auth.user_management import SECRET_KEY
+from api.core.export import shutdown_export_jobs, start_export_cleanup
+from api.core.ingestion import shutdown_ingestion_jobs, unfinished_job_graphs
+from api.loaders.connection_pool import pool_registry
+from api.loaders.graph_loader import cleanup_internal_graphs
+from api.memory.persistence import memory_writes
+from api.memory.sweeper import memory_sweeper
 from api.routes.auth import auth_router, init_auth
 from api.routes.graphs import graphs_router
 from api.routes.database import database_router
+from api.routes.monitoring import monitoring_router
 from api.routes.tokens import tokens_router
 
 # Load environment variables from .env file
@@ -46,6 +54,33 @@ class SecurityMiddleware(BaseHTTPMiddleware):  # pylint: disable=too-few-public-
         return response
 
 
+def _build_lifespan(mcp_app):
+    """Wrap the MCP lifespan (if any) with the app's own shutdown hooks."""
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Staging/retired graphs of reloads cut short by a restart
+        try:
+            await cleanup_internal_graphs(keep_staging=await unfinished_job_graphs())
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logging.warning("Cleanup of leftover staging graphs failed: %s", e)
+        # Export files that expired while the app was down or idle
+        start_export_cleanup()
+        if mcp_app is not None:
+            async with mcp_app.lifespan(app):
+                yield
+        else:
+            yield
+        # Mark in-flight ingestion jobs interrupted so they can be resumed
+        await shutdown_ingestion_jobs(timeout=10)
+        await shutdown_export_jobs(timeout=10)
+        await memory_writes.flush(timeout=30)
+        await memory_sweeper.shutdown(timeout=10)
+        pool_registry.close_all()
+
+    return lifespan
+
+
 def create_app():
     """Create and configure the FastAPI application."""
 
@@ -60,6 +95,7 @@ def create_app():
     app.include_router(graphs_router, prefix="/graphs")
     app.include_router(database_router)
     app.include_router(tokens_router, prefix="/tokens")
+    app.include_router(monitoring_router, prefix="/monitoring")
 
 
 
@@ -117,7 +153,7 @@ def create_app():
             },
         ],
         routes=routes,
-        lifespan=mcp_app.lifespan if mcp_app else None,
+        lifespan=_build_lifespan(mcp_app),
     )
 
     # Add security schemes to OpenAPI after app creation
@@ -40,7 +40,8 @@ async def _get_user_info(api_token: str) -> Optional[Dict[str, Any]]:
     """
     query = """
         MATCH (i:Identity)-[:HAS_TOKEN]->(t:Token {id: $api_token})
-        RETURN i.email, i.name, i.picture, (t IS NOT NULL AND timestamp() <= t.expires_at) AS token_valid
+        RETURN i.email, i.name, i.picture, (t IS NOT NULL AND timestamp() <= t.expires_at) AS token_valid,
+               t.memory_mode
     """
 
     try:
@@ -63,6 +64,7 @@ async def _get_user_info(api_token: str) -> Optional[Dict[str, Any]]:
                     "email": single_result[0],
                     "name": single_result[1],
                     "picture": single_result[2],
+                    "memory_mode": single_result[4],
                 }
             # Delete invalid/expired token from DB for cleanup
             await delete_user_token(api_token)
@@ -270,6 +272,8 @@ def token_required(func):
             email = user_info.get("email")
             request.state.user_id = base64.b64encode(email.encode()).decode()
             request.state.user_email = email
+            # API tokens can restrict the memory mode of their requests
+            request.state.memory_mode = user_info.get("memory_mode")
 
             if not request.state.user_id:
                 raise HTTPException(
@@ -6,6 +6,7 @@ This module contains the configuration for the text2sql module.
 import os
 import logging
 import dataclasses
+import tempfile
 from typing import Union
 from litellm import embedding
 
@@ -29,6 +30,7 @@ class EmbeddingsModel:
     def __init__(self, model_name: str, config: dict = None):
         self.model_name = model_name
         self.config = config
+        self._vector_size = None
 
     def embed(self, text: Union[str, list]) -> list:
         """
@@ -47,19 +49,20 @@ class EmbeddingsModel:
 
     def get_vector_size(self) -> int:
         """
-        Get the size of the vector
+        Get the size of the vector (probed with one embedding call, then cached)
 
         Returns:
             int: The size of the vector
 
         """
-        response = embedding(input=["Hello World"], model=self.model_name)
-        size = len(response.data[0]["embedding"])
-        return size
+        if self._vector_size is None:
+            response = embedding(input=["Hello World"], model=self.model_name)
+            self._vector_size = len(response.data[0]["embedding"])
+        return self._vector_size
 
 
 @dataclasses.dataclass
-class Config:
+class Config:  # pylint: disable=too-many-instance-attributes
     """
     Configuration class for the text2sql module.
     """
@@ -76,6 +79,170 @@ class Config:
     DB_UNIQUENESS_THRESHOLD: float = 0.5  # pylint: disable=invalid-name
     SHORT_MEMORY_LENGTH = 5  # Maximum number of questions to keep in short-term memory
 
+    # Worker threads dedicated to blocking schema extraction (catalog/profiling queries)
+    SCHEMA_LOADER_WORKERS: int = int(  # pylint: disable=invalid-name
+        os.getenv("SCHEMA_LOADER_WORKERS", "4")
+    )
+    # How long a replaced schema graph is kept around for in-flight readers after a reload
+    GRAPH_RETIRE_GRACE_SECONDS: int = int(  # pylint: disable=invalid-name
+        os.getenv("GRAPH_RETIRE_GRACE_SECONDS", "60")
+    )
+    # Maximum number of schema loads running at once in this process
+    INGESTION_MAX_WORKERS: int = int(  # pylint: disable=invalid-name
+        os.getenv("INGESTION_MAX_WORKERS", "2")
+    )
+    # How long background ingestion job state and checkpoints are retained
+    INGESTION_JOB_TTL_SECONDS: int = int(  # pylint: disable=invalid-name
+        os.getenv("INGESTION_JOB_TTL_SECONDS", str(7 * 24 * 3600))
+    )
+    # A job whose process stopped renewing its owner lock for this long is treated as
+    # abandoned and resumable (the lock is renewed every third of it)
+    INGESTION_STALE_SECONDS: int = int(  # pylint: disable=invalid-name
+        os.getenv("INGESTION_STALE_SECONDS", "300")
+    )
+    # Connection pools to customer databases (one pool per connection URL).
+    # DB_POOL_MAX_SIZE is also the cap on concurrent queries per target.
+    DB_POOL_MIN_SIZE: int = int(  # pylint: disable=invalid-name
+        os.getenv("DB_POOL_MIN_SIZE", "0")
+    )
+    DB_POOL_MAX_SIZE: int = int(  # pylint: disable=invalid-name
+        os.getenv("DB_POOL_MAX_SIZE", "5")
+    )
+    DB_POOL_IDLE_TIMEOUT: float = float(  # pylint: disable=invalid-name
+        os.getenv("DB_POOL_IDLE_TIMEOUT", "300")
+    )
+    DB_POOL_HEALTHCHECK_INTERVAL: float = float(  # pylint: disable=invalid-name
+        os.getenv("DB_POOL_HEALTHCHECK_INTERVAL", "30")
+    )
+    DB_POOL_CHECKOUT_TIMEOUT: float = float(  # pylint: disable=invalid-name
+        os.getenv("DB_POOL_CHECKOUT_TIMEOUT", "30")
+    )
+    # Read replicas are health-checked at most every DB_REPLICA_HEALTHCHECK_INTERVAL
+    # seconds; a check taking longer than DB_REPLICA_HEALTHCHECK_TIMEOUT fails.
+    DB_REPLICA_HEALTHCHECK_INTERVAL: float = float(  # pylint: disable=invalid-name
+        os.getenv("DB_REPLICA_HEALTHCHECK_INTERVAL", "30")
+    )
+    DB_REPLICA_HEALTHCHECK_TIMEOUT: float = float(  # pylint: disable=invalid-name
+        os.getenv("DB_REPLICA_HEALTHCHECK_TIMEOUT", "5")
+    )
+    # User queries run on SQL_EXECUTOR_WORKERS dedicated threads, with at most
+    # SQL_MAX_CONCURRENT_PER_TARGET of them against any one database; queries
+    # beyond that wait (up to DB_POOL_CHECKOUT_TIMEOUT) without holding a thread.
+    SQL_EXECUTOR_WORKERS: int = int(  # pylint: disable=invalid-name
+        os.getenv("SQL_EXECUTOR_WORKERS", "16")
+    )
+    SQL_MAX_CONCURRENT_PER_TARGET: int = int(  # pylint: disable=invalid-name
+        os.getenv("SQL_MAX_CONCURRENT_PER_TARGET", os.getenv("DB_POOL_MAX_SIZE", "5"))
+    )
+    # Query results are streamed to the client in chunks of SQL_RESULT_CHUNK_ROWS,
+    # stopping (and marking the result truncated) after SQL_RESULT_MAX_ROWS.
+    # Only the first SQL_RESULT_PREVIEW_ROWS rows are kept for the response agent.
+    SQL_RESULT_CHUNK_ROWS: int = int(  # pylint: disable=invalid-name
+        os.getenv("SQL_RESULT_CHUNK_ROWS", "500")
+    )
+    SQL_RESULT_MAX_ROWS: int = int(  # pylint: disable=invalid-name
+        os.getenv("SQL_RESULT_MAX_ROWS", "10000")
+    )
+    SQL_RESULT_PREVIEW_ROWS: int = int(  # pylint: disable=invalid-name
+        os.getenv("SQL_RESULT_PREVIEW_ROWS", "50")
+    )
+    # Guardrails for generated read queries (overridable per graph): the LIMIT
+    # injected into / clamped on non-aggregating SELECTs, and the statement timeout.
+    # 0 disables either.
+    SQL_ROW_LIMIT: int = int(  # pylint: disable=invalid-name
+        os.getenv("SQL_ROW_LIMIT", "10000")
+    )
+    SQL_STATEMENT_TIMEOUT_MS: int = int(  # pylint: disable=invalid-name
+        os.getenv("SQL_STATEMENT_TIMEOUT_MS", "30000")
+    )
+    # Optional EXPLAIN-based cost gate for generated read queries (overridable per
+    # graph): "off", "reject" or "confirm" queries whose estimated rows or cost
+    # exceed the thresholds below (0 = no threshold).
+    SQL_COST_GATE: str = os.getenv("SQL_COST_GATE", "off")  # pylint: disable=invalid-name
+    SQL_MAX_ESTIMATED_ROWS: int = int(  # pylint: disable=invalid-name
+        os.getenv("SQL_MAX_ESTIMATED_ROWS", "0")
+    )
+    SQL_MAX_ESTIMATED_COST: float = float(  # pylint: disable=invalid-name
+        os.getenv("SQL_MAX_ESTIMATED_COST", "0")
+    )
+    # Results of read queries are cached per (database, SQL) for SQL_RESULT_CACHE_TTL
+    # seconds (0 disables the cache), up to SQL_RESULT_CACHE_MAX_BYTES in total.
+    # Results larger than SQL_RESULT_CACHE_MAX_ENTRY_BYTES are not cached.
+    SQL_RESULT_CACHE_TTL: float = float(  # pylint: disable=invalid-name
+        os.getenv("SQL_RESULT_CACHE_TTL", "60")
+    )
+    SQL_RESULT_CACHE_MAX_BYTES: int = int(  # pylint: disable=invalid-name
+        os.getenv("SQL_RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))
+    )
+    SQL_RESULT_CACHE_MAX_ENTRY_BYTES: int = int(  # pylint: disable=invalid-name
+        os.getenv("SQL_RESULT_CACHE_MAX_ENTRY_BYTES", str(8 * 1024 * 1024))
+    )
+    # Background exports of full query results (CSV, or Parquet with pyarrow) are
+    # written to EXPORT_DIR and deleted, with their job state, after EXPORT_TTL_SECONDS.
+    EXPORT_DIR: str = os.getenv(  # pylint: disable=invalid-name
+        "EXPORT_DIR", os.path.join(tempfile.gettempdir(), "queryweaver-exports")
+    )
+    EXPORT_TTL_SECONDS: int = int(  # pylint: disable=invalid-name
+        os.getenv("EXPORT_TTL_SECONDS", "3600")
+    )
+    # How often expired export files are looked for while the app runs (and at startup)
+    EXPORT_CLEANUP_INTERVAL_SECONDS: int = int(  # pylint: disable=invalid-name
+        os.getenv("EXPORT_CLEANUP_INTERVAL_SECONDS", "300")
+    )
+    EXPORT_MAX_ROWS: int = int(  # pylint: disable=invalid-name
+        os.getenv("EXPORT_MAX_ROWS", "10000000")
+    )
+    EXPORT_STATEMENT_TIMEOUT_MS: int = int(  # pylint: disable=invalid-name
+        os.getenv("EXPORT_STATEMENT_TIMEOUT_MS", "600000")
+    )
+    # Initialized memory tools are kept per (user, graph) and dropped after
+    # MEMORY_TOOL_IDLE_SECONDS unused, or least recently used beyond MEMORY_TOOL_MAX_INSTANCES
+    MEMORY_TOOL_IDLE_SECONDS: int = int(  # pylint: disable=invalid-name
+        os.getenv("MEMORY_TOOL_IDLE_SECONDS", "1800")
+    )
+    MEMORY_TOOL_MAX_INSTANCES: int = int(  # pylint: disable=invalid-name
+        os.getenv("MEMORY_TOOL_MAX_INSTANCES", "256")
+    )
+    # A user's memory graph is trimmed to its newest MEMORY_MAX_NODES nodes, checked in
+    # the background after every MEMORY_CLEANUP_CHECK_EVERY saved questions and
+    # deleted MEMORY_CLEANUP_BATCH nodes per query
+    MEMORY_MAX_NODES: int = int(  # pylint: disable=invalid-name
+        os.getenv("MEMORY_MAX_NODES", "10000")
+    )
+    MEMORY_CLEANUP_CHECK_EVERY: int = int(  # pylint: disable=invalid-name
+        os.getenv("MEMORY_CLEANUP_CHECK_EVERY", "100")
+    )
+    MEMORY_CLEANUP_BATCH: int = int(  # pylint: disable=invalid-name
+        os.getenv("MEMORY_CLEANUP_BATCH", "500")
+    )
+    # Default memory mode of a graph (overridable per graph and per API token): "off",
+    # "lightweight" (only past questions and their SQL) or "full" (Graphiti memory)
+    MEMORY_MODE: str = os.getenv("MEMORY_MODE", "full")  # pylint: disable=invalid-name
+    # Conversation memory is written in the background by MEMORY_WRITE_WORKERS workers;
+    # turns beyond MEMORY_WRITE_QUEUE_SIZE waiting ones are dropped
+    MEMORY_WRITE_WORKERS: int = int(  # pylint: disable=invalid-name
+        os.getenv("MEMORY_WRITE_WORKERS", "2")
+    )
+    MEMORY_WRITE_QUEUE_SIZE: int = int(  # pylint: disable=invalid-name
+        os.getenv("MEMORY_WRITE_QUEUE_SIZE", "1000")
+    )
+    # Memory searched before SQL generation gets MEMORY_SEARCH_BUDGET_SECONDS (0 = wait
+    # for every source); below MEMORY_SEARCH_RERANK_MIN_SECONDS facts aren't reranked
+    MEMORY_SEARCH_BUDGET_SECONDS: float = float(  # pylint: disable=invalid-name
+        os.getenv("MEMORY_SEARCH_BUDGET_SECONDS", "1.5")
+    )
+    MEMORY_SEARCH_RERANK_MIN_SECONDS: float = float(  # pylint: disable=invalid-name
+        os.getenv("MEMORY_SEARCH_RERANK_MIN_SECONDS", "1.0")
+    )
+    # Read SQL of a stored successful question within SQL_TEMPLATE_MAX_DISTANCE (embedding
+    # distance) is reused, with the new question's values, when the question only
+    # differs in those values; the analysis agent is then skipped (0 disables)
+    SQL_TEMPLATE_MAX_DISTANCE: float = float(  # pylint: disable=invalid-name
+        os.getenv("SQL_TEMPLATE_MAX_DISTANCE", "0.35")
+    )
+    # Bearer token for the /monitoring endpoints; they are disabled when unset
+    MONITORING_TOKEN: str = os.getenv("MONITORING_TOKEN", "")  # pylint: disable=invalid-name
+
     EMBEDDING_MODEL = EmbeddingsModel(model_name=EMBEDDING_MODEL_NAME)
 
     FIND_SYSTEM_PROMPT = """
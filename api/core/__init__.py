@@ -6,7 +6,7 @@ This module provides the core functionality for QueryWeaver including
 error handling, database schema loading, and text-to-SQL processing.
 """
 
-from .errors import InternalError, GraphNotFoundError, InvalidArgumentError
+from .errors import InternalError, GraphNotFoundError, InvalidArgumentError, JobNotFoundError
 from .schema_loader import load_database, list_databases
 from .text2sql import MESSAGE_DELIMITER
 
@@ -14,6 +14,7 @@ __all__ = [
     "InternalError",
     "GraphNotFoundError",
     "InvalidArgumentError",
+    "JobNotFoundError",
     "load_database",
     "list_databases",
     "MESSAGE_DELIMITER",
@@ -11,3 +11,7 @@ class GraphNotFoundError(Exception):
 # Wrong argument Exception
 class InvalidArgumentError(Exception):
     """Custom exception for invalid argument errors."""
+
+# Ingestion job not found Exception
+class JobNotFoundError(Exception):
+    """Custom exception for unknown or foreign ingestion jobs."""
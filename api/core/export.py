@@ -0,0 +1,382 @@
+"""Background export of full query results to CSV or Parquet files.
+
+An export runs a read query generated by ``query_database`` outside the HTTP
+request, streaming its rows chunk by chunk into a file under EXPORT_DIR, so
+memory stays bounded by SQL_RESULT_CHUNK_ROWS however large the result is.
+Job state lives in FalkorDB's Redis keyspace under ``export:job:<id>``. Files
+and job state are deleted after EXPORT_TTL_SECONDS; expired files are looked
+for at startup and every EXPORT_CLEANUP_INTERVAL_SECONDS.
+
+Parquet output needs the optional pyarrow package.
+"""
+
+import asyncio
+import csv
+import dataclasses
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from api.config import Config
+from api.core.errors import InvalidArgumentError, JobNotFoundError
+from api.core.graph_settings import get_graph_settings, get_replica_urls
+from api.core.text2sql import _graph_name, get_database_type_and_loader
+from api.extensions import db
+from api.graph import get_db_description
+from api.loaders.execution_policy import ExecutionPolicy, is_read_statement
+from api.loaders.replica_router import replica_router
+
+JOB_KEY_PREFIX = "export:job:"
+
+EXPORT_FORMATS = {
+    "csv": ("csv", "text/csv"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+# Exports running in this process, keyed by job id
+_running_exports: Dict[str, asyncio.Task] = {}
+
+# The task deleting expired export files while the app runs, once started
+_cleanup_tasks: List[asyncio.Task] = []
+
+
+def _job_key(job_id: str) -> str:
+    return f"{JOB_KEY_PREFIX}{job_id}"
+
+
+def _export_path(job_id: str, fmt: str) -> str:
+    return os.path.join(Config.EXPORT_DIR, f"{job_id}.{EXPORT_FORMATS[fmt][0]}")
+
+
+async def _update_job(job_id: str, **fields: Any) -> None:
+    """Persist job fields and refresh the TTL."""
+    conn = db.connection
+    fields["updated_at"] = int(time.time())
+    await conn.hset(_job_key(job_id), mapping={k: str(v) for k, v in fields.items()})
+    await conn.expire(_job_key(job_id), Config.EXPORT_TTL_SECONDS)
+
+
+async def _read_job(job_id: str, user_id: str, graph_id: Optional[str] = None) -> Dict[str, str]:
+    job = await db.connection.hgetall(_job_key(job_id))
+    if not job or job.get("user_id") != user_id:
+        raise JobNotFoundError("Export job not found")
+    if graph_id is not None and job.get("graph_id") != _graph_name(user_id, graph_id):
+        raise JobNotFoundError("Export job not found")
+    return job
+
+
+def _public_view(job_id: str, job: Dict[str, str]) -> Dict[str, Any]:
+    """Job fields safe to return to the client (never the file path or query URL)."""
+    return {
+        "job_id": job_id,
+        "status": job.get("status", "unknown"),
+        "format": job.get("format", ""),
+        "message": job.get("message", ""),
+        "rows": int(job.get("rows", 0)),
+        "bytes": int(job.get("bytes", 0)),
+        "truncated": job.get("truncated") == "True",
+        "error": job.get("error", ""),
+        "created_at": int(job.get("created_at", 0)),
+        "expires_at": int(job.get("created_at", 0)) + Config.EXPORT_TTL_SECONDS,
+    }
+
+
+class _CsvWriter:
+    """Appends row chunks to a CSV file, taking the header from the first chunk."""
+
+    def __init__(self, path: str):
+        # Closed in close(); the writer outlives any single with-block
+        self._file = open(  # pylint: disable=consider-using-with
+            path, "w", newline="", encoding="utf-8"
+        )
+        self._writer = csv.writer(self._file)
+        self._columns: Optional[List[str]] = None
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        """Append rows to the file."""
+        if self._columns is None:
+            self._columns = list(rows[0].keys())
+            self._writer.writerow(self._columns)
+        self._writer.writerows([row.get(column) for column in self._columns] for row in rows)
+
+    def close(self) -> None:
+        """Flush and close the file."""
+        self._file.close()
+
+
+# Rows a Parquet export holds back while looking for a non-NULL value in
+# every column, so columns that start out NULL still get their real type
+_PARQUET_TYPE_PROBE_ROWS = 10_000
+
+
+class _ParquetWriter:
+    """
+    Appends row chunks to a Parquet file, one row group per chunk.
+
+    A Parquet file has a single schema, but rows arrive as plain values. The
+    column types are taken from the values of the first chunks (held back
+    until every column has a non-NULL value, or _PARQUET_TYPE_PROBE_ROWS
+    rows); columns still without one become strings. Later chunks are
+    converted to that schema, e.g. JSON values of a string column are dumped.
+    """
+
+    def __init__(self, path: str):
+        # pylint: disable=import-outside-toplevel
+        import pyarrow
+        import pyarrow.parquet
+
+        self._pa, self._pq = pyarrow, pyarrow.parquet
+        self._path = path
+        self._writer = None
+        self._types: Dict[str, Any] = {}  # column -> arrow type, None while all NULL
+        self._pending: List[List[Dict[str, Any]]] = []
+        self._pending_rows = 0
+
+    def _value_type(self, values: List[Any]):
+        """Return the arrow type fitting all non-NULL values (None if there are none)."""
+        values = [value for value in values if value is not None]
+        if not values:
+            return None
+        if all(isinstance(value, bool) for value in values):
+            return self._pa.bool_()
+        if any(isinstance(value, bool) for value in values):
+            return self._pa.string()
+        if all(isinstance(value, int) for value in values):
+            return self._pa.int64()
+        if all(isinstance(value, (int, float)) for value in values):
+            return self._pa.float64()
+        return self._pa.string()
+
+    def _merge_type(self, known, found):
+        if known is None or known == found:
+            return found
+        if found is None:
+            return known
+        numbers = {self._pa.int64(), self._pa.float64()}
+        return self._pa.float64() if {known, found} <= numbers else self._pa.string()
+
+    def _to_table(self, rows: List[Dict[str, Any]]):
+        columns = {}
+        for field in self._writer.schema:
+            values = [row.get(field.name) for row in rows]
+            if self._pa.types.is_string(field.type):
+                values = [
+                    value if value is None or isinstance(value, str)
+                    else json.dumps(value, default=str) if isinstance(value, (dict, list))
+                    else str(value)
+                    for value in values
+                ]
+            columns[field.name] = values
+        return self._pa.Table.from_pydict(columns, schema=self._writer.schema)
+
+    def _open(self) -> None:
+        schema = self._pa.schema(
+            [(name, kind or self._pa.string()) for name, kind in self._types.items()]
+        )
+        self._writer = self._pq.ParquetWriter(self._path, schema)
+        for rows in self._pending:
+            self._writer.write_table(self._to_table(rows))
+        self._pending, self._pending_rows = [], 0
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        """Append rows to the file."""
+        if self._writer is not None:
+            self._writer.write_table(self._to_table(rows))
+            return
+        for column in rows[0]:
+            self._types[column] = self._merge_type(
+                self._types.get(column), self._value_type([row.get(column) for row in rows])
+            )
+        self._pending.append(rows)
+        self._pending_rows += len(rows)
+        if None not in self._types.values() or self._pending_rows >= _PARQUET_TYPE_PROBE_ROWS:
+            self._open()
+
+    def close(self) -> None:
+        """Write the footer and close the file."""
+        if self._writer is None and self._pending:
+            self._open()
+        if self._writer is None:
+            # Empty result: still produce a valid (empty) Parquet file
+            self._pq.write_table(self._pa.table({}), self._path)
+        else:
+            self._writer.close()
+
+
+def _open_writer(fmt: str, path: str):
+    return _ParquetWriter(path) if fmt == "parquet" else _CsvWriter(path)
+
+
+async def _run_export(  # pylint: disable=too-many-arguments
+    job_id: str, fmt: str, loader_class, db_url: str, sql_query: str, *, policy: ExecutionPolicy
+) -> None:
+    """Stream the query's rows into the export file."""
+    path = _export_path(job_id, fmt)
+    rows_written, truncated, writer = 0, False, None
+    try:
+        await _update_job(job_id, status="running", message="Running query...")
+        writer = await asyncio.to_thread(_open_writer, fmt, path)
+        async for rows, truncated in loader_class.stream_sql_query(
+            sql_query, db_url, max_rows=Config.EXPORT_MAX_ROWS, policy=policy
+        ):
+            await asyncio.to_thread(writer.write, rows)
+            rows_written += len(rows)
+            await _update_job(job_id, rows=rows_written, message="Writing rows...")
+        await asyncio.to_thread(writer.close)
+        writer = None
+
+        await _update_job(
+            job_id,
+            status="completed",
+            message=f"Exported {rows_written} rows",
+            rows=rows_written,
+            truncated=truncated,
+            bytes=os.path.getsize(path),
+        )
+    except asyncio.CancelledError:
+        await asyncio.shield(_update_job(job_id, status="interrupted",
+                                         message="Export was interrupted"))
+        raise
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logging.exception("Export job %s failed: %s", job_id, e)
+        await _update_job(job_id, status="failed", message="Export failed",
+                          error=type(e).__name__)
+    finally:
+        _running_exports.pop(job_id, None)
+        if writer is not None:
+            # Failed or interrupted: drop the partial file
+            try:
+                writer.close()
+            except Exception:  # pylint: disable=broad-exception-caught
+                pass
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+def cleanup_expired_exports() -> int:
+    """Delete export files older than EXPORT_TTL_SECONDS; returns how many."""
+    if not os.path.isdir(Config.EXPORT_DIR):
+        return 0
+    cutoff = time.time() - Config.EXPORT_TTL_SECONDS
+    removed = 0
+    for entry in os.scandir(Config.EXPORT_DIR):
+        job_id = entry.name.split(".", 1)[0]
+        if job_id in _running_exports or not entry.is_file():
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+async def _cleanup_periodically() -> None:
+    while True:
+        try:
+            removed = await asyncio.to_thread(cleanup_expired_exports)
+            if removed:
+                logging.info("Deleted %d expired export files", removed)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logging.warning("Cleanup of expired exports failed: %s", e)
+        await asyncio.sleep(Config.EXPORT_CLEANUP_INTERVAL_SECONDS)
+
+
+def start_export_cleanup() -> None:
+    """Delete expired export files now, then every EXPORT_CLEANUP_INTERVAL_SECONDS."""
+    if not any(not task.done() for task in _cleanup_tasks):
+        _cleanup_tasks[:] = [asyncio.create_task(_cleanup_periodically())]
+
+
+async def start_export_job(
+    user_id: str, graph_id: str, sql_query: str, fmt: str = "csv"
+) -> Dict[str, Any]:
+    """
+    Start exporting the full result of a read query on a graph's database.
+
+    Returns:
+        The public view of the job
+    """
+    fmt = fmt.lower()
+    if fmt not in EXPORT_FORMATS:
+        raise InvalidArgumentError(
+            f"Unsupported export format, use one of {', '.join(sorted(EXPORT_FORMATS))}"
+        )
+    if fmt == "parquet":
+        try:
+            import pyarrow  # pylint: disable=import-outside-toplevel,unused-import
+        except ImportError as e:
+            raise InvalidArgumentError("Parquet export requires the pyarrow package") from e
+    if not sql_query or not is_read_statement(sql_query):
+        raise InvalidArgumentError("Only read queries can be exported")
+
+    graph_name = _graph_name(user_id, graph_id)
+    _, db_url = await get_db_description(graph_name)
+    _, loader_class = get_database_type_and_loader(db_url)
+    if not loader_class:
+        raise InvalidArgumentError("Unable to determine database type")
+
+    # The whole result is wanted, so no LIMIT, and a longer timeout than for chat
+    policy = dataclasses.replace(
+        ExecutionPolicy.from_settings(await get_graph_settings(graph_name)),
+        row_limit=0,
+        statement_timeout_ms=Config.EXPORT_STATEMENT_TIMEOUT_MS,
+    )
+    read_url = await replica_router.choose(
+        loader_class, db_url, await get_replica_urls(graph_name)
+    )
+
+    await asyncio.to_thread(os.makedirs, Config.EXPORT_DIR, exist_ok=True)
+    await asyncio.to_thread(cleanup_expired_exports)
+
+    job_id = uuid.uuid4().hex
+    await _update_job(
+        job_id,
+        user_id=user_id,
+        graph_id=graph_name,
+        format=fmt,
+        status="queued",
+        message="Job created",
+        rows=0,
+        created_at=int(time.time()),
+    )
+    _running_exports[job_id] = asyncio.create_task(
+        _run_export(job_id, fmt, loader_class, read_url, sql_query, policy=policy)
+    )
+    return _public_view(job_id, await _read_job(job_id, user_id))
+
+
+async def get_export_job(user_id: str, graph_id: str, job_id: str) -> Dict[str, Any]:
+    """Return the status and progress of an export of user_id's graph."""
+    return _public_view(job_id, await _read_job(job_id, user_id, graph_id))
+
+
+async def get_export_file(user_id: str, graph_id: str, job_id: str) -> Tuple[str, str, str]:
+    """
+    Return the file of a completed export of user_id's graph.
+
+    Returns:
+        Tuple of (path, download filename, media type)
+    """
+    job = await _read_job(job_id, user_id, graph_id)
+    fmt = job.get("format", "csv")
+    path = _export_path(job_id, fmt)
+    if job.get("status") != "completed" or not os.path.exists(path):
+        raise JobNotFoundError("Export file not available")
+    extension, media_type = EXPORT_FORMATS[fmt]
+    return path, f"export-{job_id}.{extension}", media_type
+
+
+async def shutdown_export_jobs(timeout: Optional[float] = None) -> None:
+    """Stop the periodic cleanup and cancel running exports; their partial files are removed."""
+    for task in _cleanup_tasks:
+        task.cancel()
+    tasks = list(_running_exports.values())
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.wait(tasks, timeout=timeout)
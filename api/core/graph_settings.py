@@ -0,0 +1,103 @@
+"""Per-graph settings stored on the graph's Database node.
+
+Settings are kept as a JSON string in ``d.settings``. Only explicitly set
+values are stored; anything missing falls back to the global Config default.
+Read-replica URLs are kept separately in ``d.replica_urls``, since they carry
+credentials. Schema reloads carry both over to the rebuilt graph.
+"""
+
+import json
+import logging
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+from api.core.errors import GraphNotFoundError, InvalidArgumentError
+from api.extensions import db
+
+
+class GraphSettings(BaseModel):
+    """Settings a user can override for one graph (None = use the default)."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    row_limit: Optional[int] = Field(
+        None, ge=0, description="LIMIT injected into read queries (0 disables)"
+    )
+    statement_timeout_ms: Optional[int] = Field(
+        None, ge=0, description="Statement timeout for read queries in ms (0 disables)"
+    )
+    read_only: Optional[bool] = Field(
+        None, description="Run read queries in READ ONLY transactions"
+    )
+    result_cache: Optional[bool] = Field(
+        None, description="Serve repeated read queries from the result cache"
+    )
+    cost_gate: Optional[Literal["off", "reject", "confirm"]] = Field(
+        None, description="Reject or ask to confirm read queries estimated over budget"
+    )
+    max_estimated_rows: Optional[int] = Field(
+        None, ge=0, description="EXPLAIN row estimate above which the cost gate applies"
+    )
+    max_estimated_cost: Optional[float] = Field(
+        None, ge=0, description="EXPLAIN cost estimate above which the cost gate applies"
+    )
+    memory_mode: Optional[Literal["off", "lightweight", "full"]] = Field(
+        None, description="Conversation memory used for questions on this graph"
+    )
+
+
+async def get_graph_settings(graph_id: str) -> Dict[str, Any]:
+    """Return the explicitly set settings of a graph (empty if none)."""
+    graph = db.select_graph(graph_id)
+    result = await graph.query("MATCH (d:Database) RETURN d.settings LIMIT 1")
+    if not result.result_set or not result.result_set[0][0]:
+        return {}
+    try:
+        return json.loads(result.result_set[0][0])
+    except ValueError:
+        logging.warning("Ignoring malformed settings on graph %s", graph_id)
+        return {}
+
+
+async def update_graph_settings(graph_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Merge updates into a graph's settings; a None value resets that setting.
+
+    Returns:
+        The resulting settings
+    """
+    current = await get_graph_settings(graph_id)
+    merged = {**current, **updates}
+    try:
+        settings = GraphSettings(**merged).model_dump(exclude_none=True)
+    except ValidationError as e:
+        raise InvalidArgumentError(str(e)) from e
+
+    graph = db.select_graph(graph_id)
+    result = await graph.query(
+        "MATCH (d:Database) SET d.settings = $settings RETURN count(d)",
+        {"settings": json.dumps(settings)},
+    )
+    if not result.result_set or not result.result_set[0][0]:
+        raise GraphNotFoundError("Graph not found")
+    return settings
+
+
+async def get_replica_urls(graph_id: str) -> List[str]:
+    """Return the read-replica URLs of a graph (empty if none)."""
+    graph = db.select_graph(graph_id)
+    result = await graph.query("MATCH (d:Database) RETURN d.replica_urls LIMIT 1")
+    if not result.result_set or not result.result_set[0][0]:
+        return []
+    return list(result.result_set[0][0])
+
+
+async def set_replica_urls(graph_id: str, urls: List[str]) -> None:
+    """Replace the read-replica URLs of a graph."""
+    graph = db.select_graph(graph_id)
+    result = await graph.query(
+        "MATCH (d:Database) SET d.replica_urls = $urls RETURN count(d)", {"urls": urls}
+    )
+    if not result.result_set or not result.result_set[0][0]:
+        raise GraphNotFoundError("Graph not found")
@@ -0,0 +1,324 @@
+"""Durable background schema ingestion jobs with resumable checkpoints.
+
+A job runs the same extract -> embed -> write pipeline as the streaming
+``/database`` endpoint, but outside the HTTP request. Its state lives in
+FalkorDB's Redis keyspace so it survives client disconnects and restarts:
+
+- ``ingest:job:<id>``          hash with status, phase and progress counters, and
+  the source URL until the job completes
+- ``ingest:job:<id>:catalog``  the extracted catalog (entities + relationships)
+- ``ingest:job:<id>:tables``   tables whose nodes, columns and embeddings are written
+- ``ingest:job:<id>:owner``    held by the process running the job, kept alive by
+  a heartbeat; a job without an owner is stale and can be resumed
+
+A retry reuses the catalog checkpoint and continues the job's staging graph,
+skipping tables that were already written.
+"""
+
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from api.config import Config
+from api.core.errors import InvalidArgumentError, JobNotFoundError
+from api.core.schema_loader import detect_loader, ingestion_slots
+from api.extensions import db
+from api.loaders.graph_loader import drop_staging_graph, load_to_graph, staging_graph_name
+
+JOB_KEY_PREFIX = "ingest:job:"
+SOURCE_KEY_PREFIX = "ingest:source:"
+
+# Statuses a job can be resumed from
+RESUMABLE_STATUSES = {"failed", "interrupted"}
+
+# Jobs running in this process, keyed by job id
+_running_jobs: Dict[str, asyncio.Task] = {}
+
+
+def _job_key(job_id: str) -> str:
+    return f"{JOB_KEY_PREFIX}{job_id}"
+
+
+def _source_key(user_id: str, url: str) -> str:
+    digest = hashlib.sha256(f"{user_id}\n{url}".encode()).hexdigest()
+    return f"{SOURCE_KEY_PREFIX}{digest}"
+
+
+async def _update_job(job_id: str, **fields: Any) -> None:
+    """Persist job fields and refresh the heartbeat and TTL."""
+    conn = db.connection
+    fields["updated_at"] = int(time.time())
+    await conn.hset(_job_key(job_id), mapping={k: str(v) for k, v in fields.items()})
+    await conn.expire(_job_key(job_id), Config.INGESTION_JOB_TTL_SECONDS)
+
+
+async def _read_job(job_id: str) -> Dict[str, str]:
+    job = await db.connection.hgetall(_job_key(job_id))
+    if not job:
+        raise JobNotFoundError("Ingestion job not found")
+    return job
+
+
+def _owner_key(job_id: str) -> str:
+    return f"{_job_key(job_id)}:owner"
+
+
+async def _is_stale(job_id: str) -> bool:
+    """A queued or running job is stale when no process owns it any more."""
+    if job_id in _running_jobs:
+        return False
+    return not await db.connection.exists(_owner_key(job_id))
+
+
+async def _heartbeat(job_id: str, owner: str) -> None:
+    """Keep the job's owner lock and updated_at fresh while the job runs."""
+    conn = db.connection
+    while True:
+        await asyncio.sleep(Config.INGESTION_STALE_SECONDS / 3)
+        if await conn.get(_owner_key(job_id)) != owner:
+            logging.warning("Ingestion job %s lost its owner lock", job_id)
+            return
+        await conn.expire(_owner_key(job_id), Config.INGESTION_STALE_SECONDS)
+        await _update_job(job_id)
+
+
+async def _release_owner(job_id: str, owner: str) -> None:
+    conn = db.connection
+    if await conn.get(_owner_key(job_id)) == owner:
+        await conn.delete(_owner_key(job_id))
+
+
+def _public_view(job_id: str, job: Dict[str, str]) -> Dict[str, Any]:
+    """Job fields safe to return to the client (never the connection URL)."""
+    return {
+        "job_id": job_id,
+        "status": job.get("status", "unknown"),
+        "phase": job.get("phase", ""),
+        "message": job.get("message", ""),
+        "graph_id": job.get("graph_id", ""),
+        "tables_total": int(job.get("tables_total", 0)),
+        "tables_done": int(job.get("tables_done", 0)),
+        "error": job.get("error", ""),
+        "created_at": int(job.get("created_at", 0)),
+        "updated_at": int(job.get("updated_at", 0)),
+    }
+
+
+async def _load_catalog(job_id: str, loader, url: str) -> Dict[str, Any]:
+    """Return the checkpointed catalog, extracting and persisting it if missing."""
+    conn = db.connection
+    catalog_key = f"{_job_key(job_id)}:catalog"
+
+    raw = await conn.get(catalog_key)
+    if raw:
+        return json.loads(raw)
+
+    await _update_job(job_id, phase="extracting", message="Extracting table and "
+                      "relationship information...")
+    db_name, entities, relationships = await loader.extract_schema(url)
+    catalog = {"db_name": db_name, "entities": entities, "relationships": relationships}
+    await conn.set(
+        catalog_key,
+        json.dumps(catalog, default=str),
+        ex=Config.INGESTION_JOB_TTL_SECONDS,
+    )
+    return catalog
+
+
+async def _checkpoint_table(job_id: str, tables_key: str, table_name: str) -> None:
+    """Record that a table's nodes, columns and embeddings are written."""
+    conn = db.connection
+    await conn.sadd(tables_key, table_name)
+    await conn.expire(tables_key, Config.INGESTION_JOB_TTL_SECONDS)
+    await conn.hincrby(_job_key(job_id), "tables_done", 1)
+    await _update_job(job_id, message=f"Loaded table {table_name}")
+
+
+async def _run_job(job_id: str, resume: bool = False) -> None:
+    """Run a job, or with resume continue it from its last checkpoint."""
+    conn = db.connection
+    tables_key = f"{_job_key(job_id)}:tables"
+    graph_id = None
+
+    # Only one process may run a job; the lock outlives it by at most
+    # INGESTION_STALE_SECONDS if that process dies
+    owner = uuid.uuid4().hex
+    if not await conn.set(_owner_key(job_id), owner, nx=True,
+                          ex=Config.INGESTION_STALE_SECONDS):
+        logging.info("Ingestion job %s is already running in another process", job_id)
+        _running_jobs.pop(job_id, None)
+        return
+    heartbeat = asyncio.create_task(_heartbeat(job_id, owner))
+
+    try:
+        await _update_job(job_id, status="queued", message="Waiting for an ingestion slot...")
+        async with ingestion_slots:
+            job = await _read_job(job_id)
+            url, user_id = job["url"], job["user_id"]
+            loader = detect_loader(url)[1]
+
+            await _update_job(job_id, status="running", error="")
+            catalog = await _load_catalog(job_id, loader, url)
+            graph_id = f"{user_id}_{catalog['db_name']}"
+
+            # Only a resume with checkpoints continues the staging graph; any
+            # other run starts it over, so no leftovers are published
+            completed = set(await conn.smembers(tables_key)) if resume else set()
+            if completed and not await conn.exists(staging_graph_name(graph_id)):
+                logging.warning("Staging graph of job %s is gone, starting over", job_id)
+                completed = set()
+            if not completed:
+                await conn.delete(tables_key)
+            await _update_job(
+                job_id,
+                phase="loading",
+                message="Loading data into graph...",
+                graph_id=catalog["db_name"],
+                tables_total=len(catalog["entities"]),
+                tables_done=len(completed),
+            )
+
+            await load_to_graph(
+                graph_id,
+                catalog["entities"],
+                catalog["relationships"],
+                db_name=catalog["db_name"],
+                db_url=url,
+                completed_tables=completed or None,
+                on_table_loaded=functools.partial(_checkpoint_table, job_id, tables_key),
+                # The checkpoints refer to it; dropped below if there are none
+                keep_staging_on_failure=True,
+            )
+
+        await _update_job(
+            job_id,
+            status="completed",
+            phase="done",
+            message=f"Schema loaded successfully. Found {len(catalog['entities'])} tables.",
+        )
+        # Checkpoints, and the URL with its credentials, are only needed to
+        # resume an unfinished job
+        await conn.delete(f"{_job_key(job_id)}:catalog", tables_key)
+        await conn.hdel(_job_key(job_id), "url")
+
+    except asyncio.CancelledError:
+        await asyncio.shield(_update_job(
+            job_id, status="interrupted", message="Ingestion was interrupted"
+        ))
+        await asyncio.shield(_drop_unresumable_staging(tables_key, graph_id))
+        raise
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logging.exception("Ingestion job %s failed: %s", job_id, e)
+        await _update_job(
+            job_id, status="failed", message="Failed to load database schema",
+            error=type(e).__name__,
+        )
+        await _drop_unresumable_staging(tables_key, graph_id)
+    finally:
+        heartbeat.cancel()
+        await asyncio.shield(_release_owner(job_id, owner))
+        _running_jobs.pop(job_id, None)
+
+
+async def _drop_unresumable_staging(tables_key: str, graph_id: Optional[str]) -> None:
+    """Drop a failed job's staging graph unless a resume can continue from it."""
+    if graph_id is not None and not await db.connection.scard(tables_key):
+        await drop_staging_graph(graph_id)
+
+
+def _spawn(job_id: str, resume: bool = False) -> None:
+    _running_jobs[job_id] = asyncio.create_task(_run_job(job_id, resume=resume))
+
+
+async def start_ingestion_job(url: str, user_id: str) -> Dict[str, Any]:
+    """
+    Start a background schema load for url, or pick up an unfinished job for
+    the same user and source.
+
+    Returns:
+        The public view of the job
+    """
+    url = url.strip()
+    if not url:
+        raise InvalidArgumentError("Invalid URL format")
+    detect_loader(url)  # Validate the URL scheme before creating a job
+
+    conn = db.connection
+    source_key = _source_key(user_id, url)
+    existing_id = await conn.get(source_key)
+    if existing_id:
+        job = await conn.hgetall(_job_key(existing_id))
+        status = job.get("status") if job else None
+        if status in ("queued", "running") and not await _is_stale(existing_id):
+            return _public_view(existing_id, job)
+        if status in RESUMABLE_STATUSES or status in ("queued", "running"):
+            return await resume_ingestion_job(existing_id, user_id)
+
+    job_id = uuid.uuid4().hex
+    now = int(time.time())
+    await _update_job(
+        job_id,
+        user_id=user_id,
+        url=url,
+        status="queued",
+        phase="pending",
+        message="Job created",
+        tables_total=0,
+        tables_done=0,
+        created_at=now,
+    )
+    await conn.set(source_key, job_id, ex=Config.INGESTION_JOB_TTL_SECONDS)
+
+    _spawn(job_id)
+    return _public_view(job_id, await _read_job(job_id))
+
+
+async def get_ingestion_job(job_id: str, user_id: str) -> Dict[str, Any]:
+    """Return the status and progress of a job owned by user_id."""
+    job = await _read_job(job_id)
+    if job.get("user_id") != user_id:
+        raise JobNotFoundError("Ingestion job not found")
+    return _public_view(job_id, job)
+
+
+async def resume_ingestion_job(job_id: str, user_id: str) -> Dict[str, Any]:
+    """Resume a failed, interrupted or abandoned job from its last checkpoint."""
+    job = await _read_job(job_id)
+    if job.get("user_id") != user_id:
+        raise JobNotFoundError("Ingestion job not found")
+
+    status = job.get("status")
+    if status == "completed":
+        raise InvalidArgumentError("Ingestion job already completed")
+    if status in ("queued", "running") and not await _is_stale(job_id):
+        return _public_view(job_id, job)
+
+    await _update_job(job_id, status="queued", message="Resuming from checkpoint")
+    _spawn(job_id, resume=True)
+    return _public_view(job_id, await _read_job(job_id))
+
+
+async def unfinished_job_graphs() -> set[str]:
+    """Return the graph ids whose staging graph an unfinished job may resume."""
+    graphs = set()
+    async for key in db.connection.scan_iter(match=f"{JOB_KEY_PREFIX}*"):
+        if key.count(":") != 2:
+            continue  # A job's checkpoint keys
+        job = await db.connection.hgetall(key)
+        if job.get("status") != "completed" and job.get("graph_id"):
+            graphs.add(f"{job['user_id']}_{job['graph_id']}")
+    return graphs
+
+
+async def shutdown_ingestion_jobs(timeout: Optional[float] = None) -> None:
+    """Cancel running jobs so they are marked interrupted and can be resumed."""
+    tasks = list(_running_jobs.values())
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.wait(tasks, timeout=timeout)
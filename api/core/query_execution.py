@@ -0,0 +1,213 @@
+"""Running generated SQL: cost checks and streaming results to the client."""
+
+import json
+import logging
+
+from api.config import Config
+from api.loaders.execution_policy import ExecutionPolicy, is_read_statement
+from api.loaders.result_cache import CachedResult, result_cache
+
+# Use the same delimiter as in the JavaScript
+MESSAGE_DELIMITER = "|||FALKORDB_MESSAGE_BOUNDARY|||"
+
+# Accept header value that selects the columnar query_result_chunk format
+COLUMNAR_MEDIA_TYPE = "application/vnd.queryweaver.columnar+json"
+
+
+def _policy_message(report: dict) -> str:
+    """Describe the guardrails applied to a query for the user."""
+    parts = []
+    if report["limit_action"] == "injected":
+        parts.append(f"added LIMIT {report['limit']}")
+    elif report["limit_action"] == "clamped":
+        parts.append(f"reduced LIMIT to {report['limit']}")
+    if report["read_only"]:
+        parts.append("read-only transaction")
+    if report["statement_timeout_ms"]:
+        parts.append(f"{report['statement_timeout_ms'] / 1000:g}s timeout")
+    return "Query guardrails: " + ", ".join(parts) if parts else ""
+
+
+async def check_query_cost(
+    loader_class, sql_query: str, db_url: str, policy: ExecutionPolicy
+) -> dict | None:
+    """
+    EXPLAIN sql_query (as it will run under policy) and check it against the budget.
+
+    Returns:
+        The estimate, with the reasons it is over budget in "violations", or
+        None if the policy doesn't gate costs, the statement isn't a read or
+        the database couldn't explain it
+    """
+    if not policy.checks_cost or not is_read_statement(sql_query):
+        return None
+    sql_query, _ = policy.prepare(sql_query)
+    try:
+        estimate = await loader_class.estimate_sql_query_cost(sql_query, db_url)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        # The query itself will most likely fail the same way and report it
+        logging.warning("EXPLAIN failed, skipping the cost check: %s", e)
+        return None
+
+    estimate["violations"] = policy.cost_violations(estimate)
+    logging.info(
+        "Query estimate: ~%d rows, cost %.1f%s", estimate["estimated_rows"],
+        estimate["estimated_cost"], " (over budget)" if estimate["violations"] else ""
+    )
+    return estimate
+
+
+def _value_type(value) -> str | None:
+    """Return the type tag of a serialized result value (None for NULL)."""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        return "integer"
+    if isinstance(value, float):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    return "json"
+
+
+def _chunk_payload(rows: list, chunk_index: int, result_format: str) -> dict:
+    """
+    Return the body of a query_result_chunk frame.
+
+    The default "rows" format sends a list of dicts in data. The "columnar"
+    format sends rows as lists in rows; the first chunk also carries the
+    columns header and a type tag per column (from its first non-NULL value).
+    """
+    if result_format != "columnar":
+        return {"data": rows}
+
+    payload = {"format": "columnar", "rows": [list(row.values()) for row in rows]}
+    if chunk_index == 0:
+        columns = list(rows[0].keys()) if rows else []
+        types = [None] * len(columns)
+        for row in payload["rows"]:
+            for i, value in enumerate(row):
+                if types[i] is None:
+                    types[i] = _value_type(value)
+            if all(types):
+                break
+        payload.update(columns=columns, types=types)
+    return payload
+
+
+async def _cached_chunks(cached: CachedResult):
+    """Replay a cached result as (rows, truncated) chunks."""
+    for i, rows in enumerate(cached.chunks):
+        yield rows, cached.truncated and i == len(cached.chunks) - 1
+
+
+async def stream_query_results(  # pylint: disable=too-many-arguments,too-many-locals,too-many-branches
+    loader_class,
+    sql_query: str,
+    db_url: str,
+    result: dict,
+    policy: ExecutionPolicy | None = None,
+    *,
+    result_format: str = "rows",
+    read_url: str | None = None,
+):
+    """
+    Execute sql_query and yield its rows as query_result_chunk frames.
+
+    If a policy is given the query is first rewritten under it (row LIMIT) and
+    a query_policy frame reports the guardrails applied. Read results are
+    served from and stored in the result cache when the policy allows it
+    (frames then carry cached=True); any other statement invalidates the
+    cache for the database. Rows are streamed in result_format (see
+    _chunk_payload), in chunks of SQL_RESULT_CHUNK_ROWS and capped at
+    SQL_RESULT_MAX_ROWS. A closing query_result_end frame reports the row
+    count and whether the result was truncated. Reads run against read_url
+    (a replica) if given; caching and invalidation stay keyed by db_url.
+    Only the first SQL_RESULT_PREVIEW_ROWS rows are kept, in
+    result["preview"], with result["row_count"] and result["truncated"]
+    describing the whole result.
+    """
+    preview, row_count, truncated, chunk_index = [], 0, False, 0
+    result.update(preview=preview, row_count=0, truncated=False)
+
+    limit = None
+    if policy is not None:
+        sql_query, report = policy.prepare(sql_query)
+        limit = report["limit"]
+        message = _policy_message(report)
+        if message:
+            yield json.dumps(
+                {
+                    "type": "query_policy",
+                    "message": message,
+                    "sql_query": sql_query,
+                    **report,
+                    "final_response": False,
+                }
+            ) + MESSAGE_DELIMITER
+
+    is_read = is_read_statement(sql_query)
+    cached, generation = None, result_cache.generation(db_url)
+    if is_read and policy is not None and policy.result_cache:
+        cached = result_cache.get(db_url, sql_query)
+        # Collect a fresh result for the cache, unless it grows too large
+        collected, collected_bytes = ([] if cached is None else None), 0
+    else:
+        collected, collected_bytes = None, 0
+
+    if cached is not None:
+        chunks = _cached_chunks(cached)
+    else:
+        chunks = loader_class.stream_sql_query(
+            sql_query, (read_url if is_read and read_url else db_url), policy=policy
+        )
+
+    try:
+        async for rows, truncated in chunks:
+            if len(preview) < Config.SQL_RESULT_PREVIEW_ROWS:
+                preview.extend(rows[: Config.SQL_RESULT_PREVIEW_ROWS - len(preview)])
+            row_count += len(rows)
+            frame = json.dumps(
+                {
+                    "type": "query_result_chunk",
+                    **_chunk_payload(rows, chunk_index, result_format),
+                    "chunk": chunk_index,
+                    "cached": cached is not None,
+                    "final_response": False,
+                }
+            )
+            if collected is not None:
+                collected_bytes += len(frame)
+                if collected_bytes > result_cache.max_entry_bytes:
+                    collected = None
+                else:
+                    collected.append(rows)
+            yield frame + MESSAGE_DELIMITER
+            chunk_index += 1
+    finally:
+        if not is_read:
+            # Writes and DDL may change any cached result for this database
+            result_cache.invalidate(db_url)
+
+    if collected is not None:
+        result_cache.put(
+            db_url, sql_query, collected, truncated,
+            size=collected_bytes, generation=generation,
+        )
+
+    # A result that fills the applied LIMIT was most likely cut short by it
+    truncated = truncated or bool(limit and row_count >= limit)
+    result.update(row_count=row_count, truncated=truncated)
+    if row_count:
+        yield json.dumps(
+            {
+                "type": "query_result_end",
+                "row_count": row_count,
+                "truncated": truncated,
+                "max_rows": min(limit or Config.SQL_RESULT_MAX_ROWS, Config.SQL_RESULT_MAX_ROWS),
+                "cached": cached is not None,
+                "final_response": False,
+            }
+        ) + MESSAGE_DELIMITER
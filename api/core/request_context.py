@@ -0,0 +1,71 @@
+"""Values shared by the stages answering one chat question.
+
+``query_database`` sets a RequestContext for the question it answers. Stages
+that need the question's embedding (similar-query retrieval, the memory fact
+search, saving the query to memory) get it from the context instead of each
+calling the embedding provider; it is computed at most once per request.
+"""
+
+import asyncio
+import contextvars
+import dataclasses
+from typing import List, Optional
+
+from api.config import Config
+
+
+@dataclasses.dataclass
+class RequestContext:
+    """Per-request values shared across the text-to-SQL stages."""
+
+    user_id: str
+    graph_id: str
+    question: str
+    db_description: Optional[str] = None
+    db_url: Optional[str] = None
+    _embedding: Optional[asyncio.Future] = dataclasses.field(default=None, repr=False)
+
+    def prefetch_question_embedding(self) -> None:
+        """Start embedding the question in the background, if not started yet."""
+        if self._embedding is None:
+            self._embedding = asyncio.ensure_future(
+                asyncio.to_thread(Config.EMBEDDING_MODEL.embed, self.question)
+            )
+
+    async def question_embedding(self) -> List[float]:
+        """Return the question's embedding, computing it on first use."""
+        self.prefetch_question_embedding()
+        # Shielded: one stage giving up (e.g. a search over its time budget)
+        # must not cancel the computation other stages are waiting for
+        return (await asyncio.shield(self._embedding))[0]
+
+    def cached_question_embedding(self) -> Optional[List[float]]:
+        """Return the question's embedding if it has already been computed."""
+        if self._embedding is None or not self._embedding.done():
+            return None
+        if self._embedding.cancelled() or self._embedding.exception() is not None:
+            return None
+        return self._embedding.result()[0]
+
+
+_request_context: contextvars.ContextVar[Optional[RequestContext]] = contextvars.ContextVar(
+    "request_context", default=None
+)
+
+
+def current_request() -> Optional[RequestContext]:
+    """Return the context of the question being answered, if any."""
+    return _request_context.get()
+
+
+def set_request_context(context: RequestContext) -> contextvars.Token:
+    """Make context the current request's context (and that of tasks it starts)."""
+    return _request_context.set(context)
+
+
+async def embed_question(text: str) -> List[float]:
+    """Embed text, reusing the current request's embedding when text is its question."""
+    context = current_request()
+    if context is not None and text == context.question:
+        return await context.question_embedding()
+    return (await asyncio.to_thread(Config.EMBEDDING_MODEL.embed, text))[0]
@@ -1,5 +1,6 @@
 """Database connection routes for the text2sql API."""
 
+import asyncio
 import logging
 import json
 import time
@@ -7,16 +8,22 @@ from typing import AsyncGenerator, Optional
 
 from pydantic import BaseModel
 
+from api.config import Config
 from api.extensions import db
 
 from api.core.errors import InvalidArgumentError
 from api.loaders.base_loader import BaseLoader
+from api.loaders.graph_loader import is_internal_graph_name
 from api.loaders.postgres_loader import PostgresLoader
 from api.loaders.mysql_loader import MySQLLoader
 
 # Use the same delimiter as in the JavaScript frontend for streaming chunks
 MESSAGE_DELIMITER = "|||FALKORDB_MESSAGE_BOUNDARY|||"
 
+# Process-wide cap on concurrent schema loads (streamed or background jobs),
+# so ingestion can't starve chat traffic of workers and embedding quota
+ingestion_slots = asyncio.Semaphore(Config.INGESTION_MAX_WORKERS)
+
 
 class DatabaseConnectionRequest(BaseModel):
     """Database connection request model.
@@ -34,18 +41,18 @@ def _step_start(steps_counter: int) -> dict[str, str]:
         "message": f"Step {steps_counter}: Starting database connection",
     }
 
+def detect_loader(url: str) -> tuple[str, type[BaseLoader]]:
+    """Return the database type and loader class for a connection URL."""
+    if url.startswith("postgres://") or url.startswith("postgresql://"):
+        return "postgresql", PostgresLoader
+    if url.startswith("mysql://"):
+        return "mysql", MySQLLoader
+    raise InvalidArgumentError("Invalid database URL format")
+
+
 def _step_detect_db_type(steps_counter: int, url: str) -> tuple[type[BaseLoader], dict[str, str]]:
     """Yield the database type detection step message."""
-    db_type = None
-    loader: type[BaseLoader] = BaseLoader  # type: ignore
-    if url.startswith("postgres://") or url.startswith("postgresql://"):
-        db_type = "postgresql"
-        loader = PostgresLoader
-    elif url.startswith("mysql://"):
-        db_type = "mysql"
-        loader = MySQLLoader
-    else:
-        raise InvalidArgumentError("Invalid database URL format")
+    db_type, loader = detect_loader(url)
 
     return loader, {
         "type": "reasoning_step",
@@ -61,16 +68,17 @@ async def _step_attempt_load(
     success, result = [False, ""]
     try:
         load_start = time.perf_counter()
-        async for progress in loader.load(user_id, url):
-            success, result = progress
-            if success:
-                steps_counter += 1
-                yield {
-                    "type": "reasoning_step",
-                    "message": f"Step {steps_counter}: {result}",
-                }
-            else:
-                break
+        async with ingestion_slots:
+            async for progress in loader.load(user_id, url):
+                success, result = progress
+                if success:
+                    steps_counter += 1
+                    yield {
+                        "type": "reasoning_step",
+                        "message": f"Step {steps_counter}: {result}",
+                    }
+                else:
+                    break
 
         load_elapsed = time.perf_counter() - load_start
         logging.info("Database load attempt finished in %.2f seconds", load_elapsed)
@@ -145,7 +153,10 @@ async def list_databases(user_id: str, general_prefix: Optional[str] = None) ->
     """
     This route is used to list all the graphs (databases names) that are available in the database.
     """
-    user_graphs = await db.list_graphs()
+    # Staging and retired graphs from blue/green reloads are not user-visible
+    user_graphs = [
+        graph for graph in await db.list_graphs() if not is_internal_graph_name(graph)
+    ]
 
     # Only include graphs that start with user_id + '_', and strip the prefix
     filtered_graphs = [
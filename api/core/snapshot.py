@@ -0,0 +1,403 @@
+"""Portable snapshots of a schema graph, including its embeddings.
+
+A snapshot is a zip archive that restores a graph without touching the source
+database or the embedding provider:
+
+- ``manifest.json``       format version, embedding model, dimension and dtype
+- ``database.json``       the Database node (name, description, url without
+                          credentials; the importer supplies the real URL)
+- ``tables.jsonl``        one Table per line, with its ``embedding_row``
+- ``columns.jsonl``       one Column per line, with its table and ``embedding_row``
+- ``relationships.jsonl`` one REFERENCES edge per line
+- ``embeddings.bin``      row-major little-endian float32 (or float16) vectors
+"""
+
+import asyncio
+import json
+import logging
+import os
+import shutil
+import struct
+import tempfile
+import time
+import zipfile
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterator, List, Tuple
+
+from api.config import Config
+from api.core.errors import GraphNotFoundError, InternalError, InvalidArgumentError
+from api.core.schema_loader import detect_loader
+from api.core.text2sql import GENERAL_PREFIX, _graph_name, sanitize_log_input
+from api.extensions import db
+from api.loaders.connection_pool import redact_url
+from api.loaders.graph_loader import (
+    column_key,
+    create_references,
+    create_schema_indexes,
+    rebuild_graph,
+)
+
+SNAPSHOT_FORMAT = "queryweaver-graph-snapshot"
+SNAPSHOT_VERSION = 1
+
+# struct format codes for the supported embedding dtypes
+EMBEDDING_DTYPES = {"float32": "f", "float16": "e"}
+
+# Rows read from / written to FalkorDB per query
+SNAPSHOT_BATCH_SIZE = 500
+
+
+def _vector(value: Any) -> List[float]:
+    """Normalize a vector property returned by FalkorDB to a list of floats."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = json.loads(value)
+    return [float(v) for v in value]
+
+
+async def _paged(graph, query: str) -> AsyncIterator[list]:
+    """Yield result rows of query in id-ordered pages (query must RETURN id first)."""
+    after = -1
+    while True:
+        rows = (await graph.query(query, {"after": after, "limit": SNAPSHOT_BATCH_SIZE})).result_set
+        for row in rows:
+            yield row[1:]
+        if len(rows) < SNAPSHOT_BATCH_SIZE:
+            return
+        after = rows[-1][0]
+
+
+class _EmbeddingWriter:  # pylint: disable=too-few-public-methods
+    """Append vectors to the embeddings file and hand out their row numbers."""
+
+    def __init__(self, fileobj: BinaryIO, dtype: str):
+        self.fileobj = fileobj
+        self.code = EMBEDDING_DTYPES[dtype]
+        self.dimension = 0
+        self.rows = 0
+
+    def write(self, vector: List[float]) -> int:
+        """Write one vector and return its row number."""
+        if not self.dimension:
+            self.dimension = len(vector)
+        if len(vector) != self.dimension:
+            raise InternalError("Graph contains embeddings of different dimensions")
+        self.fileobj.write(struct.pack(f"<{self.dimension}{self.code}", *vector))
+        self.rows += 1
+        return self.rows - 1
+
+
+async def export_snapshot(user_id: str, graph_id: str, dtype: str = "float32") -> str:
+    """
+    Write a snapshot of the user's graph to a temporary zip file.
+
+    Returns:
+        The path of the zip file; the caller is responsible for removing it
+    """
+    if dtype not in EMBEDDING_DTYPES:
+        raise InvalidArgumentError(f"Unsupported embedding dtype: {dtype}")
+
+    namespaced = _graph_name(user_id, graph_id)
+    if not await db.connection.exists(namespaced):
+        raise GraphNotFoundError("Graph not found")
+    graph = db.select_graph(namespaced)
+
+    fd, path = tempfile.mkstemp(prefix="qw-snapshot-", suffix=".zip")
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+            await _write_snapshot(graph, zf, dtype)
+    except (GraphNotFoundError, InvalidArgumentError):
+        os.unlink(path)
+        raise
+    except Exception as e:
+        os.unlink(path)
+        logging.exception("Failed to export graph %s: %s", sanitize_log_input(namespaced), e)
+        raise InternalError("Failed to export graph snapshot") from e
+    return path
+
+
+async def _write_tables(graph, zf: zipfile.ZipFile, embeddings: _EmbeddingWriter) -> int:
+    """Write tables.jsonl and return the number of tables."""
+    count = 0
+    with zf.open("tables.jsonl", "w", force_zip64=True) as out:
+        async for row in _paged(graph, """
+            MATCH (t:Table) WHERE id(t) > $after
+            RETURN id(t), t.name, t.description, t.foreign_keys, t.embedding
+            ORDER BY id(t) LIMIT $limit
+        """):
+            table, desc, foreign_keys, vector = row
+            out.write((json.dumps({
+                "name": table,
+                "description": desc,
+                "foreign_keys": foreign_keys,
+                "embedding_row": embeddings.write(_vector(vector)),
+            }) + "\n").encode())
+            count += 1
+    return count
+
+
+async def _write_columns(graph, zf: zipfile.ZipFile, embeddings: _EmbeddingWriter) -> int:
+    """Write columns.jsonl and return the number of columns."""
+    count = 0
+    with zf.open("columns.jsonl", "w", force_zip64=True) as out:
+        async for row in _paged(graph, """
+            MATCH (c:Column)-[:BELONGS_TO]->(t:Table) WHERE id(c) > $after
+            RETURN id(c), t.name, c.name, c.type, c.nullable, c.key_type,
+                   c.description, c.embedding
+            ORDER BY id(c) LIMIT $limit
+        """):
+            table, col, col_type, nullable, key_type, desc, vector = row
+            out.write((json.dumps({
+                "table": table,
+                "name": col,
+                "type": col_type,
+                "nullable": nullable,
+                "key_type": key_type,
+                "description": desc,
+                "embedding_row": embeddings.write(_vector(vector)),
+            }) + "\n").encode())
+            count += 1
+    return count
+
+
+async def _write_relationships(graph, zf: zipfile.ZipFile) -> int:
+    """Write relationships.jsonl and return the number of edges."""
+    count = 0
+    with zf.open("relationships.jsonl", "w", force_zip64=True) as out:
+        async for row in _paged(graph, """
+            MATCH (st:Table)<-[:BELONGS_TO]-(src:Column)-[r:REFERENCES]->(tgt:Column)
+                  -[:BELONGS_TO]->(tt:Table)
+            WHERE id(r) > $after
+            RETURN id(r), st.name, src.name, tt.name, tgt.name, r.rel_name, r.note
+            ORDER BY id(r) LIMIT $limit
+        """):
+            source_table, source_col, target_table, target_col, rel_name, note = row
+            out.write((json.dumps({
+                "source_table": source_table,
+                "source_column": source_col,
+                "target_table": target_table,
+                "target_column": target_col,
+                "rel_name": rel_name,
+                "note": note,
+            }) + "\n").encode())
+            count += 1
+    return count
+
+
+async def _write_snapshot(graph, zf: zipfile.ZipFile, dtype: str) -> None:
+    """Stream the graph's nodes and edges into the open archive."""
+    database_rows = (await graph.query(
+        "MATCH (d:Database) RETURN d.name, d.description, d.url LIMIT 1"
+    )).result_set
+    if not database_rows:
+        raise GraphNotFoundError("Graph has no database schema")
+    name, description, url = database_rows[0]
+    # Snapshots are downloadable files: never ship the database credentials
+    zf.writestr("database.json", json.dumps(
+        {"name": name, "description": description, "url": redact_url(url) if url else url}
+    ))
+
+    # zipfile allows one writer at a time, so vectors are spooled to a side file
+    # while the JSONL members are written, then appended uncompressed
+    with tempfile.TemporaryFile() as emb_file:
+        embeddings = _EmbeddingWriter(emb_file, dtype)
+        counts = {
+            "tables": await _write_tables(graph, zf, embeddings),
+            "columns": await _write_columns(graph, zf, embeddings),
+        }
+
+        emb_file.seek(0)
+        # ZipInfo defaults to ZIP_STORED; vectors barely compress
+        with zf.open(zipfile.ZipInfo("embeddings.bin"), "w", force_zip64=True) as out:
+            await asyncio.to_thread(shutil.copyfileobj, emb_file, out)
+
+    counts["relationships"] = await _write_relationships(graph, zf)
+
+    zf.writestr("manifest.json", json.dumps({
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "embedding_model": Config.EMBEDDING_MODEL.model_name,
+        "dimension": embeddings.dimension,
+        "dtype": dtype,
+        "counts": counts,
+        "created_at": int(time.time()),
+    }, indent=2))
+
+
+def _read_manifest(zf: zipfile.ZipFile) -> Dict[str, Any]:
+    """Load and validate the manifest against this deployment."""
+    try:
+        manifest = json.loads(zf.read("manifest.json"))
+    except (KeyError, ValueError) as e:
+        raise InvalidArgumentError("Snapshot is missing a valid manifest.json") from e
+
+    if manifest.get("format") != SNAPSHOT_FORMAT or manifest.get("version") != SNAPSHOT_VERSION:
+        raise InvalidArgumentError("Unsupported snapshot format or version")
+    if manifest.get("dtype") not in EMBEDDING_DTYPES:
+        raise InvalidArgumentError("Unsupported embedding dtype in snapshot")
+    if manifest.get("embedding_model") != Config.EMBEDDING_MODEL.model_name:
+        # Vectors from another model live in a different space; mixing them
+        # with query embeddings from this deployment would return garbage
+        raise InvalidArgumentError(
+            f"Snapshot embeddings were made with {manifest.get('embedding_model')}, "
+            f"but this deployment uses {Config.EMBEDDING_MODEL.model_name}"
+        )
+
+    dimension = int(manifest.get("dimension", 0))
+    counts = manifest.get("counts", {})
+    rows = int(counts.get("tables", 0)) + int(counts.get("columns", 0))
+    row_bytes = dimension * struct.calcsize(EMBEDDING_DTYPES[manifest["dtype"]])
+    if zf.getinfo("embeddings.bin").file_size != rows * row_bytes:
+        raise InvalidArgumentError("Snapshot embeddings do not match the manifest")
+    return manifest
+
+
+def _jsonl_batches(zf: zipfile.ZipFile, name: str) -> Iterator[List[Dict[str, Any]]]:
+    """Yield the records of a JSONL member in batches."""
+    batch = []
+    with zf.open(name) as fileobj:
+        for line in fileobj:
+            if line.strip():
+                batch.append(json.loads(line))
+            if len(batch) >= SNAPSHOT_BATCH_SIZE:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+async def _read_batches(zf: zipfile.ZipFile, name: str) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Async form of _jsonl_batches; each batch is read and decompressed on a thread."""
+    batches = _jsonl_batches(zf, name)
+    try:
+        while (batch := await asyncio.to_thread(next, batches, None)) is not None:
+            yield batch
+    finally:
+        batches.close()
+
+
+def _attach_embeddings(batch, emb_file: BinaryIO, manifest: Dict[str, Any], expected_row: int):
+    """Read the vectors for a batch, which must follow the embeddings file order."""
+    dimension = manifest["dimension"]
+    fmt = f"<{dimension}{EMBEDDING_DTYPES[manifest['dtype']]}"
+    row_bytes = struct.calcsize(fmt)
+    for record in batch:
+        if record.pop("embedding_row") != expected_row:
+            raise InvalidArgumentError("Snapshot embedding rows are out of order")
+        record["embedding"] = list(struct.unpack(fmt, emb_file.read(row_bytes)))
+        expected_row += 1
+    return expected_row
+
+
+def _open_snapshot(fileobj: BinaryIO) -> Tuple[zipfile.ZipFile, Dict[str, Any], Dict[str, Any]]:
+    """Open the archive and load its manifest and database record (blocking)."""
+    try:
+        zf = zipfile.ZipFile(fileobj)  # pylint: disable=consider-using-with
+    except zipfile.BadZipFile as e:
+        raise InvalidArgumentError("Snapshot is not a valid zip archive") from e
+    try:
+        return zf, _read_manifest(zf), json.loads(zf.read("database.json"))
+    except KeyError as e:
+        zf.close()
+        raise InvalidArgumentError(f"Snapshot is incomplete: {e}") from e
+    except Exception:
+        zf.close()
+        raise
+
+
+async def _restore_nodes(graph, zf: zipfile.ZipFile, manifest: Dict[str, Any]) -> None:
+    """Create the Table and Column nodes, with their embeddings."""
+    row = 0
+    with zf.open("embeddings.bin") as emb_file:
+        async for batch in _read_batches(zf, "tables.jsonl"):
+            row = await asyncio.to_thread(_attach_embeddings, batch, emb_file, manifest, row)
+            await graph.query("""
+                UNWIND $rows AS row
+                CREATE (:Table {
+                    name: row.name,
+                    description: row.description,
+                    foreign_keys: row.foreign_keys,
+                    embedding: vecf32(row.embedding)
+                })
+            """, {"rows": batch})
+
+        async for batch in _read_batches(zf, "columns.jsonl"):
+            row = await asyncio.to_thread(_attach_embeddings, batch, emb_file, manifest, row)
+            for record in batch:
+                record["qualified_name"] = column_key(record["table"], record["name"])
+            await graph.query("""
+                UNWIND $rows AS row
+                MATCH (t:Table {name: row.table})
+                CREATE (:Column {
+                    name: row.name,
+                    qualified_name: row.qualified_name,
+                    type: row.type,
+                    nullable: row.nullable,
+                    key_type: row.key_type,
+                    description: row.description,
+                    embedding: vecf32(row.embedding)
+                })-[:BELONGS_TO]->(t)
+            """, {"rows": batch})
+
+
+async def _restore_snapshot(
+    graph, zf: zipfile.ZipFile, manifest: Dict[str, Any], database: Dict[str, Any]
+) -> None:
+    """Write the archive's contents into an empty graph."""
+    await create_schema_indexes(graph, manifest["dimension"])
+    await graph.query(
+        "CREATE (d:Database {name: $name, description: $description, url: $url})",
+        database,
+    )
+    await _restore_nodes(graph, zf, manifest)
+
+    async for batch in _read_batches(zf, "relationships.jsonl"):
+        await create_references(graph, [
+            {
+                "source": column_key(rel["source_table"], rel["source_column"]),
+                "target": column_key(rel["target_table"], rel["target_column"]),
+                "rel_name": rel["rel_name"],
+                "note": rel["note"],
+            }
+            for rel in batch
+        ], batch_size=SNAPSHOT_BATCH_SIZE)
+
+
+async def import_snapshot(
+    user_id: str, graph_id: str, fileobj: BinaryIO, db_url: str
+) -> Dict[str, Any]:
+    """
+    Restore a snapshot into the user's graph_id, replacing any existing graph.
+
+    Snapshots carry no credentials, so the caller supplies the connection URL
+    of the database; it must be of the snapshot's database type. The graph is
+    rebuilt in a staging graph with bulk writes and swapped in atomically, so
+    a rejected or failed import leaves the current graph intact.
+    """
+    if GENERAL_PREFIX and graph_id.startswith(GENERAL_PREFIX):
+        raise InvalidArgumentError("Demo graphs cannot be replaced")
+    namespaced = _graph_name(user_id, graph_id)
+    db_url = (db_url or "").strip()
+    db_type, _ = detect_loader(db_url)
+
+    # Reading the archive is blocking (and the upload may be spooled to disk)
+    zf, manifest, database = await asyncio.to_thread(_open_snapshot, fileobj)
+    with zf:
+        if database.get("url") and detect_loader(database["url"])[0] != db_type:
+            raise InvalidArgumentError(
+                f"Snapshot was made from a {detect_loader(database['url'])[0]} database"
+            )
+        database["url"] = db_url
+
+        try:
+            await rebuild_graph(
+                namespaced, lambda graph: _restore_snapshot(graph, zf, manifest, database)
+            )
+        except InvalidArgumentError:
+            raise
+        except Exception as e:
+            logging.exception("Failed to import graph %s: %s", sanitize_log_input(namespaced), e)
+            raise InternalError("Failed to import graph snapshot") from e
+
+    return {"success": True, "graph": graph_id, "counts": manifest["counts"]}
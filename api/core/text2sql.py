@@ -1,26 +1,39 @@
 """Graph-related routes for the text2sql API."""
 
 import asyncio
+import dataclasses
 import json
 import logging
 import os
 import time
 
+from typing import Literal
+
 from pydantic import BaseModel
 from redis import ResponseError
 
 from api.core.errors import GraphNotFoundError, InternalError, InvalidArgumentError
+from api.core.graph_settings import (
+    get_graph_settings, get_replica_urls, set_replica_urls, update_graph_settings
+)
+from api.core.query_execution import (
+    MESSAGE_DELIMITER, check_query_cost, stream_query_results
+)
+from api.core.request_context import RequestContext, set_request_context
 from api.core.schema_loader import load_database
 from api.agents import AnalysisAgent, RelevancyAgent, ResponseFormatterAgent, FollowUpAgent
 from api.config import Config
 from api.extensions import db
 from api.graph import find, get_db_description
+from api.loaders.execution_policy import (
+    ExecutionPolicy, QueryCostError, QueryTimeoutError, is_read_statement, statement_keyword
+)
 from api.loaders.postgres_loader import PostgresLoader
+from api.loaders.replica_router import replica_router
 from api.loaders.mysql_loader import MySQLLoader
-from api.memory.graphiti_tool import MemoryTool
-
-# Use the same delimiter as in the JavaScript
-MESSAGE_DELIMITER = "|||FALKORDB_MESSAGE_BOUNDARY|||"
+from api.memory.modes import record_memory, resolve_memory_mode
+from api.memory.registry import memory_tools
+from api.memory.persistence import memory_writes
 
 GENERAL_PREFIX = os.getenv("GENERAL_PREFIX")
 
@@ -42,6 +55,7 @@ class ChatRequest(BaseModel):
     chat: list[str]
     result: list[str] | None = None
     instructions: str | None = None
+    result_format: Literal["rows", "columnar"] = "rows"
 
 
 class ConfirmRequest(BaseModel):
@@ -53,6 +67,7 @@ class ConfirmRequest(BaseModel):
     sql_query: str
     confirmation: str = ""
     chat: list = []
+    result_format: Literal["rows", "columnar"] = "rows"
 
 
 def get_database_type_and_loader(db_url: str):
@@ -128,9 +143,8 @@ async def get_schema(user_id: str, graph_id: str):  # pylint: disable=too-many-l
     """
 
     links_query = """
-    MATCH (src_col:Column)-[:BELONGS_TO]->(src_table:Table),
-          (tgt_col:Column)-[:BELONGS_TO]->(tgt_table:Table),
-          (src_col)-[:REFERENCES]->(tgt_col)
+    MATCH (src_table:Table)<-[:BELONGS_TO]-(src_col:Column)-[:REFERENCES]->(tgt_col:Column)
+          -[:BELONGS_TO]->(tgt_table:Table)
     RETURN DISTINCT src_table.name AS source, tgt_table.name AS target
     """
 
@@ -197,13 +211,16 @@ async def get_schema(user_id: str, graph_id: str):  # pylint: disable=too-many-l
 
     return {"nodes": nodes, "links": links}
 
-async def query_database(user_id: str, graph_id: str, chat_data: ChatRequest):  # pylint: disable=too-many-statements
+async def query_database(  # pylint: disable=too-many-statements
+    user_id: str, graph_id: str, chat_data: ChatRequest, token_memory_mode: str | None = None
+):
     """
     Query the Database with the given graph_id and chat_data.
     
         Args:
             graph_id (str): The ID of the graph to query.
             chat_data (ChatRequest): The chat data containing user queries and context.
+            token_memory_mode (str | None): Memory mode of the API token, if it has one.
     """
     graph_id = _graph_name(user_id, graph_id)
 
@@ -230,7 +247,13 @@ async def query_database(user_id: str, graph_id: str, chat_data: ChatRequest):
 
     logging.info("User Query: %s", sanitize_query(queries_history[-1]))
 
-    memory_tool_task = asyncio.create_task(MemoryTool.create(user_id, graph_id))
+    memory_mode = resolve_memory_mode(
+        (await get_graph_settings(graph_id)).get("memory_mode"), token_memory_mode
+    )
+    record_memory(memory_mode, requests=1)
+    memory_tool_task = None
+    if memory_mode != "off":
+        memory_tool_task = asyncio.create_task(memory_tools.get(user_id, graph_id))
 
     # Create a generator function for streaming
     async def generate():  # pylint: disable=too-many-locals,too-many-branches,too-many-statements
@@ -250,6 +273,17 @@ async def query_database(user_id: str, graph_id: str, chat_data: ChatRequest):
         # Ensure the database description is loaded
         db_description, db_url = await get_db_description(graph_id)
 
+        # Shared by the stages below (and the tasks they start). Not reset: the
+        # generator may be finalized outside the context it was set in
+        request_context = RequestContext(
+            user_id=user_id,
+            graph_id=graph_id,
+            question=queries_history[-1],
+            db_description=db_description,
+            db_url=db_url,
+        )
+        set_request_context(request_context)
+
         # Determine database type and get appropriate loader
         _, loader_class = get_database_type_and_loader(db_url)
 
@@ -264,8 +298,11 @@ async def query_database(user_id: str, graph_id: str, chat_data: ChatRequest):
             }) + MESSAGE_DELIMITER
             return
 
-        # Start both tasks concurrently
+        # Start both tasks concurrently, and the question's embedding alongside
+        # them if memory is used (only the memory stages need it)
         find_task = asyncio.create_task(find(graph_id, queries_history, db_description))
+        if memory_tool_task is not None:
+            request_context.prefetch_question_embedding()
 
         relevancy_task = asyncio.create_task(agent_rel.get_answer(
             queries_history[-1], db_description
@@ -296,20 +333,57 @@ async def query_database(user_id: str, graph_id: str, chat_data: ChatRequest):
             logging.info("Query processing completed (off-topic) - Total time: %.2f seconds",
                          overall_elapsed)
         else:
-            # Query is on-topic, wait for find results
-            result = await find_task
+            memory_start = time.perf_counter()
+            memory_tool = await memory_tool_task if memory_tool_task else None
+
+            # A standalone question differing from a stored successful one only
+            # in its values reuses that question's SQL with the new values
+            template = None
+            if memory_tool and Config.SQL_TEMPLATE_MAX_DISTANCE and len(queries_history) == 1:
+                template = await memory_tool.find_template_sql(
+                    queries_history[-1], Config.SQL_TEMPLATE_MAX_DISTANCE
+                )
+            record_memory(memory_mode, seconds=time.perf_counter() - memory_start)
 
-            logging.info("Calling to analysis agent with query: %s",
-                         sanitize_query(queries_history[-1]))  # nosemgrep
-            memory_tool = await memory_tool_task
-            memory_context = await memory_tool.search_memories(
-                query=queries_history[-1]
-            )
+            if template:
+                # Neither the schema search nor the analysis agent is needed
+                find_task.cancel()
+                try:
+                    await find_task
+                except asyncio.CancelledError:
+                    pass
+                logging.info("SQL derived from the template of a stored question")
+                answer_an = {
+                    "is_sql_translatable": True,
+                    "sql_query": template["sql_query"],
+                    "confidence": 100,
+                    "explanation": (
+                        "Reused the SQL of the earlier successful question "
+                        f"\"{template['template_question']}\" with this question's values."
+                    ),
+                    "missing_information": "",
+                    "ambiguities": "",
+                }
+            else:
+                # Query is on-topic, wait for find results
+                result = await find_task
+
+                logging.info("Calling to analysis agent with query: %s",
+                             sanitize_query(queries_history[-1]))  # nosemgrep
+                memory_context = None
+                if memory_tool:
+                    memory_start = time.perf_counter()
+                    memory_context = await memory_tool.search_memories(
+                        query=queries_history[-1],
+                        budget=Config.MEMORY_SEARCH_BUDGET_SECONDS or None,
+                        lightweight=memory_mode == "lightweight",
+                    )
+                    record_memory(memory_mode, seconds=time.perf_counter() - memory_start)
 
-            logging.info("Starting SQL generation with analysis agent")
-            answer_an = agent_an.get_analysis(
-                queries_history[-1], result, db_description, instructions, memory_context
-            )
+                logging.info("Starting SQL generation with analysis agent")
+                answer_an = agent_an.get_analysis(
+                    queries_history[-1], result, db_description, instructions, memory_context
+                )
 
             # Initialize response variables
             user_readable_response = ""
@@ -326,6 +400,7 @@ async def query_database(user_id: str, graph_id: str, chat_data: ChatRequest):
                     "amb": answer_an["ambiguities"],
                     "exp": answer_an["explanation"],
                     "is_valid": answer_an["is_sql_translatable"],
+                    "template": bool(template),
                     "final_response": False,
                 }
             ) + MESSAGE_DELIMITER
@@ -334,9 +409,10 @@ async def query_database(user_id: str, graph_id: str, chat_data: ChatRequest):
             if answer_an["is_sql_translatable"]:
                 # Check if this is a destructive operation that requires confirmation
                 sql_query = answer_an["sql_query"]
-                sql_type = sql_query.strip().split()[0].upper() if sql_query else ""
+                # A WITH statement counts as the data-modifying statement it runs
+                sql_type = statement_keyword(sql_query) if sql_query else ""
 
-                destructive_ops = ['INSERT', 'UPDATE', 'DELETE', 'DROP',
+                destructive_ops = ['INSERT', 'UPDATE', 'DELETE', 'MERGE', 'DROP',
                                   'CREATE', 'ALTER', 'TRUNCATE']
                 is_destructive = sql_type in destructive_ops
                 general_graph = graph_id.startswith(GENERAL_PREFIX) if GENERAL_PREFIX else False
@@ -402,6 +478,55 @@ What this will do:
                                 "message": "Destructive operation not allowed on demo graphs"
                             }) + MESSAGE_DELIMITER
                     else:
+                        policy = ExecutionPolicy.from_settings(
+                            await get_graph_settings(graph_id)
+                        )
+                        # Reads may go to a replica; writes always use the primary
+                        read_url = db_url
+                        if is_read_statement(sql_query):
+                            read_url = await replica_router.choose(
+                                loader_class, db_url, await get_replica_urls(graph_id)
+                            )
+                        estimate = await check_query_cost(
+                            loader_class, sql_query, read_url, policy
+                        )
+                        if estimate is not None:
+                            yield json.dumps(
+                                {
+                                    "type": "query_cost",
+                                    "final_response": False,
+                                    "message": (
+                                        f"Estimated cost {estimate['estimated_cost']:,.0f}, "
+                                        f"~{estimate['estimated_rows']:,} rows"
+                                    ),
+                                    **estimate,
+                                }
+                            ) + MESSAGE_DELIMITER
+
+                        if estimate is not None and estimate["violations"]:
+                            over_budget = ", ".join(estimate["violations"])
+                            if policy.cost_gate == "confirm":
+                                yield json.dumps(
+                                    {
+                                        "type": "cost_confirmation",
+                                        "final_response": False,
+                                        "message": (
+                                            "⚠️ EXPENSIVE QUERY ⚠️\n\n"
+                                            f"The database estimates {over_budget}.\n\n"
+                                            f"SQL:\n{sql_query}\n\n"
+                                            f"Plan:\n{estimate['plan']}"
+                                        ),
+                                        "sql_query": sql_query,
+                                        **estimate,
+                                    }
+                                ) + MESSAGE_DELIMITER
+                                logging.info("Query processing halted for cost confirmation")
+                                return  # Stop here and wait for user confirmation
+
+                            raise QueryCostError(
+                                f"Query rejected: the database estimates {over_budget}"
+                            )
+
                         step = {"type": "reasoning_step",
                                 "final_response": False,
                                 "message": "Step 2: Executing SQL query"}
@@ -413,18 +538,13 @@ What this will do:
                             loader_class.is_schema_modifying_query(sql_query)
                         )
 
-                        query_results = loader_class.execute_sql_query(
-                            answer_an["sql_query"],
-                            db_url
-                        )
-                        if len(query_results) != 0:
-                            yield json.dumps(
-                                {
-                                    "type": "query_result",
-                                    "data": query_results,
-                                    "final_response": False
-                                }
-                            ) + MESSAGE_DELIMITER
+                        query_result = {}
+                        async for frame in stream_query_results(
+                            loader_class, answer_an["sql_query"], db_url, query_result, policy,
+                            result_format=getattr(chat_data, "result_format", "rows"),
+                            read_url=read_url,
+                        ):
+                            yield frame
 
                         # If schema was modified, refresh the graph using the appropriate loader
                         if is_schema_modifying:
@@ -475,8 +595,9 @@ What this will do:
                         user_readable_response = response_agent.format_response(
                             user_query=queries_history[-1],
                             sql_query=answer_an["sql_query"],
-                            query_results=query_results,
-                            db_description=db_description
+                            query_results=query_result["preview"],
+                            db_description=db_description,
+                            total_rows=query_result["row_count"]
                         )
 
                         yield json.dumps(
@@ -505,7 +626,14 @@ What this will do:
                     yield json.dumps({
                         "type": "error", 
                         "final_response": True, 
-                        "message": "Error executing SQL query"
+                        "message": (
+                            "The query took too long and was cancelled. "
+                            "Try narrowing it down, e.g. with a filter or a shorter time range."
+                            if isinstance(e, QueryTimeoutError)
+                            else f"{e}. Try narrowing it down, e.g. with a filter."
+                            if isinstance(e, QueryCostError)
+                            else "Error executing SQL query"
+                        )
                     }) + MESSAGE_DELIMITER
             else:
                 execution_error = "Missing information"
@@ -549,38 +677,25 @@ What this will do:
                 full_response["success"] = True
 
 
-            # Save query to memory
-            save_query_task = asyncio.create_task(
-                memory_tool.save_query_memory(
-                    query=queries_history[-1],
-                    sql_query=answer_an["sql_query"],
-                    success=full_response["success"],
-                    error=execution_error
-                )
-            )
-            save_query_task.add_done_callback(
-                lambda t: logging.error("Query memory save failed: %s", t.exception())  # nosemgrep
-                if t.exception() else logging.info("Query memory saved successfully")
-            )
-
-            # Save conversation with memory tool (run in background)
-            save_task = asyncio.create_task(
-                memory_tool.add_new_memory(full_response,
-                                            [queries_history, result_history])
-            )
-            # Add error handling callback to prevent silent failures
-            save_task.add_done_callback(
-                lambda t: logging.error("Memory save failed: %s", t.exception())  # nosemgrep
-                if t.exception() else logging.info("Conversation saved to memory tool")
-            )
-            logging.info("Conversation save task started in background")
-
-            # Clean old memory in background (once per week cleanup)
-            clean_memory_task = asyncio.create_task(memory_tool.clean_memory())
-            clean_memory_task.add_done_callback(
-                lambda t: logging.error("Memory cleanup failed: %s", t.exception())  # nosemgrep
-                if t.exception() else logging.info("Memory cleanup completed successfully")
-            )
+            # Queue the query (and in full mode the conversation) for writing to
+            # memory; old memory is trimmed by the sweeper as saves accumulate
+            if memory_tool and memory_writes.submit_query(
+                memory_tool,
+                query=queries_history[-1],
+                sql_query=answer_an["sql_query"],
+                success=full_response["success"],
+                error=execution_error,
+                embedding=request_context.cached_question_embedding(),
+            ):
+                record_memory(memory_mode, query_saves=1)
+            if memory_tool and memory_mode == "full":
+                if memory_writes.submit_conversation(
+                    memory_tool, full_response, [queries_history, result_history]
+                ):
+                    record_memory(memory_mode, conversation_saves=1)
+                    logging.info("Conversation queued for saving to memory")
+                else:
+                    logging.warning("Memory write queue is full, conversation not saved")
 
         # Log timing summary at the end of processing
         overall_elapsed = time.perf_counter() - overall_start
@@ -594,12 +709,16 @@ async def execute_destructive_operation(
     user_id: str,
     graph_id: str,
     confirm_data: ConfirmRequest,
+    token_memory_mode: str | None = None,
 ):
     """
     Handle user confirmation for destructive SQL operations
     """
 
     graph_id = _graph_name(user_id, graph_id)
+    memory_mode = resolve_memory_mode(
+        (await get_graph_settings(graph_id)).get("memory_mode"), token_memory_mode
+    )
 
     if hasattr(confirm_data, 'confirmation'):
         confirmation = confirm_data.confirmation.strip().upper()
@@ -614,8 +733,10 @@ async def execute_destructive_operation(
 
     # Create a generator function for streaming the confirmation response
     async def generate_confirmation():
-        # Create memory tool for saving query results
-        memory_tool = await MemoryTool.create(user_id, graph_id)
+        # Memory tool for saving query results (none when memory is off)
+        memory_tool = None
+        if memory_mode != "off":
+            memory_tool = await memory_tools.get(user_id, graph_id)
 
         if confirmation == "CONFIRM":
             try:
@@ -639,13 +760,13 @@ async def execute_destructive_operation(
                 is_schema_modifying, operation_type = (
                     loader_class.is_schema_modifying_query(sql_query)
                 )
-                query_results = loader_class.execute_sql_query(sql_query, db_url)
-                yield json.dumps(
-                    {
-                        "type": "query_result",
-                        "data": query_results,
-                    }
-                ) + MESSAGE_DELIMITER
+                query_result = {}
+                async for frame in stream_query_results(
+                    loader_class, sql_query, db_url, query_result,
+                    ExecutionPolicy.from_settings(await get_graph_settings(graph_id)),
+                    result_format=getattr(confirm_data, "result_format", "rows"),
+                ):
+                    yield frame
 
                 # If schema was modified, refresh the graph
                 if is_schema_modifying:
@@ -687,8 +808,9 @@ async def execute_destructive_operation(
                 user_readable_response = response_agent.format_response(
                     user_query=queries_history[-1] if queries_history else "Destructive operation",
                     sql_query=sql_query,
-                    query_results=query_results,
-                    db_description=db_description
+                    query_results=query_result["preview"],
+                    db_description=db_description,
+                    total_rows=query_result["row_count"]
                 )
 
                 yield json.dumps(
@@ -699,41 +821,29 @@ async def execute_destructive_operation(
                 ) + MESSAGE_DELIMITER
 
                 # Save successful confirmed query to memory
-                save_query_task = asyncio.create_task(
-                    memory_tool.save_query_memory(
-                        query=(queries_history[-1] if queries_history
-                               else "Destructive operation confirmation"),
-                        sql_query=sql_query,
-                        success=True,
-                        error=""
-                    )
-                )
-                save_query_task.add_done_callback(
-                    lambda t: logging.error("Confirmed query memory save failed: %s",
-                                            t.exception())  # nosemgrep
-                    if t.exception() else logging.info("Confirmed query memory saved successfully")
-                )
+                if memory_tool and memory_writes.submit_query(
+                    memory_tool,
+                    query=(queries_history[-1] if queries_history
+                           else "Destructive operation confirmation"),
+                    sql_query=sql_query,
+                    success=True,
+                    error=""
+                ):
+                    record_memory(memory_mode, query_saves=1)
 
             except Exception as e:  # pylint: disable=broad-exception-caught
                 logging.error("Error executing confirmed SQL query: %s", str(e))  # nosemgrep
 
                 # Save failed confirmed query to memory
-                save_query_task = asyncio.create_task(
-                    memory_tool.save_query_memory(
-                        query=(queries_history[-1] if queries_history
-                               else "Destructive operation confirmation"),
-                        sql_query=sql_query,
-                        success=False,
-                        error=str(e)
-                    )
-                )
-                save_query_task.add_done_callback(
-                    lambda t: logging.error(  # nosemgrep
-                        "Failed confirmed query memory save failed: %s", t.exception()
-                    ) if t.exception() else logging.info(
-                        "Failed confirmed query memory saved successfully"
-                    )
-                )
+                if memory_tool and memory_writes.submit_query(
+                    memory_tool,
+                    query=(queries_history[-1] if queries_history
+                           else "Destructive operation confirmation"),
+                    sql_query=sql_query,
+                    success=False,
+                    error=str(e)
+                ):
+                    record_memory(memory_mode, query_saves=1)
 
                 yield json.dumps(
                     {"type": "error", "message": "Error executing query"}
@@ -776,6 +886,56 @@ async def refresh_database_schema(user_id: str, graph_id: str):
         logging.error("Error in refresh_graph_schema: %s", str(e))
         raise InternalError("Internal server error while refreshing schema") from e
 
+async def get_database_settings(user_id: str, graph_id: str):
+    """Return the query guardrail settings of a graph, with the effective values."""
+    graph_id = _graph_name(user_id, graph_id)
+    settings = await get_graph_settings(graph_id)
+    effective = ExecutionPolicy.from_settings(settings)
+    return {
+        "settings": settings,
+        "effective": {**dataclasses.asdict(effective),
+                      "memory_mode": resolve_memory_mode(settings.get("memory_mode"))},
+    }
+
+async def update_database_settings(user_id: str, graph_id: str, updates: dict):
+    """Update the query guardrail settings of a graph; a None value resets a setting."""
+    graph_id = _graph_name(user_id, graph_id)
+    if GENERAL_PREFIX and graph_id.startswith(GENERAL_PREFIX):
+        raise InvalidArgumentError("Demo graph settings cannot be changed")
+
+    settings = await update_graph_settings(graph_id, updates)
+    effective = ExecutionPolicy.from_settings(settings)
+    return {
+        "settings": settings,
+        "effective": {**dataclasses.asdict(effective),
+                      "memory_mode": resolve_memory_mode(settings.get("memory_mode"))},
+    }
+
+async def get_database_replicas(user_id: str, graph_id: str):
+    """Return the read replicas of a graph (passwords redacted) with their last known health."""
+    graph_id = _graph_name(user_id, graph_id)
+    return {"replicas": replica_router.status(await get_replica_urls(graph_id))}
+
+async def update_database_replicas(user_id: str, graph_id: str, urls: list[str]):
+    """Replace the read replicas of a graph; they must be of the primary's database type."""
+    graph_id = _graph_name(user_id, graph_id)
+    if GENERAL_PREFIX and graph_id.startswith(GENERAL_PREFIX):
+        raise InvalidArgumentError("Demo graph replicas cannot be changed")
+
+    _, db_url = await get_db_description(graph_id)
+    primary_type, _ = get_database_type_and_loader(db_url)
+    if primary_type is None:
+        raise GraphNotFoundError("Graph not found")
+    urls = list(dict.fromkeys(url.strip() for url in urls if url.strip()))
+    for url in urls:
+        if "://" not in url or get_database_type_and_loader(url)[0] != primary_type:
+            raise InvalidArgumentError(f"Replica URLs must be {primary_type} connection URLs")
+
+    await set_replica_urls(graph_id, urls)
+    for url in urls:
+        replica_router.forget(url)
+    return {"replicas": replica_router.status(urls)}
+
 async def delete_database(user_id: str, graph_id: str):
     """Delete the specified graph (namespaced to the user).
 
@@ -166,9 +166,10 @@ async def _find_tables_sphere(
     """
     query = """
         MATCH (node:Table {name: $name})
-        MATCH (node)-[:BELONGS_TO]-(column)-[:REFERENCES]-()-[:BELONGS_TO]-(table_ref)
-        WITH table_ref
-        MATCH (table_ref)-[:BELONGS_TO]-(columns)
+        MATCH (node)<-[:BELONGS_TO]-(:Column)-[:REFERENCES]-(:Column)
+              -[:BELONGS_TO]->(table_ref:Table)
+        WITH DISTINCT table_ref
+        MATCH (table_ref)<-[:BELONGS_TO]-(columns:Column)
         RETURN table_ref.name, table_ref.description, table_ref.foreign_keys,
                collect({
                    columnName: columns.name,
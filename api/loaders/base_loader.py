@@ -1,13 +1,132 @@
 """Base loader module providing abstract base class for data loaders."""
 
+import asyncio
+import functools
+import logging
+import threading
 from abc import ABC, abstractmethod
-from typing import AsyncGenerator, List, Any, Tuple, TYPE_CHECKING
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    AsyncGenerator, Callable, Dict, Iterator, List, Any, Optional, Tuple, TYPE_CHECKING
+)
 from api.config import Config
+from api.loaders.connection_pool import PoolTimeoutError, redact_url
+
+if TYPE_CHECKING:  # pragma: no cover - only for type checking
+    from api.loaders.execution_policy import ExecutionPolicy
+
+# Dedicated executor for the blocking DB-API calls made while extracting a schema,
+# so large catalogs don't stall the event loop (and every other request on it).
+_schema_executor = ThreadPoolExecutor(
+    max_workers=Config.SCHEMA_LOADER_WORKERS,
+    thread_name_prefix="schema-loader",
+)
+
+# Executor for user queries; each runs one chunk fetch at a time on it
+_query_executor = ThreadPoolExecutor(
+    max_workers=Config.SQL_EXECUTOR_WORKERS,
+    thread_name_prefix="sql-query",
+)
+
+# Per-database semaphores capping concurrent queries, keyed by connection URL.
+# asyncio primitives belong to one event loop, so the loop is remembered too.
+_target_semaphores: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = {}
+
+
+def _target_semaphore(db_url: str) -> asyncio.Semaphore:
+    """Return the semaphore limiting concurrent queries against db_url."""
+    loop = asyncio.get_running_loop()
+    entry = _target_semaphores.get(db_url)
+    if entry is None or entry[0] is not loop:
+        entry = (loop, asyncio.Semaphore(max(1, Config.SQL_MAX_CONCURRENT_PER_TARGET)))
+        _target_semaphores[db_url] = entry
+    return entry[1]
+
+
+def _close_abandoned(
+    fetch: Future, rows_iter: Iterator, cancel_handle: "QueryCancelHandle",
+    semaphore: asyncio.Semaphore,
+) -> None:
+    """
+    Clean up after a query whose consumer went away while fetch was running.
+
+    Interrupts the statement, then closes the generator (releasing its
+    connection) once the fetch returns. The target's slot stays taken until
+    then, since the statement is still running on the server.
+    """
+    loop = asyncio.get_running_loop()
+    loop.run_in_executor(None, cancel_handle.cancel)
+
+    def _release(_closed: Future) -> None:
+        try:
+            loop.call_soon_threadsafe(semaphore.release)
+        except RuntimeError:
+            # The event loop is gone, and its semaphores with it
+            pass
+
+    fetch.add_done_callback(
+        lambda _: _query_executor.submit(rows_iter.close).add_done_callback(_release)
+    )
+
+
+class QueryCancelHandle:
+    """
+    Lets the event loop cancel a query that is running on a worker thread.
+
+    Loaders attach a callable that interrupts the statement on the server
+    (e.g. psycopg2's connection.cancel()) while it runs, and detach it before
+    the connection goes back to the pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancel: Optional[Callable[[], None]] = None
+        self.cancelled = False
+
+    def attach(self, cancel: Callable[[], None]) -> None:
+        """Register how to interrupt the running statement."""
+        with self._lock:
+            self._cancel = cancel
+
+    def detach(self) -> None:
+        """Forget the statement once it is no longer running."""
+        with self._lock:
+            self._cancel = None
+
+    def cancel(self) -> None:
+        """Interrupt the running statement, if any (blocking; run it off the loop)."""
+        with self._lock:
+            self.cancelled = True
+            cancel = self._cancel
+        if cancel is None:
+            return
+        try:
+            cancel()
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logging.warning("Failed to cancel running query: %s", e)
 
 
 class BaseLoader(ABC):
     """Abstract base class for data loaders."""
 
+    @staticmethod
+    async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run a blocking driver call on the schema loader executor.
+
+        Args:
+            func: The synchronous callable to run
+            *args: Positional arguments for the callable
+            **kwargs: Keyword arguments for the callable
+
+        Returns:
+            The callable's return value
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _schema_executor, functools.partial(func, *args, **kwargs)
+        )
+
     @staticmethod
     @abstractmethod
     async def load(_graph_id: str, _data) -> AsyncGenerator[tuple[bool, str], None]:
@@ -22,6 +141,156 @@ class BaseLoader(ABC):
         if TYPE_CHECKING:  # pragma: no cover - only for type checking
             yield True, ""
 
+    @staticmethod
+    @abstractmethod
+    async def extract_schema(_connection_url: str) -> Tuple[str, Dict[str, Any], Dict[str, Any]]:
+        """
+        Extract the catalog of the source database without writing to the graph.
+
+        Returns:
+            Tuple of (database name, entities, relationships) in the format
+            expected by load_to_graph
+        """
+
+    @staticmethod
+    @abstractmethod
+    def execute_sql_query_stream(
+        _sql_query: str,
+        _db_url: str,
+        _chunk_size: int,
+        _policy: Optional["ExecutionPolicy"] = None,
+        _cancel_handle: Optional[QueryCancelHandle] = None,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Execute a SQL query and yield its rows in chunks of at most chunk_size.
+
+        Implementations read rows through a server-side or unbuffered cursor
+        where possible, so the full result is never held in memory. Closing
+        the generator early releases the connection. If a policy is given,
+        read statements run in a READ ONLY transaction under its statement
+        timeout, and a timeout surfaces as QueryTimeoutError. While the
+        statement runs, cancel_handle can interrupt it on the server.
+        """
+
+    @staticmethod
+    @abstractmethod
+    def explain_sql_query(_sql_query: str, _db_url: str) -> Dict[str, Any]:
+        """
+        Return the planner's estimate for a query without running it.
+
+        Returns:
+            Dict with estimated_rows (the most rows any plan step is expected
+            to produce or examine), estimated_cost (in the planner's units)
+            and plan (a short, human-readable summary of the plan steps)
+        """
+
+    @classmethod
+    async def estimate_sql_query_cost(cls, sql_query: str, db_url: str) -> Dict[str, Any]:
+        """Run explain_sql_query on the query executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _query_executor, cls.explain_sql_query, sql_query, db_url
+        )
+
+    @staticmethod
+    def _operation_result(sql_query: str, affected_rows: int) -> List[Dict[str, Any]]:
+        """Describe the outcome of a statement that returns no rows."""
+        sql_type = sql_query.strip().split()[0].upper()
+
+        if sql_type in ['INSERT', 'UPDATE', 'DELETE']:
+            return [{
+                "operation": sql_type,
+                "affected_rows": affected_rows,
+                "status": "success"
+            }]
+        # For other types of queries (CREATE, DROP, etc.)
+        return [{
+            "operation": sql_type,
+            "status": "success"
+        }]
+
+    @classmethod
+    async def stream_sql_query(
+        cls,
+        sql_query: str,
+        db_url: str,
+        *,
+        chunk_size: Optional[int] = None,
+        max_rows: Optional[int] = None,
+        policy: Optional["ExecutionPolicy"] = None,
+    ) -> AsyncGenerator[Tuple[List[Dict[str, Any]], bool], None]:
+        """
+        Run a query on the query executor and yield (rows, truncated) chunks.
+
+        At most SQL_MAX_CONCURRENT_PER_TARGET queries run against one database
+        at a time; others wait without holding a worker thread, and give up
+        with PoolTimeoutError after DB_POOL_CHECKOUT_TIMEOUT. Reading stops
+        after max_rows rows; the chunk that reaches the cap is yielded with
+        truncated=True and the rest of the result is discarded. If the
+        consumer goes away (e.g. the client disconnects) while a chunk is
+        being fetched, the statement is cancelled on the server.
+        """
+        chunk_size = chunk_size or Config.SQL_RESULT_CHUNK_ROWS
+        max_rows = max_rows or Config.SQL_RESULT_MAX_ROWS
+
+        semaphore = _target_semaphore(db_url)
+        try:
+            await asyncio.wait_for(semaphore.acquire(), Config.DB_POOL_CHECKOUT_TIMEOUT)
+        except asyncio.TimeoutError as e:
+            raise PoolTimeoutError(
+                f"Too many queries running against {redact_url(db_url)}; "
+                f"gave up after {Config.DB_POOL_CHECKOUT_TIMEOUT}s"
+            ) from e
+
+        cancel_handle = QueryCancelHandle()
+        rows_iter = cls.execute_sql_query_stream(
+            sql_query, db_url, chunk_size, policy, cancel_handle
+        )
+        fetch: Optional[Future] = None
+
+        async def next_chunk() -> Optional[List[Dict[str, Any]]]:
+            nonlocal fetch
+            fetch = _query_executor.submit(next, rows_iter, None)
+            return await asyncio.wrap_future(fetch)
+
+        sent = 0
+        try:
+            while True:
+                rows = await next_chunk()
+                if rows is None:
+                    return
+                if sent + len(rows) >= max_rows:
+                    # Peek one more chunk only if the cap falls exactly on a boundary
+                    more = len(rows) > max_rows - sent or (await next_chunk()) is not None
+                    yield rows[: max_rows - sent], more
+                    return
+                sent += len(rows)
+                yield rows, False
+        finally:
+            if fetch is not None and not fetch.done():
+                _close_abandoned(fetch, rows_iter, cancel_handle, semaphore)
+            else:
+                try:
+                    await asyncio.wrap_future(_query_executor.submit(rows_iter.close))
+                finally:
+                    semaphore.release()
+
+    @classmethod
+    def execute_sql_query(cls, sql_query: str, db_url: str) -> List[Dict[str, Any]]:
+        """
+        Execute a SQL query and return all of its rows.
+
+        Prefer stream_sql_query for user queries; this is for callers that
+        need the complete (and presumably small) result at once.
+        """
+        return [
+            row
+            for chunk in cls.execute_sql_query_stream(
+                sql_query, db_url, Config.SQL_RESULT_CHUNK_ROWS
+            )
+            for row in chunk
+        ]
+
     @staticmethod
     @abstractmethod
     def _execute_count_query(cursor, table_name: str, col_name: str) -> Tuple[int, int]:
@@ -0,0 +1,284 @@
+"""Connection pools for customer databases, shared by the SQL loaders.
+
+One pool is kept per connection URL. Pools open connections lazily up to
+DB_POOL_MAX_SIZE, which is also the number of queries that may run against one
+target at a time; further callers wait up to DB_POOL_CHECKOUT_TIMEOUT for a
+connection. Idle connections beyond DB_POOL_MIN_SIZE are closed after
+DB_POOL_IDLE_TIMEOUT, and a connection that has been idle for more than
+DB_POOL_HEALTHCHECK_INTERVAL is pinged before it is handed out.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from api.config import Config
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection to a target becomes free within the checkout timeout."""
+
+
+def redact_url(db_url: str) -> str:
+    """Return db_url without its password, for logs and monitoring."""
+    try:
+        parsed = urlparse(db_url)
+        host = parsed.hostname or ""
+        if parsed.port:
+            host = f"{host}:{parsed.port}"
+        user = f"{parsed.username}@" if parsed.username else ""
+        return f"{parsed.scheme}://{user}{host}{parsed.path}"
+    except ValueError:
+        return "<unparseable url>"
+
+
+class ConnectionPool:  # pylint: disable=too-many-instance-attributes
+    """A thread-safe pool of DB-API connections to a single target."""
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        identity: str,
+        connect: Callable[[], Any],
+        ping: Callable[[Any], None],
+        *,
+        min_size: int,
+        max_size: int,
+        idle_timeout: float,
+        healthcheck_interval: float,
+        checkout_timeout: float,
+    ):
+        self.identity = identity
+        self._connect = connect
+        self._ping = ping
+        self.min_size = min_size
+        self.max_size = max(1, max_size)
+        self.idle_timeout = idle_timeout
+        self.healthcheck_interval = healthcheck_interval
+        self.checkout_timeout = checkout_timeout
+
+        self._cond = threading.Condition()
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        self._size = 0
+        self._closed = False
+        self.last_used = time.monotonic()
+        self._counters = {
+            "checkouts": 0,
+            "created": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "evicted_idle": 0,
+            "healthcheck_failures": 0,
+        }
+
+    @staticmethod
+    def _close(conn) -> None:
+        try:
+            conn.close()
+        except Exception:  # pylint: disable=broad-exception-caught
+            pass
+
+    def _evict_idle_locked(self) -> List[Any]:
+        """Pop connections idle past the timeout, keeping min_size; caller closes them."""
+        now = time.monotonic()
+        evicted = []
+        # The deque is ordered oldest-returned first
+        while self._idle and self._size > self.min_size:
+            conn, returned_at = self._idle[0]
+            if now - returned_at < self.idle_timeout:
+                break
+            self._idle.popleft()
+            self._size -= 1
+            self._counters["evicted_idle"] += 1
+            evicted.append(conn)
+        return evicted
+
+    def evict_idle(self) -> None:
+        """Close connections that have been idle longer than idle_timeout."""
+        with self._cond:
+            evicted = self._evict_idle_locked()
+        for conn in evicted:
+            self._close(conn)
+
+    def acquire(self):
+        """Check out a healthy connection, opening one if the pool has room."""
+        deadline = time.monotonic() + self.checkout_timeout
+        with self._cond:
+            self._counters["checkouts"] += 1
+        while True:
+            conn, returned_at, create = None, 0.0, False
+            with self._cond:
+                evicted = self._evict_idle_locked()
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters["timeouts"] += 1
+                        raise PoolTimeoutError(
+                            f"No free connection to {self.identity} after "
+                            f"{self.checkout_timeout}s ({self.max_size} in use)"
+                        )
+                    self._counters["waits"] += 1
+                    self._cond.wait(remaining)
+                if self._idle:
+                    conn, returned_at = self._idle.pop()  # most recently used first
+                else:
+                    self._size += 1
+                    create = True
+                self.last_used = time.monotonic()
+
+            for stale in evicted:
+                self._close(stale)
+
+            if create:
+                try:
+                    conn = self._connect()
+                except BaseException:
+                    self._discard_slot()
+                    raise
+                with self._cond:
+                    self._counters["created"] += 1
+                return conn
+
+            if time.monotonic() - returned_at < self.healthcheck_interval:
+                return conn
+            try:
+                self._ping(conn)
+                return conn
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logging.info("Dropping dead pooled connection to %s: %s", self.identity, e)
+                with self._cond:
+                    self._counters["healthcheck_failures"] += 1
+                self._close(conn)
+                self._discard_slot()
+
+    def _discard_slot(self) -> None:
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def release(self, conn, discard: bool = False) -> None:
+        """Return a connection to the pool, or close it if it can't be reused."""
+        with self._cond:
+            discard = discard or self._closed
+        if discard:
+            self._close(conn)
+            self._discard_slot()
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self.last_used = time.monotonic()
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """
+        Check out a connection for the duration of the block.
+
+        If the block raises, the transaction is rolled back; a connection that
+        can't even roll back is closed instead of being returned to the pool.
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            try:
+                conn.rollback()
+                reusable = True
+            except Exception:  # pylint: disable=broad-exception-caught
+                reusable = False
+            self.release(conn, discard=not reusable)
+            raise
+        self.release(conn)
+
+    def close_all(self) -> None:
+        """Close the pool: idle connections now, checked-out ones on release."""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._size -= len(idle)
+            self._idle.clear()
+        for conn in idle:
+            self._close(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool occupancy and counters, safe to expose for monitoring."""
+        with self._cond:
+            return {
+                "target": self.identity,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                **self._counters,
+            }
+
+
+class PoolRegistry:
+    """Process-wide registry of connection pools keyed by connection URL."""
+
+    def __init__(self):
+        self._pools: Dict[str, ConnectionPool] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        db_url: str,
+        connect: Callable[[], Any],
+        ping: Callable[[Any], None],
+    ) -> ConnectionPool:
+        """Return the pool for db_url, creating it with the configured limits."""
+        self._evict_unused()
+        with self._lock:
+            pool = self._pools.get(db_url)
+            if pool is None:
+                pool = ConnectionPool(
+                    redact_url(db_url),
+                    connect,
+                    ping,
+                    min_size=Config.DB_POOL_MIN_SIZE,
+                    max_size=Config.DB_POOL_MAX_SIZE,
+                    idle_timeout=Config.DB_POOL_IDLE_TIMEOUT,
+                    healthcheck_interval=Config.DB_POOL_HEALTHCHECK_INTERVAL,
+                    checkout_timeout=Config.DB_POOL_CHECKOUT_TIMEOUT,
+                )
+                self._pools[db_url] = pool
+            return pool
+
+    def _evict_unused(self) -> None:
+        """Trim idle connections and forget pools nobody has used for a while."""
+        with self._lock:
+            pools = list(self._pools.items())
+        now = time.monotonic()
+        for db_url, pool in pools:
+            pool.evict_idle()
+            stats = pool.stats()
+            if not stats["in_use"] and now - pool.last_used > Config.DB_POOL_IDLE_TIMEOUT:
+                pool.close_all()
+                with self._lock:
+                    if self._pools.get(db_url) is pool:
+                        del self._pools[db_url]
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Return the stats of every pool."""
+        with self._lock:
+            pools = list(self._pools.values())
+        return [pool.stats() for pool in pools]
+
+    def close_all(self, db_url: Optional[str] = None) -> None:
+        """Close the idle connections of one pool (or all pools) and forget it."""
+        with self._lock:
+            if db_url is None:
+                pools = list(self._pools.values())
+                self._pools.clear()
+            else:
+                pool = self._pools.pop(db_url, None)
+                pools = [pool] if pool else []
+        for pool in pools:
+            pool.close_all()
+
+
+pool_registry = PoolRegistry()
@@ -0,0 +1,222 @@
+"""Guardrails applied when running generated SQL against a customer database.
+
+Read statements get a row LIMIT (injected, or clamped if the query asks for
+more), run in a READ ONLY transaction and are cancelled by the database after
+a statement timeout. Optionally their EXPLAIN estimate is checked against a
+budget first. Limits are configured globally in Config and can be
+overridden per graph (see api.core.graph_settings).
+"""
+
+import dataclasses
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from api.config import Config
+
+# Statements that only read data
+READ_STATEMENTS = {'SELECT', 'WITH', 'VALUES', 'TABLE', 'SHOW', 'EXPLAIN', 'DESCRIBE', 'DESC'}
+
+# A bind parameter standing for a LIMIT or OFFSET: $1, ?, :name, %s or %(name)s
+_PARAMETER = r"(?:\$\d+|\?|:\w+|%s|%\(\w+\)s)"
+# Trailing "LIMIT n", "LIMIT n OFFSET m" or MySQL's "LIMIT m, n"
+_TRAILING_LIMIT_RE = re.compile(
+    rf"\bLIMIT\s+(?:(?P<offset>\d+|{_PARAMETER})\s*,\s*)?(?P<count>\d+|{_PARAMETER})"
+    rf"(?P<tail>\s+OFFSET\s+(?:\d+|{_PARAMETER}))?\s*$",
+    re.IGNORECASE,
+)
+# Trailing clauses a LIMIT can't simply be appended after
+_UNLIMITABLE_TAIL_RE = re.compile(
+    r"\b(?:FETCH\s+(?:FIRST|NEXT)\b.*|FOR\s+(?:UPDATE|SHARE|NO\s+KEY\s+UPDATE|KEY\s+SHARE)\b.*"
+    r"|LOCK\s+IN\s+SHARE\s+MODE|LIMIT\s+ALL)\s*$",
+    re.IGNORECASE | re.DOTALL,
+)
+# An aggregate call in _top_level text; followed by OVER it's a window
+# function, which keeps every row
+_AGGREGATE_RE = re.compile(
+    r"\b(?:COUNT|SUM|AVG|MIN|MAX)\s*\(\s*\)(?!\s*(?:FILTER\s*\(\s*\)\s*)?OVER\b)",
+    re.IGNORECASE,
+)
+# Statements writing data, also as the main statement or a CTE of a WITH
+_DATA_MODIFYING_RE = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+# Row locks of a read ("FOR UPDATE"), which don't modify data
+_ROW_LOCK_RE = re.compile(r"\bFOR\s+(?:NO\s+KEY\s+)?UPDATE\b", re.IGNORECASE)
+_STRING_OR_COMMENT_RE = re.compile(
+    r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`|--[^\n]*|/\*.*?\*/", re.DOTALL
+)
+
+
+# What to do with a read query whose EXPLAIN estimate is over budget
+COST_GATE_MODES = ("off", "reject", "confirm")
+
+
+class QueryTimeoutError(Exception):
+    """Raised when the database cancels a query for exceeding its statement timeout."""
+
+
+class QueryCancelledError(Exception):
+    """Raised when a query is cancelled because its caller went away."""
+
+
+class QueryCostError(Exception):
+    """Raised when a query is rejected because its estimated cost is over budget."""
+
+
+def first_keyword(sql_query: str) -> str:
+    """Return the first keyword of a statement, upper-cased."""
+    stripped = _STRING_OR_COMMENT_RE.sub(" ", sql_query).strip().lstrip("(")
+    return stripped.split(None, 1)[0].upper() if stripped else ""
+
+
+def statement_keyword(sql_query: str) -> str:
+    """
+    Return the keyword of what a statement does, upper-cased.
+
+    That is its first keyword, except for a WITH statement that modifies
+    data, either in its main statement ("WITH old AS (...) DELETE ...") or
+    in a CTE ("WITH d AS (DELETE ... RETURNING *) SELECT ..."): then it's
+    the data-modifying keyword.
+    """
+    keyword = first_keyword(sql_query)
+    if keyword == "WITH":
+        text = _ROW_LOCK_RE.sub(" ", _STRING_OR_COMMENT_RE.sub(" ", sql_query))
+        modifying = _DATA_MODIFYING_RE.search(text)
+        if modifying:
+            return modifying.group(1).upper()
+    return keyword
+
+
+def is_read_statement(sql_query: str) -> bool:
+    """Return True for statements that only read data."""
+    return statement_keyword(sql_query) in READ_STATEMENTS
+
+
+def _top_level(sql_query: str) -> str:
+    """
+    Blank out literals, comments and the insides of parentheses.
+
+    The result has the same length as sql_query, so positions map back to it.
+    Outermost parentheses are kept, so "COUNT(x)" reads as "COUNT( )".
+    """
+    text = _STRING_OR_COMMENT_RE.sub(lambda m: " " * len(m.group(0)), sql_query)
+    out, depth = [], 0
+    for char in text:
+        if char == "(":
+            out.append("(" if depth == 0 else " ")
+            depth += 1
+        elif char == ")":
+            depth = max(depth - 1, 0)
+            out.append(")" if depth == 0 else " ")
+        else:
+            out.append(char if depth == 0 else " ")
+    return "".join(out)
+
+
+def _is_aggregating(top: str) -> bool:
+    """
+    Return True if the outer query (given by _top_level) groups or aggregates rows.
+
+    A LIMIT on these would silently drop groups the answer is about, and their
+    row count is bounded by the grouping anyway.
+    """
+    if re.search(r"\bGROUP\s+BY\b", top, re.IGNORECASE):
+        return True
+    if re.search(r"\b(?:UNION|INTERSECT|EXCEPT)\b", top, re.IGNORECASE):
+        return False
+    select_list = re.search(r"\bSELECT\b(.*?)(?:\bFROM\b|$)", top, re.IGNORECASE | re.DOTALL)
+    return bool(select_list and _AGGREGATE_RE.search(select_list.group(1)))
+
+
+def apply_row_limit(sql_query: str, row_limit: int) -> Tuple[str, Optional[str]]:
+    """
+    Inject or clamp a LIMIT on a non-aggregating SELECT.
+
+    Returns:
+        The (possibly rewritten) query and "injected", "clamped" or None
+    """
+    if row_limit <= 0 or statement_keyword(sql_query) not in ("SELECT", "WITH", "VALUES", "TABLE"):
+        return sql_query, None
+
+    query = sql_query.strip().rstrip(";").rstrip()
+    top = _top_level(query)
+    if ";" in top or _UNLIMITABLE_TAIL_RE.search(top) or _is_aggregating(top):
+        return sql_query, None
+
+    match = _TRAILING_LIMIT_RE.search(top)
+    if match:
+        if not match.group("count").isdigit():
+            # A bind parameter; its value isn't known here
+            return sql_query, None
+        if int(match.group("count")) <= row_limit:
+            return sql_query, None
+        start, end = match.span("count")
+        return f"{query[:start]}{row_limit}{query[end:]}", "clamped"
+
+    return f"{query}\nLIMIT {row_limit}", "injected"
+
+
+@dataclasses.dataclass
+class ExecutionPolicy:
+    """Limits applied to one query execution, and whether its result may be cached."""
+
+    row_limit: int = dataclasses.field(default_factory=lambda: Config.SQL_ROW_LIMIT)
+    statement_timeout_ms: int = dataclasses.field(
+        default_factory=lambda: Config.SQL_STATEMENT_TIMEOUT_MS
+    )
+    read_only: bool = True
+    result_cache: bool = dataclasses.field(
+        default_factory=lambda: Config.SQL_RESULT_CACHE_TTL > 0
+    )
+    cost_gate: str = dataclasses.field(default_factory=lambda: Config.SQL_COST_GATE)
+    max_estimated_rows: int = dataclasses.field(
+        default_factory=lambda: Config.SQL_MAX_ESTIMATED_ROWS
+    )
+    max_estimated_cost: float = dataclasses.field(
+        default_factory=lambda: Config.SQL_MAX_ESTIMATED_COST
+    )
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Dict[str, Any]]) -> "ExecutionPolicy":
+        """Build the policy for a graph from its settings, falling back to Config."""
+        settings = settings or {}
+        policy = cls()
+        for field in dataclasses.fields(cls):
+            if settings.get(field.name) is not None:
+                setattr(policy, field.name, settings[field.name])
+        return policy
+
+    def prepare(self, sql_query: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        Rewrite sql_query under this policy.
+
+        Returns:
+            The query to execute and a report of the guardrails applied to it
+        """
+        is_read = is_read_statement(sql_query)
+        sql_query, limit_action = apply_row_limit(sql_query, self.row_limit)
+        report = {
+            "limit": self.row_limit if limit_action else None,
+            "limit_action": limit_action,
+            "read_only": is_read and self.read_only,
+            "statement_timeout_ms": self.statement_timeout_ms if is_read else 0,
+        }
+        return sql_query, report
+
+    @property
+    def checks_cost(self) -> bool:
+        """Whether read queries are EXPLAINed and gated before they run."""
+        return self.cost_gate in ("reject", "confirm") and bool(
+            self.max_estimated_rows or self.max_estimated_cost
+        )
+
+    def cost_violations(self, estimate: Dict[str, Any]) -> List[str]:
+        """Describe how an EXPLAIN estimate exceeds this policy's thresholds."""
+        violations = []
+        if self.max_estimated_rows and estimate["estimated_rows"] > self.max_estimated_rows:
+            violations.append(
+                f"~{estimate['estimated_rows']:,} rows (limit {self.max_estimated_rows:,})"
+            )
+        if self.max_estimated_cost and estimate["estimated_cost"] > self.max_estimated_cost:
+            violations.append(
+                f"cost {estimate['estimated_cost']:,.0f} (limit {self.max_estimated_cost:,.0f})"
+            )
+        return violations
@@ -1,72 +1,351 @@
 """Graph loader module for loading data into graph databases."""
 
+import asyncio
+import contextlib
 import json
+import logging
+import re
+import time
+
+from typing import Awaitable, Callable, Optional
 
 import tqdm
+from redis.exceptions import WatchError
 
 from api.config import Config
 from api.extensions import db
 from api.utils import generate_db_description
 
 
-async def load_to_graph(  # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
+STAGING_GRAPH_SUFFIX = "__staging"
+RETIRED_GRAPH_SUFFIX = "__retired"
+
+_RETIRED_GRAPH_RE = re.compile(re.escape(RETIRED_GRAPH_SUFFIX) + r"_(\d+)$")
+
+# A reload refreshes this key while it builds, so the startup sweep of another
+# process leaves its staging graph alone
+BUILD_LEASE_PREFIX = "graph:building:"
+BUILD_LEASE_SECONDS = 60
+
+# Per-graph locks so two reloads of the same graph in this process don't share
+# a staging graph, with the number of reloads holding or waiting for each
+_reload_locks: dict[str, tuple[asyncio.Lock, int]] = {}
+# Strong references to pending retired-graph drops (asyncio only keeps weak ones)
+_retire_tasks: set[asyncio.Task] = set()
+
+
+def staging_graph_name(graph_id: str) -> str:
+    """Return the name of the staging graph a reload of graph_id is built into."""
+    return f"{graph_id}{STAGING_GRAPH_SUFFIX}"
+
+
+def is_internal_graph_name(graph_name: str) -> bool:
+    """Return True for staging/retired graphs that must not be listed to users."""
+    return graph_name.endswith(STAGING_GRAPH_SUFFIX) or bool(
+        _RETIRED_GRAPH_RE.search(graph_name)
+    )
+
+
+async def _drop_graph(graph_id: str, delay: float = 0) -> None:
+    """Delete a graph, optionally after a grace period, ignoring missing graphs."""
+    if delay:
+        await asyncio.sleep(delay)
+    try:
+        await db.select_graph(graph_id).delete()
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logging.debug("Graph %s not dropped: %s", graph_id, e)
+
+
+def _retire_later(graph_id: str, delay: float) -> None:
+    """Drop a retired graph after delay seconds, keeping a reference to the task."""
+    task = asyncio.create_task(_drop_graph(graph_id, delay=delay))
+    _retire_tasks.add(task)
+    task.add_done_callback(_retire_tasks.discard)
+
+
+async def swap_graph(staging_id: str, graph_id: str) -> None:
+    """
+    Atomically replace graph_id with the fully built staging graph.
+
+    The previous version is renamed aside in the same MULTI/EXEC transaction and
+    only deleted after GRAPH_RETIRE_GRACE_SECONDS, so readers that already hold
+    results from it are not cut off mid-request. graph_id is WATCHed, so the
+    transaction is retried if the live graph appears or disappears meanwhile.
+    """
+    conn = db.connection
+    async with conn.pipeline(transaction=True) as pipe:
+        while True:
+            retired_id = f"{graph_id}{RETIRED_GRAPH_SUFFIX}_{int(time.time() * 1000)}"
+            try:
+                await pipe.watch(graph_id)
+                has_live_graph = bool(await pipe.exists(graph_id))
+                pipe.multi()
+                if has_live_graph:
+                    pipe.rename(graph_id, retired_id)
+                pipe.rename(staging_id, graph_id)
+                await pipe.execute()
+                break
+            except WatchError:
+                continue
+
+    if has_live_graph:
+        _retire_later(retired_id, Config.GRAPH_RETIRE_GRACE_SECONDS)
+
+
+async def drop_staging_graph(graph_id: str) -> None:
+    """Delete the staging graph of graph_id, if any."""
+    await _drop_graph(staging_graph_name(graph_id))
+
+
+async def cleanup_internal_graphs(keep_staging: Optional[set[str]] = None) -> None:
+    """
+    Drop staging and retired graphs left behind by a process that stopped mid-reload.
+
+    Run at startup. Retired graphs are dropped once their grace period is over.
+    Staging graphs are dropped unless a reload is building them (its lease is
+    set) or their graph id is in keep_staging (e.g. an unfinished ingestion job
+    will resume them).
+    """
+    keep_staging = keep_staging or set()
+    conn = db.connection
+    for graph_name in await db.list_graphs():
+        retired = _RETIRED_GRAPH_RE.search(graph_name)
+        if retired:
+            retired_at = int(retired.group(1)) / 1000
+            remaining = retired_at + Config.GRAPH_RETIRE_GRACE_SECONDS - time.time()
+            _retire_later(graph_name, max(0.0, remaining))
+        elif graph_name.endswith(STAGING_GRAPH_SUFFIX):
+            graph_id = graph_name[:-len(STAGING_GRAPH_SUFFIX)]
+            if graph_id in keep_staging or await conn.exists(f"{BUILD_LEASE_PREFIX}{graph_id}"):
+                continue
+            logging.info("Dropping abandoned staging graph %s", graph_name)
+            await _drop_graph(graph_name)
+
+
+async def load_to_graph(  # pylint: disable=too-many-arguments,too-many-positional-arguments
     graph_id: str,
     entities: dict,
     relationships: dict,
     batch_size: int = 100,
     db_name: str = "TBD",
     db_url: str = "",
+    *,
+    completed_tables: Optional[set[str]] = None,
+    on_table_loaded: Optional[Callable[[str], Awaitable[None]]] = None,
+    keep_staging_on_failure: Optional[bool] = None,
 ) -> None:
     """
     Load the graph data into the database.
     It gets the Graph name as an argument and expects
 
+    The schema is built into a staging graph and swapped in only once it is
+    complete, so concurrent queries never see an empty or partial schema and a
+    failed load leaves the previous graph untouched.
+
     Input:
     - entities: A dictionary containing the entities and their attributes.
     - relationships: A dictionary containing the relationships between entities.
     - batch_size: The size of the batch for embedding.
     - db_name: The name of the database.
+    - completed_tables: Tables already written to the staging graph by a previous
+      attempt. When given, the build resumes that staging graph instead of
+      starting over.
+    - on_table_loaded: Awaited with each table name once its node, columns and
+      embeddings are written (used for checkpointing).
+    - keep_staging_on_failure: Keep the staging graph if the build fails, for
+      a later resume (default: only when resuming).
     """
-    graph = db.select_graph(graph_id)
-    embedding_model = Config.EMBEDDING_MODEL
-    vec_len = embedding_model.get_vector_size()
+    resume = completed_tables is not None
+    if keep_staging_on_failure is None:
+        keep_staging_on_failure = resume
+
+    async def _build(graph) -> None:
+        await _build_graph(
+            graph, entities, relationships,
+            batch_size=batch_size, db_name=db_name, db_url=db_url,
+            completed_tables=completed_tables,
+            on_table_loaded=on_table_loaded,
+        )
+
+    await rebuild_graph(graph_id, _build, resume=resume,
+                        keep_on_failure=keep_staging_on_failure)
+
+
+async def rebuild_graph(
+    graph_id: str,
+    build: Callable[[object], Awaitable[None]],
+    *,
+    resume: bool = False,
+    keep_on_failure: Optional[bool] = None,
+) -> None:
+    """
+    Run build against the staging graph of graph_id and swap it in on success.
+
+    Unless resume is set, the staging graph starts empty. It is dropped if the
+    build fails, unless keep_on_failure (default: resume) is set so the next
+    attempt can continue it.
+    """
+    if keep_on_failure is None:
+        keep_on_failure = resume
+    async with _reload_lock(graph_id), _build_lease(graph_id):
+        staging_id = staging_graph_name(graph_id)
+        if not resume:
+            # Leftovers from a crashed load must not leak into this build
+            await _drop_graph(staging_id)
+
+        try:
+            await build(db.select_graph(staging_id))
+            await _carry_over_settings(graph_id, staging_id)
+        except BaseException:
+            if not keep_on_failure:
+                await _drop_graph(staging_id)
+            raise
+
+        await swap_graph(staging_id, graph_id)
 
+
+@contextlib.asynccontextmanager
+async def _reload_lock(graph_id: str):
+    """Hold the per-graph reload lock, dropping it once no reload uses it."""
+    lock, users = _reload_locks.get(graph_id, (asyncio.Lock(), 0))
+    _reload_locks[graph_id] = (lock, users + 1)
     try:
-        # Create vector indices
-        await graph.query(
+        async with lock:
+            yield
+    finally:
+        lock, users = _reload_locks[graph_id]
+        if users == 1:
+            del _reload_locks[graph_id]
+        else:
+            _reload_locks[graph_id] = (lock, users - 1)
+
+
+@contextlib.asynccontextmanager
+async def _build_lease(graph_id: str):
+    """Keep the build lease of graph_id set for as long as the block runs."""
+    conn = db.connection
+    key = f"{BUILD_LEASE_PREFIX}{graph_id}"
+
+    async def _renew() -> None:
+        while True:
+            await asyncio.sleep(BUILD_LEASE_SECONDS / 3)
+            await conn.set(key, "1", ex=BUILD_LEASE_SECONDS)
+
+    await conn.set(key, "1", ex=BUILD_LEASE_SECONDS)
+    renewal = asyncio.create_task(_renew())
+    try:
+        yield
+    finally:
+        renewal.cancel()
+        await asyncio.shield(conn.delete(key))
+
+
+async def _carry_over_settings(graph_id: str, staging_id: str) -> None:
+    """Copy the live graph's settings and replica URLs onto the rebuilt Database node."""
+    if not await db.connection.exists(graph_id):
+        return
+    live = await db.select_graph(graph_id).query(
+        "MATCH (d:Database) RETURN d.settings, d.replica_urls LIMIT 1"
+    )
+    if not live.result_set:
+        return
+    settings, replica_urls = live.result_set[0]
+    if settings is None and replica_urls is None:
+        return
+    await db.select_graph(staging_id).query(
+        "MATCH (d:Database) SET d.settings = $settings, d.replica_urls = $replica_urls",
+        {"settings": settings, "replica_urls": replica_urls},
+    )
+
+
+def column_key(table_name: str, column_name: str) -> str:
+    """Return the table-qualified key that identifies a Column node."""
+    return f"{table_name}.{column_name}"
+
+
+async def create_schema_indexes(graph, vec_len: int) -> None:
+    """Create the vector and lookup indexes the schema graph queries rely on."""
+    statements = [
+        # Vector indices
+        (
             """
             CREATE VECTOR INDEX FOR (t:Table) ON (t.embedding)
             OPTIONS {dimension:$size, similarityFunction:'euclidean'}
-        """,
+            """,
             {"size": vec_len},
-        )
-
-        await graph.query(
+        ),
+        (
             """
             CREATE VECTOR INDEX FOR (c:Column) ON (c.embedding)
             OPTIONS {dimension:$size, similarityFunction:'euclidean'}
-        """,
+            """,
             {"size": vec_len},
+        ),
+        # Lookup indices: tables by name, columns by table-qualified key
+        # (edge creation) and by bare name (ad-hoc lookups)
+        ("CREATE INDEX FOR (p:Table) ON (p.name)", None),
+        ("CREATE INDEX FOR (c:Column) ON (c.qualified_name)", None),
+        ("CREATE INDEX FOR (c:Column) ON (c.name)", None),
+    ]
+    for statement, params in statements:
+        # Each index is attempted on its own so one failure doesn't skip the rest
+        try:
+            await graph.query(statement, params)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print(f"Error creating index: {str(e)}")
+
+
+async def _build_graph(  # pylint: disable=too-many-arguments,too-many-locals,too-many-branches,too-many-statements
+    graph,
+    entities: dict,
+    relationships: dict,
+    *,
+    batch_size: int,
+    db_name: str,
+    db_url: str,
+    completed_tables: Optional[set[str]],
+    on_table_loaded: Optional[Callable[[str], Awaitable[None]]],
+) -> None:
+    """Create the Database, Table and Column nodes and their relationships in graph."""
+    embedding_model = Config.EMBEDDING_MODEL
+    # Embedding and completion calls are blocking HTTP requests; run them in
+    # worker threads so a long load doesn't stall other requests on the loop.
+    vec_len = await asyncio.to_thread(embedding_model.get_vector_size)
+
+    await create_schema_indexes(graph, vec_len)
+
+    existing = await graph.query("MATCH (d:Database) RETURN count(d)")
+    if not existing.result_set or not existing.result_set[0][0]:
+        db_des = await asyncio.to_thread(
+            generate_db_description, db_name=db_name, table_names=list(entities.keys())
+        )
+        await graph.query(
+            """
+            CREATE (d:Database {
+                name: $db_name,
+                description: $description,
+                url: $url
+            })
+            """,
+            {"db_name": db_name, "description": db_des, "url": db_url},
         )
-        await graph.query("CREATE INDEX FOR (p:Table) ON (p.name)")
-    except Exception as e:  # pylint: disable=broad-exception-caught
-        print(f"Error creating vector indices: {str(e)}")
-
-    db_des = generate_db_description(db_name=db_name, table_names=list(entities.keys()))
-    await graph.query(
-        """
-        CREATE (d:Database {
-            name: $db_name,
-            description: $description,
-            url: $url
-        })
-        """,
-        {"db_name": db_name, "description": db_des, "url": db_url},
-    )
 
     for table_name, table_info in tqdm.tqdm(entities.items(), desc="Creating Graph Table Nodes"):
+        if completed_tables is not None:
+            if table_name in completed_tables:
+                continue
+            # A table interrupted mid-write by a previous attempt is rewritten from scratch
+            await graph.query(
+                """
+                MATCH (t:Table {name: $table_name})
+                OPTIONAL MATCH (c:Column)-[:BELONGS_TO]->(t)
+                DETACH DELETE c, t
+                """,
+                {"table_name": table_name},
+            )
+
         table_desc = table_info["description"]
-        embedding_result = embedding_model.embed(table_desc)
+        embedding_result = await asyncio.to_thread(embedding_model.embed, table_desc)
         fk = json.dumps(table_info.get("foreign_keys", []))
 
         # Create table node
@@ -105,13 +384,14 @@ async def load_to_graph(  # pylint: disable=too-many-arguments,too-many-position
                     desc=f"Creating embeddings for {table_name} columns",
                 ):
 
-                    embedding_result = embedding_model.embed(batch)
+                    embedding_result = await asyncio.to_thread(embedding_model.embed, batch)
                     embed_columns.extend(embedding_result)
             except Exception as e:  # pylint: disable=broad-exception-caught
                 print(f"Error creating embeddings: {str(e)}")
                 batch_flag = False
 
         # Create column nodes
+        column_rows = []
         for idx, (col_name, col_info) in tqdm.tqdm(
             enumerate(table_info["columns"].items()),
             desc=f"Creating Graph Columns for {table_name}",
@@ -119,66 +399,94 @@ async def load_to_graph(  # pylint: disable=too-many-arguments,too-many-position
         ):
             if not batch_flag:
                 embed_columns = []
-                embedding_result = embedding_model.embed(col_info["description"])
+                embedding_result = await asyncio.to_thread(
+                    embedding_model.embed, col_info["description"]
+                )
                 embed_columns.extend(embedding_result)
                 idx = 0
 
+            column_rows.append({
+                "col_name": col_name,
+                "qualified_name": column_key(table_name, col_name),
+                "type": col_info.get("type", "unknown"),
+                "nullable": col_info.get("null", "unknown"),
+                "key": col_info.get("key", "unknown"),
+                "description": col_info["description"],
+                "embedding": embed_columns[idx],
+            })
+
+        for i in range(0, len(column_rows), batch_size):
             await graph.query(
                 """
                 MATCH (t:Table {name: $table_name})
+                UNWIND $rows AS row
                 CREATE (c:Column {
-                    name: $col_name,
-                    type: $type,
-                    nullable: $nullable,
-                    key_type: $key,
-                    description: $description,
-                    embedding: vecf32($embedding)
+                    name: row.col_name,
+                    qualified_name: row.qualified_name,
+                    type: row.type,
+                    nullable: row.nullable,
+                    key_type: row.key,
+                    description: row.description,
+                    embedding: vecf32(row.embedding)
                 })-[:BELONGS_TO]->(t)
                 """,
-                {
-                    "table_name": table_name,
-                    "col_name": col_name,
-                    "type": col_info.get("type", "unknown"),
-                    "nullable": col_info.get("null", "unknown"),
-                    "key": col_info.get("key", "unknown"),
-                    "description": col_info["description"],
-                    "embedding": embed_columns[idx],
-                },
+                {"table_name": table_name, "rows": column_rows[i : i + batch_size]},
             )
 
+        if on_table_loaded is not None:
+            await on_table_loaded(table_name)
+
     # Create relationships
-    for rel_name, table_info in tqdm.tqdm(
-        relationships.items(), desc="Creating Graph Table Relationships"
+    rel_rows = [
+        {
+            "source": column_key(rel["from"], rel["source_column"]),
+            "target": column_key(rel["to"], rel["target_column"]),
+            "rel_name": rel_name,
+            "note": rel.get("note", ""),
+        }
+        for rel_name, table_info in relationships.items()
+        for rel in table_info
+    ]
+    await create_references(graph, rel_rows, batch_size=batch_size)
+
+
+_REFERENCES_QUERY = """
+    UNWIND $rows AS row
+    MATCH (src:Column {qualified_name: row.source})
+    MATCH (tgt:Column {qualified_name: row.target})
+    MERGE (src)-[:REFERENCES {
+        rel_name: row.rel_name,
+        note: row.note
+    }]->(tgt)
+"""
+
+
+async def create_references(graph, rows: list[dict], batch_size: int = 500) -> None:
+    """
+    Create REFERENCES edges between columns identified by their qualified keys.
+
+    Each row has source and target column keys (see column_key) plus rel_name
+    and note. Both endpoints are found through the Column.qualified_name index,
+    and rows whose columns don't exist are skipped. If a batch fails, its rows
+    are retried one at a time so a single bad row doesn't drop the others.
+    """
+    for i in tqdm.tqdm(
+        range(0, len(rows), batch_size), desc="Creating Graph Table Relationships"
     ):
-        for rel in table_info:
-            source_table = rel["from"]
-            source_field = rel["source_column"]
-            target_table = rel["to"]
-            target_field = rel["target_column"]
-            note = rel.get("note", "")
-
-            # Create relationship if both tables and columns exist
+        batch = rows[i : i + batch_size]
+        try:
+            await graph.query(_REFERENCES_QUERY, {"rows": batch})
+            continue
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logging.warning(
+                "Could not create relationships %d-%d of %d, retrying one by one: %s",
+                i, i + len(batch) - 1, len(rows), e,
+            )
+        for row in batch:
             try:
-                await graph.query(
-                    """
-                    MATCH (src:Column {name: $source_col})
-                        -[:BELONGS_TO]->(source:Table {name: $source_table})
-                    MATCH (tgt:Column {name: $target_col})
-                        -[:BELONGS_TO]->(target:Table {name: $target_table})
-                    CREATE (src)-[:REFERENCES {
-                        rel_name: $rel_name,
-                        note: $note
-                    }]->(tgt)
-                    """,
-                    {
-                        "source_col": source_field,
-                        "target_col": target_field,
-                        "source_table": source_table,
-                        "target_table": target_table,
-                        "rel_name": rel_name,
-                        "note": note,
-                    },
-                )
+                await graph.query(_REFERENCES_QUERY, {"rows": [row]})
             except Exception as e:  # pylint: disable=broad-exception-caught
-                print(f"Warning: Could not create relationship: {str(e)}")
-                continue
+                logging.warning(
+                    "Could not create relationship %s -> %s: %s",
+                    row.get("source"), row.get("target"), e,
+                )
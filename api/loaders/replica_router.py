@@ -0,0 +1,96 @@
+"""Routing of read-only queries across a graph's read replicas.
+
+Reads go to the healthy replica with the fewest connections in use (ties are
+broken round-robin); when no replica is healthy they fall back to the primary.
+A replica's health is probed by checking out a pooled connection, at most
+once per DB_REPLICA_HEALTHCHECK_INTERVAL, and a probe that fails or takes
+longer than DB_REPLICA_HEALTHCHECK_TIMEOUT marks it unhealthy until the next
+probe.
+"""
+
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from api.config import Config
+from api.loaders.connection_pool import redact_url
+
+
+class ReplicaRouter:
+    """Chooses the database URL a read-only query should run against."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # url -> (healthy, checked_at)
+        self._health: Dict[str, Tuple[bool, float]] = {}
+        self._turn = itertools.count()
+
+    @staticmethod
+    def _probe(loader_class, db_url: str) -> None:
+        """Check out (and so connect to or ping) a pooled connection; raises if unusable."""
+        with loader_class.connection_pool(db_url).connection():
+            pass
+
+    async def is_healthy(self, loader_class, db_url: str) -> bool:
+        """Return whether db_url is reachable, probing it if the last check is stale."""
+        with self._lock:
+            healthy, checked_at = self._health.get(db_url, (True, float("-inf")))
+        if time.monotonic() - checked_at < Config.DB_REPLICA_HEALTHCHECK_INTERVAL:
+            return healthy
+
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.wait_for(
+                loop.run_in_executor(None, self._probe, loader_class, db_url),
+                Config.DB_REPLICA_HEALTHCHECK_TIMEOUT,
+            )
+            healthy = True
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logging.warning("Read replica %s is unavailable: %s", redact_url(db_url), e)
+            healthy = False
+        with self._lock:
+            self._health[db_url] = (healthy, time.monotonic())
+        return healthy
+
+    async def choose(self, loader_class, primary_url: str, replica_urls: Sequence[str]) -> str:
+        """Return the replica a read should use, or primary_url if none is healthy."""
+        if not replica_urls:
+            return primary_url
+
+        turn = next(self._turn)
+        # Least connections in use first; rotating the start breaks ties round-robin
+        rotated = [replica_urls[(turn + i) % len(replica_urls)] for i in range(len(replica_urls))]
+        candidates = sorted(
+            rotated, key=lambda url: loader_class.connection_pool(url).stats()["in_use"]
+        )
+        for url in candidates:
+            if await self.is_healthy(loader_class, url):
+                return url
+        logging.info("No healthy read replica for %s, using the primary", redact_url(primary_url))
+        return primary_url
+
+    def status(self, replica_urls: Sequence[str]) -> List[Dict[str, Any]]:
+        """Return the last known health of each replica, with passwords redacted."""
+        with self._lock:
+            health = {url: self._health.get(url) for url in replica_urls}
+        return [
+            {
+                "url": redact_url(url),
+                "healthy": None if state is None else state[0],
+            }
+            for url, state in health.items()
+        ]
+
+    def forget(self, db_url: Optional[str] = None) -> None:
+        """Drop the cached health of one URL (or of all URLs)."""
+        with self._lock:
+            if db_url is None:
+                self._health.clear()
+            else:
+                self._health.pop(db_url, None)
+
+
+replica_router = ReplicaRouter()
@@ -0,0 +1,182 @@
+"""Cache of read-query results, shared by requests against the same database.
+
+Entries are keyed by the connection URL and the normalized SQL text. They
+expire after SQL_RESULT_CACHE_TTL seconds and are evicted least recently used
+once the cache holds more than SQL_RESULT_CACHE_MAX_BYTES. A write or DDL
+statement executed through QueryWeaver invalidates every entry for that
+database, whichever credentials were used to read it.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from api.config import Config
+
+# String literals and quoted identifiers, which normalization must not touch
+_QUOTED_RE = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*"|`[^`]*`)""")
+
+
+class CachedResult(NamedTuple):
+    """A cached query result."""
+
+    chunks: List[List[Dict[str, Any]]]
+    truncated: bool
+    created_at: float
+    size: int
+
+
+def normalize_sql(sql_query: str) -> str:
+    """Collapse whitespace outside literals and drop a trailing semicolon."""
+    parts = _QUOTED_RE.split(sql_query.strip())
+    # re.split puts the captured literals at the odd indices
+    for i in range(0, len(parts), 2):
+        parts[i] = re.sub(r"\s+", " ", parts[i])
+    return "".join(parts).strip().rstrip(";").rstrip()
+
+
+def database_identity(db_url: str) -> str:
+    """Return the database a URL points at, independent of the credentials used."""
+    try:
+        parsed = urlparse(db_url)
+        return f"{parsed.scheme}://{(parsed.hostname or '').lower()}:{parsed.port}{parsed.path}"
+    except ValueError:
+        return db_url
+
+
+class ResultCache:  # pylint: disable=too-many-instance-attributes
+    """A thread-safe, byte-bounded LRU cache of query results with a TTL."""
+
+    def __init__(self, ttl: float, max_bytes: int, max_entry_bytes: int):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], CachedResult]" = OrderedDict()
+        # Keys per database identity (and back), for invalidation
+        self._by_database: Dict[str, Set[Tuple[str, str]]] = {}
+        self._identity_of: Dict[Tuple[str, str], str] = {}
+        # Bumped on every invalidation, so a read that raced a write isn't stored
+        self._generations: Dict[str, int] = {}
+        self._bytes = 0
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0,
+                          "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        """Whether results are cached at all."""
+        return self.ttl > 0 and self.max_bytes > 0
+
+    @staticmethod
+    def _key(db_url: str, sql_query: str) -> Tuple[str, str]:
+        return hashlib.sha256(db_url.encode("utf-8")).hexdigest(), normalize_sql(sql_query)
+
+    def _remove_locked(self, key: Tuple[str, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        identity = self._identity_of.pop(key)
+        keys = self._by_database[identity]
+        keys.discard(key)
+        if not keys:
+            del self._by_database[identity]
+
+    def get(self, db_url: str, sql_query: str) -> Optional[CachedResult]:
+        """Return the cached result of sql_query on db_url, if fresh."""
+        if not self.enabled:
+            return None
+        key = self._key(db_url, sql_query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry.created_at > self.ttl:
+                self._remove_locked(key)
+                entry = None
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry
+
+    def generation(self, db_url: str) -> int:
+        """Return the invalidation generation of db_url's database; pass it to put()."""
+        with self._lock:
+            return self._generations.get(database_identity(db_url), 0)
+
+    def put(  # pylint: disable=too-many-arguments
+        self,
+        db_url: str,
+        sql_query: str,
+        chunks: List[List[Dict[str, Any]]],
+        truncated: bool,
+        *,
+        size: int,
+        generation: int,
+    ) -> bool:
+        """
+        Cache a result read at the given generation.
+
+        Returns:
+            False if the result is too large or the database was written to
+            since the read started
+        """
+        if not self.enabled or size > self.max_entry_bytes:
+            return False
+        key = self._key(db_url, sql_query)
+        identity = database_identity(db_url)
+        with self._lock:
+            if self._generations.get(identity, 0) != generation:
+                return False
+            self._remove_locked(key)
+            self._entries[key] = CachedResult(chunks, truncated, time.monotonic(), size)
+            self._by_database.setdefault(identity, set()).add(key)
+            self._identity_of[key] = identity
+            self._bytes += size
+            self._counters["stores"] += 1
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove_locked(oldest)
+                self._counters["evictions"] += 1
+        return True
+
+    def invalidate(self, db_url: str) -> int:
+        """Drop every cached result for db_url's database; returns how many."""
+        identity = database_identity(db_url)
+        with self._lock:
+            self._generations[identity] = self._generations.get(identity, 0) + 1
+            keys = list(self._by_database.get(identity, ()))
+            for key in keys:
+                self._remove_locked(key)
+            self._counters["invalidations"] += 1
+            return len(keys)
+
+    def clear(self) -> None:
+        """Drop every cached result."""
+        with self._lock:
+            self._entries.clear()
+            self._by_database.clear()
+            self._identity_of.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache occupancy and counters, safe to expose for monitoring."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                **self._counters,
+            }
+
+
+result_cache = ResultCache(
+    Config.SQL_RESULT_CACHE_TTL,
+    Config.SQL_RESULT_CACHE_MAX_BYTES,
+    Config.SQL_RESULT_CACHE_MAX_ENTRY_BYTES,
+)
@@ -0,0 +1,107 @@
+"""Column-wise conversion of query results to JSON-compatible values.
+
+Loaders used to run an isinstance chain on every cell. Instead, one converter
+is chosen per column from the cursor's type metadata, once per result, and
+columns whose driver values are already JSON-compatible (integers, floats,
+text, booleans) are not touched at all. Columns of a type without a known
+converter fall back to ``serialize_value``, which inspects each value.
+"""
+
+import base64
+import datetime
+import decimal
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+Converter = Callable[[Any], Any]
+
+
+def to_isoformat(value):
+    """Dates, times and timestamps as ISO 8601 strings."""
+    return value.isoformat()
+
+
+def to_interval(value):
+    """Intervals (datetime.timedelta) as e.g. "1 day, 2:30:00"."""
+    return str(value)
+
+
+def to_base64(value):
+    """Binary values as base64 text."""
+    return base64.b64encode(bytes(value)).decode("ascii")
+
+
+def text_or_base64(value):
+    """Text passes through; binary-collated string columns arrive as bytes."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return to_base64(value)
+    return value
+
+
+def serialize_value(value):
+    """
+    Convert a single value of unknown type to a JSON-compatible one.
+
+    Args:
+        value: The value to serialize
+
+    Returns:
+        JSON serializable version of the value
+    """
+    if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, datetime.timedelta):
+        return to_interval(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return to_base64(value)
+    return value
+
+
+def column_converters(
+    type_codes: Sequence[Any], converters_by_type: Mapping[Any, Optional[Converter]]
+) -> List[Optional[Converter]]:
+    """
+    Pick the converter of each result column from its cursor type code.
+
+    Args:
+        type_codes: The type code of each column, from cursor.description
+        converters_by_type: Converter per type code; None marks types whose
+            values are already JSON-compatible
+
+    Returns:
+        One converter per column, None where values pass through unchanged
+    """
+    return [converters_by_type.get(code, serialize_value) for code in type_codes]
+
+
+def convert_rows(
+    columns: Sequence[str], rows: Sequence[Sequence[Any]], converters: Sequence[Optional[Converter]]
+) -> List[Dict[str, Any]]:
+    """Turn tuple rows into dicts, applying each column's converter to its non-NULL values."""
+    if not rows:
+        return []
+    if not any(converters):
+        return [dict(zip(columns, row)) for row in rows]
+    values = list(zip(*rows))
+    for i, convert in enumerate(converters):
+        if convert is not None:
+            values[i] = [None if v is None else convert(v) for v in values[i]]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def convert_dict_rows(
+    rows: List[Dict[str, Any]], converters: Sequence[Optional[Converter]]
+) -> List[Dict[str, Any]]:
+    """Apply each column's converter in place to dict rows (keys in column order)."""
+    if not rows or not any(converters):
+        return rows
+    converted = [
+        (key, convert) for key, convert in zip(rows[0].keys(), converters) if convert is not None
+    ]
+    for row in rows:
+        for key, convert in converted:
+            value = row[key]
+            if value is not None:
+                row[key] = convert(value)
+    return rows
@@ -3,5 +3,16 @@ QueryWeaver Memory System
 """
 
 from .graphiti_tool import MemoryTool
+from .persistence import MemoryWriteQueue, memory_writes
+from .registry import MemoryToolRegistry, memory_tools
+from .sweeper import MemorySweeper, memory_sweeper
 
-__all__ = ["MemoryTool"]
+__all__ = [
+    "MemoryTool",
+    "MemoryToolRegistry",
+    "memory_tools",
+    "MemorySweeper",
+    "memory_sweeper",
+    "MemoryWriteQueue",
+    "memory_writes",
+]
@@ -4,9 +4,13 @@ Saves summarized conversations with user and database nodes.
 """
 # pylint: disable=all
 import asyncio
+import functools
+import hashlib
 import logging
+import re
 import os
 import uuid
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 
@@ -18,11 +22,17 @@ from graphiti_core.driver.falkordb_driver import FalkorDriver
 from graphiti_core import Graphiti
 from api.extensions import db
 from api.config import Config
+from api.loaders.result_cache import normalize_sql
+from api.memory.sql_templates import fill_from_templates, sql_template_stats
 from graphiti_core.nodes import EpisodeType
 from graphiti_core.llm_client import LLMConfig, OpenAIClient
 from graphiti_core.embedder import OpenAIEmbedder, OpenAIEmbedderConfig
 from graphiti_core.cross_encoder import OpenAIRerankerClient
-from graphiti_core.search.search_config_recipes import NODE_HYBRID_SEARCH_RRF
+from graphiti_core.search.search import search as graphiti_search
+from graphiti_core.search.search_config_recipes import (
+    EDGE_HYBRID_SEARCH_NODE_DISTANCE, EDGE_HYBRID_SEARCH_RRF
+)
+from graphiti_core.search.search_filters import SearchFilters
 
 
 from litellm import completion
@@ -44,6 +54,81 @@ def extract_embedding_model_name(full_model_name: str) -> str:
         return full_model_name
 
 
+async def embed_question(text: str) -> List[float]:
+    """Embed text, reusing the current request's embedding (see api.core.request_context)."""
+    # Imported here: importing api.core loads text2sql, which imports this module
+    from api.core.request_context import (  # pylint: disable=import-outside-toplevel
+        embed_question as embed_in_request,
+    )
+    return await embed_in_request(text)
+
+
+# How often each memory source missed the search_memories time budget
+memory_search_stats = {
+    "searches": 0,
+    "budgeted": 0,
+    "unreranked": 0,
+    "dropped_user_summary": 0,
+    "dropped_database_facts": 0,
+    "dropped_similar_queries": 0,
+}
+
+# Episode contents kept per memory tool
+EPISODE_CACHE_SIZE = 256
+
+# Memory graphs whose indexes were created by this process
+_indexed_memory_graphs = set()
+
+# Labels whose nodes carry a `timestamp`, indexed for cleanup
+TIMESTAMPED_LABELS = ("Query", "Entity")
+
+# Labels of the nodes Graphiti creates, which have no `timestamp` of their own
+GRAPHITI_LABELS = ("Episodic", "Community", "Entity")
+
+# Query nodes given a hash per query when backfilling nodes saved without one
+HASH_BACKFILL_BATCH = 500
+
+# Entity nodes never removed by cleanup: the user and their database nodes
+PINNED_ENTITY_CONDITION = "n:Entity AND (n.name = $user_name OR n.name STARTS WITH 'Database ')"
+
+
+def query_memory_hash(database_name: str, question: str, sql_query: str) -> str:
+    """
+    Content key of a Query memory node: the database, the question with case and
+    whitespace normalized, and the SQL with whitespace normalized.
+    """
+    normalized_question = re.sub(r"\s+", " ", question.strip().lower())
+    content = "\n".join((database_name, normalized_question, normalize_sql(sql_query)))
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def merge_conversations(conversations: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine several turns into one conversation, summarized in a single LLM call."""
+    if len(conversations) == 1:
+        return conversations[0]
+    return {
+        "turns": conversations,
+        "success": all(turn.get("success", True) for turn in conversations),
+    }
+
+
+def format_conversation(conversation: Dict[str, Any], with_status: bool = False) -> str:
+    """Format a conversation (or the turns of a merged one) as prompt text."""
+    conv_text = ""
+    for turn in conversation.get("turns", [conversation]):
+        conv_text += f"User: {turn.get('question', '')}\n"
+        if turn.get('generated_sql'):
+            conv_text += f"SQL: {turn['generated_sql']}\n"
+        if turn.get('error'):
+            conv_text += f"Error: {turn['error']}\n"
+        if turn.get('answer'):
+            conv_text += f"Assistant: {turn['answer']}\n"
+        if with_status:
+            conv_text += f"Execution Status: {'Success' if turn.get('success', True) else 'Failed'}\n"
+            conv_text += "\n"
+    return conv_text
+
+
 class MemoryTool:
     """Memory management tool for handling user memories and interactions."""
 
@@ -58,21 +143,103 @@ class MemoryTool:
 
         self.user_id = user_id
         self.graph_id = graph_id
+        self.memory_db = user_memory_db
+        # Set once the user/database entity nodes are known to exist
+        self.entities_ready = False
+        # uuids of the user and database entity nodes, resolved by exact name
+        self.user_uuid: Optional[str] = None
+        self.database_uuid: Optional[str] = None
+        # Recently fetched episode contents (episodes never change), least recent first
+        self._episode_cache: "OrderedDict[str, str]" = OrderedDict()
 
 
     @classmethod
     async def create(cls, user_id: str, graph_id: str, use_direct_entities: bool = True) -> "MemoryTool":
         """Async factory to construct and initialize the tool."""
         self = cls(user_id, graph_id)
+        await self.ensure_setup()
+        return self
 
-        await self._ensure_entity_nodes_direct(user_id, graph_id)
+    async def ensure_setup(self) -> None:
+        """Create the entity nodes and the Query vector index, unless already done."""
+        if not self.entities_ready:
+            self.entities_ready = await self._ensure_entity_nodes_direct(self.user_id, self.graph_id)
 
+        if self.memory_db not in _indexed_memory_graphs:
+            vector_size = await asyncio.to_thread(Config.EMBEDDING_MODEL.get_vector_size)
+            driver = self.graphiti_client.driver
+            # The driver treats "already indexed" as success
+            await driver.execute_query(f"CREATE VECTOR INDEX FOR (p:Query) ON (p.embeddings) OPTIONS {{dimension:{vector_size}, similarityFunction:'euclidean'}}")
+            await driver.execute_query("CREATE INDEX FOR (q:Query) ON (q.hash)")
+            await driver.execute_query("CREATE INDEX FOR (e:Episodic) ON (e.uuid)")
+            for label in TIMESTAMPED_LABELS:
+                await driver.execute_query(f"CREATE INDEX FOR (n:{label}) ON (n.timestamp)")
+            try:
+                await self._backfill_query_hashes()
+            except Exception as e:
+                logging.warning("Could not backfill Query hashes in %s: %s", self.memory_db, e)
+            _indexed_memory_graphs.add(self.memory_db)
 
-        vector_size = Config.EMBEDDING_MODEL.get_vector_size()
-        driver = self.graphiti_client.driver
-        await driver.execute_query(f"CREATE VECTOR INDEX FOR (p:Query) ON (p.embeddings) OPTIONS {{dimension:{vector_size}, similarityFunction:'euclidean'}}")
+    async def _backfill_query_hashes(self) -> int:
+        """
+        Give Query nodes saved before they were keyed by hash their hash.
 
-        return self
+        The hash covers the node's database, taken from the database entity
+        linked to it, so it's computed here rather than in Cypher. A node
+        whose hash another Query node already has is a duplicate of it and
+        is deleted.
+
+        Returns:
+            The number of nodes updated or deleted
+        """
+        driver = self.graphiti_client.driver
+        done = 0
+        while True:
+            result = await driver.execute_query(
+                "MATCH (db:Entity)-[:SUCCESS|FAILED]->(q:Query) "
+                "WHERE q.hash IS NULL AND db.name STARTS WITH 'Database ' "
+                "RETURN DISTINCT id(q) AS id, db.name AS database, "
+                "q.user_query AS user_query, q.sql_query AS sql_query LIMIT $batch_size",
+                batch_size=HASH_BACKFILL_BATCH,
+            )
+            records = result[0] if result else []
+            if not records:
+                return done
+
+            hashes: Dict[str, int] = {}
+            duplicates, seen = [], set()
+            for record in records:
+                if record["id"] in seen:
+                    # Linked to more than one database; the first one wins
+                    continue
+                seen.add(record["id"])
+                query_hash = query_memory_hash(
+                    record["database"][len("Database "):],
+                    record["user_query"] or "", record["sql_query"] or "",
+                )
+                if query_hash in hashes:
+                    duplicates.append(record["id"])
+                else:
+                    hashes[query_hash] = record["id"]
+            existing = await driver.execute_query(
+                "UNWIND $hashes AS h MATCH (q:Query {hash: h}) RETURN DISTINCT h AS hash",
+                hashes=list(hashes),
+            )
+            for record in existing[0] if existing else []:
+                duplicates.append(hashes.pop(record["hash"]))
+
+            if hashes:
+                await driver.execute_query(
+                    "UNWIND $nodes AS node MATCH (q:Query) WHERE id(q) = node.id "
+                    "SET q.hash = node.hash",
+                    nodes=[{"id": node_id, "hash": h} for h, node_id in hashes.items()],
+                )
+            if duplicates:
+                await driver.execute_query(
+                    "UNWIND $ids AS node_id MATCH (q:Query) WHERE id(q) = node_id DETACH DELETE q",
+                    ids=duplicates,
+                )
+            done += len(seen)
 
     async def _ensure_entity_nodes_direct(self, user_id: str, database_name: str) -> bool:
         """
@@ -93,6 +260,7 @@ class MemoryTool:
             
             if not user_check_result[0]:  # If no records found, create user node
                 user_uuid = str(uuid.uuid4())
+                self.user_uuid = user_uuid
                 user_name_embedding = Config.EMBEDDING_MODEL.embed(user_node_name)[0]
                 
                 user_node_data = {
@@ -117,6 +285,7 @@ class MemoryTool:
                 await graph_driver.execute_query(user_cypher, node=user_node_data)
                 logging.info("Created user entity node with UUID: %s", user_uuid)
             else:
+                self.user_uuid = user_check_result[0][0]['uuid']
                 logging.info("User entity node already exists")
             
             # Check if database entity node already exists
@@ -130,6 +299,7 @@ class MemoryTool:
             
             if not database_check_result[0]:  # If no records found, create database node
                 database_uuid = str(uuid.uuid4())
+                self.database_uuid = database_uuid
                 database_name_embedding = Config.EMBEDDING_MODEL.embed(database_node_name)[0]
                 
                 database_node_data = {
@@ -154,6 +324,7 @@ class MemoryTool:
                 await graph_driver.execute_query(database_cypher, node=database_node_data)
                 logging.info("Created database entity node: %s with UUID: %s", database_node_name, database_uuid)
             else:
+                self.database_uuid = database_check_result[0][0]['uuid']
                 logging.info("Database entity node already exists: %s", database_node_name)
             
             # Create HAS_DATABASE relationship between user and database entities
@@ -181,6 +352,17 @@ class MemoryTool:
             logging.error("Error creating entity nodes directly: %s", e)
             return False
 
+    async def _database_entity_uuid(self) -> Optional[str]:
+        """Return the database entity node's uuid, looked up by exact name once."""
+        if self.database_uuid is None:
+            records, _, _ = await self.graphiti_client.driver.execute_query(
+                "MATCH (n:Entity {name: $name}) RETURN n.uuid AS uuid LIMIT 1",
+                name=f"Database {self.graph_id}",
+            )
+            if records:
+                self.database_uuid = records[0]["uuid"]
+        return self.database_uuid
+
     async def update_user_information(self, conversation: Dict[str, Any], history: Tuple[List[str], List[str]]) -> bool:
         driver = self.graphiti_client.driver
         query = """
@@ -190,14 +372,7 @@ class MemoryTool:
         summary_result, __, _ = await driver.execute_query(query, user_id=self.user_id)
         summary = summary_result[0].get("summary", "") if summary_result else ""
         # Format conversation for summarization
-        conv_text = ""
-        conv_text += f"User: {conversation.get('question', '')}\n"
-        if conversation.get('generated_sql'):
-            conv_text += f"SQL: {conversation['generated_sql']}\n"
-        if conversation.get('error'):
-            conv_text += f"Error: {conversation['error']}\n"
-        if conversation.get('answer'):
-            conv_text += f"Assistant: {conversation['answer']}\n"
+        conv_text = format_conversation(conversation)
         prompt = f"""
                 You are updating the personal memory of user.
                 ### Inputs
@@ -278,93 +453,84 @@ class MemoryTool:
         
         return True
 
-    async def save_query_memory(self, query: str, sql_query: str, success: bool, error: Optional[str] = None) -> bool:
+    async def save_query_memory(self, query: str, sql_query: str, success: bool, error: Optional[str] = None, embedding: Optional[List[float]] = None) -> bool:
         """
         Save individual query memory directly to the database node.
-        
+
+        Query nodes are keyed by query_memory_hash, so saving the same question
+        and SQL again is an index lookup, and concurrent saves can't create
+        duplicates.
+
         Args:
             query: The user's natural language query
             sql_query: The generated SQL query
             success: Whether the query execution was successful
             error: Error message if the query failed
-            
+            embedding: The query's embedding, if already computed
+
         Returns:
             bool: True if memory was saved successfully, False otherwise
         """
         try:
-            database_name = self.graph_id
-            database_node_name = f"Database {database_name}"
+            database_node_name = f"Database {self.graph_id}"
             graph_driver = self.graphiti_client.driver
-            
-            # Find the database node using direct Cypher query
-            find_database_query = """
-                MATCH (n:Entity {name: $name})
-                RETURN n.uuid AS uuid
-                LIMIT 1
-            """
-            
-            database_result = await graph_driver.execute_query(find_database_query, name=database_node_name)
-            
-            # Check if database node exists
-            if not database_result[0]:  # If no records found
+            query_hash = query_memory_hash(self.graph_id, query, sql_query)
+
+            # Skip the embedding call for questions that are already saved
+            existing = await graph_driver.execute_query(
+                "MATCH (q:Query {hash: $hash}) RETURN q.uuid AS uuid LIMIT 1", hash=query_hash
+            )
+            if existing[0]:
+                logging.info("Query with same user_query and sql_query already exists, skipping creation")
+                return True
+
+            database_node_uuid = await self._database_entity_uuid()
+            if database_node_uuid is None:
                 logging.error("Database entity node %s not found", database_node_name)
                 return False
-            
-            database_node_uuid = database_result[0][0]['uuid']
 
-            # Check if Query node with same user_query and sql_query already exists
+            embeddings = embedding if embedding is not None else await embed_question(query)
             relationship_type = "SUCCESS" if success else "FAILED"
-            
-            # Escape quotes in the query and SQL for Cypher
-            escaped_query = query.replace("'", "\\'").replace('"', '\\"')
-            escaped_sql = sql_query.replace("'", "\\'").replace('"', '\\"')
-            escaped_error = error.replace("'", "\\'").replace('"', '\\"') if error else ""
-            embeddings = Config.EMBEDDING_MODEL.embed(escaped_query)[0]
-
-            # First check if a Query node with the same user_query and sql_query already exists
-            check_query = f"""
-            MATCH (db:Entity {{uuid: "{database_node_uuid}"}})
-            MATCH (db)-[r]->(q:Query)
-            WHERE q.user_query = "{escaped_query}" AND q.sql_query = "{escaped_sql}"
-            RETURN q.uuid as existing_query_uuid
-            LIMIT 1
-            """
-            
-            graph_driver = self.graphiti_client.driver
-            check_result = await graph_driver.execute_query(check_query)
-            
-            # If query already exists, don't create a duplicate
-            if check_result[0]:  # If records exist
-                logging.info("Query with same user_query and sql_query already exists, skipping creation")
-                return True
 
-            # Create the Query node and relationship using Cypher only if it doesn't exist
+            # MERGE on the hash makes the save idempotent; the query text only
+            # varies by relationship type, so FalkorDB can cache both plans
             cypher_query = f"""
-            MATCH (db:Entity {{uuid: "{database_node_uuid}"}})
-            MERGE (q:Query {{
-                user_query: "{escaped_query}",
-                sql_query: "{escaped_sql}",
-                success: {str(success).lower()},
-                error: "{escaped_error}",
-                timestamp: timestamp(),
-                embeddings: vecf32($embedding)
-            }})
-            CREATE (db)-[:{relationship_type} {{timestamp: timestamp()}}]->(q)
-            RETURN q.uuid as query_uuid
+            MATCH (db:Entity {{uuid: $database_uuid}})
+            MERGE (q:Query {{hash: $hash}})
+            ON CREATE SET
+                q.uuid = $uuid,
+                q.user_query = $user_query,
+                q.sql_query = $sql_query,
+                q.success = $success,
+                q.error = $error,
+                q.timestamp = timestamp(),
+                q.embeddings = vecf32($embedding)
+            MERGE (db)-[r:{relationship_type}]->(q)
+            ON CREATE SET r.timestamp = timestamp()
+            RETURN q.uuid AS query_uuid
             """
-
-            # Execute the Cypher query through Graphiti's graph driver
-            try:
-                result = await graph_driver.execute_query(cypher_query, embedding=embeddings)
-                return True
-            except Exception as cypher_error:
-                logging.error("Error executing Cypher query: %s", cypher_error)
+            result = await graph_driver.execute_query(
+                cypher_query,
+                database_uuid=database_node_uuid,
+                hash=query_hash,
+                uuid=str(uuid.uuid4()),
+                user_query=query,
+                sql_query=sql_query,
+                success=success,
+                error=error or "",
+                embedding=embeddings,
+            )
+            if not result[0]:
+                # The cached node is gone (e.g. the memory graph was reset); look it up again
+                self.database_uuid = None
+                logging.error("Database entity node %s not found", database_node_name)
                 return False
-            
+            return True
+
         except Exception as e:
             logging.error("Error saving query memory: %s", e)
             return False
-        
+
     async def retrieve_similar_queries(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
         """
         Retrieve similar queries from the memory database.
@@ -377,30 +543,13 @@ class MemoryTool:
             A list of similar query metadata.
         """
         try:
-            database_name = self.graph_id
-            
-            # Find the database node
-            database_node_name = f"Database {database_name}"
-            node_search_config = NODE_HYBRID_SEARCH_RRF.model_copy(deep=True)
-            node_search_config.limit = 1
-            
-            database_node_results = await self.graphiti_client.search_(
-                query=database_node_name,
-                config=node_search_config,
-            )
-            
-
-            # Check if database node exists
-            database_node_exists = False
-            for node in database_node_results.nodes:
-                if node.name == database_node_name:
-                    database_node_exists = True
-                    database_node_uuid = node.uuid
-                    break
-            if not database_node_exists:
+            database_node_uuid = await self._database_entity_uuid()
+            if database_node_uuid is None:
                 return []
 
-            query_embedding = Config.EMBEDDING_MODEL.embed(query)[0]
+            # Shared with the other stages of the request, and computed off the
+            # event loop, so a search_memories budget can cut it short
+            query_embedding = await embed_question(query)
             cypher_query = f"""
                     CALL db.idx.vector.queryNodes('Query', 'embeddings', 10, vecf32($embedding))
                         YIELD node, score
@@ -430,6 +579,46 @@ class MemoryTool:
             logging.error("Error retrieving similar queries: %s", e)
             return []
 
+    async def find_template_sql(self, query: str, max_distance: float) -> Optional[Dict[str, str]]:
+        """
+        Produce SQL for query from the template of a similar successful query.
+
+        Args:
+            query: The user's question
+            max_distance: Largest embedding distance of a stored question to try
+
+        Returns:
+            {"sql_query", "template_question"} or None if no template matches
+        """
+        sql_template_stats["lookups"] += 1
+        try:
+            database_node_uuid = await self._database_entity_uuid()
+            if database_node_uuid is None:
+                sql_template_stats["misses"] += 1
+                return None
+
+            cypher_query = """
+                CALL db.idx.vector.queryNodes('Query', 'embeddings', 10, vecf32($embedding))
+                    YIELD node, score
+                    WITH node, score WHERE score <= $max_distance
+                    MATCH (db:Entity {uuid: $database_node_uuid})-[:SUCCESS]->(node)
+                    RETURN node.user_query AS user_query, node.sql_query AS sql_query
+                    ORDER BY score ASC
+            """
+            records, _, _ = await self.graphiti_client.driver.execute_query(
+                cypher_query,
+                embedding=await embed_question(query),
+                max_distance=max_distance,
+                database_node_uuid=database_node_uuid,
+            )
+            found = fill_from_templates(query, [dict(record) for record in records])
+        except Exception as e:
+            logging.error("Error matching SQL templates: %s", e)
+            found = None
+
+        sql_template_stats["hits" if found else "misses"] += 1
+        return found
+
     async def search_user_summary(self, limit: int = 5) -> str:
         """
         Search for user node summary extracts the user's personal information and general preferences.
@@ -459,6 +648,38 @@ class MemoryTool:
             logging.error("Error searching user node: %s", e)
             return ""
         
+    async def fetch_episode_contents(self, episode_uuids: List[str]) -> List[str]:
+        """
+        Return the contents of the given episodes, in order, with one query for
+        all of them that aren't cached yet.
+
+        Args:
+            episode_uuids: Episode UUIDs; unknown ones are skipped
+
+        Returns:
+            List of episode content strings
+        """
+        missing = [u for u in dict.fromkeys(episode_uuids) if u not in self._episode_cache]
+        if missing:
+            records, _, _ = await self.graphiti_client.driver.execute_query(
+                """
+                MATCH (e:Episodic)
+                WHERE e.uuid IN $uuids
+                RETURN e.uuid AS uuid, e.content AS content
+                """,
+                uuids=missing,
+            )
+            for record in records:
+                self._episode_cache[record["uuid"]] = record["content"]
+        contents = []
+        for episode_uuid in episode_uuids:
+            if episode_uuid in self._episode_cache:
+                self._episode_cache.move_to_end(episode_uuid)
+                contents.append(self._episode_cache[episode_uuid])
+        while len(self._episode_cache) > EPISODE_CACHE_SIZE:
+            self._episode_cache.popitem(last=False)
+        return contents
+
     async def extract_episode_from_rel(self, rel_result):
         """
         Extracts the content of episodes associated with a given relationship result.
@@ -469,58 +690,49 @@ class MemoryTool:
         Returns:
             List of episode content strings corresponding to the provided episode UUIDs.
         """
-        driver = self.graphiti_client.driver
-        query = """
-                MATCH (e:Episodic {uuid: $uuid})
-                RETURN e.content AS content
-                """
-        episodes_uuid = rel_result.episodes
+        return await self.fetch_episode_contents(rel_result.episodes)
 
-        episode_contents = []
-        for episode_uuid in episodes_uuid:
-            episode_content, _, _ = await driver.execute_query(query, uuid=episode_uuid)
-            if episode_content:
-                content = episode_content[0].get("content")
-                episode_contents.append(content)
-
-        return episode_contents
-
-    async def search_database_facts(self, query: str, limit: int = 5, episode_limit: int = 3) -> str:
+    async def search_database_facts(self, query: str, limit: int = 5, episode_limit: int = 3, rerank: bool = True) -> str:
         """
         Search for database-specific facts and interaction history using database node as center.
         
         Args:
             query: Natural language query to search for database facts
             limit: Maximum number of results to return
+            rerank: Rerank facts by graph distance to the database node; without
+                it the hybrid search results are fused by RRF only, saving a
+                graph traversal
             
         Returns:
             String containing all relevant database facts with time relevancy information
         """
         try:
-            driver = self.graphiti_client.driver
-            query = """
-                    MATCH (e:Entity {name: $name})
-                    RETURN e.uuid AS uuid
-                    """
-            result, __, _ = await driver.execute_query(query, name=f"Database {self.graph_id}")
-            center_node_uuid = result[0].get("uuid", "")
-            reranked_results = await self.graphiti_client.search(
-                query=query,
-                center_node_uuid=center_node_uuid,
-                num_results=limit
-            )
+            center_node_uuid = await self._database_entity_uuid() or ""
+            # What Graphiti.search() does, but with the request's shared question
+            # embedding instead of embedding the question again
+            recipe = EDGE_HYBRID_SEARCH_NODE_DISTANCE if rerank else EDGE_HYBRID_SEARCH_RRF
+            search_config = recipe.model_copy(deep=True)
+            search_config.limit = limit
+            reranked_results = (await graphiti_search(
+                self.graphiti_client.clients,
+                query,
+                None,
+                search_config,
+                SearchFilters(),
+                center_node_uuid=center_node_uuid if rerank else None,
+                query_vector=await embed_question(query),
+            )).edges
             
             # Filter and format results for database-specific content into a single string
             database_facts_text = []
-            episodes_contents = []
+            episode_uuids = []
             if reranked_results and len(reranked_results) > 0:
                 logging.info("Previous session and facts for %s:", self.graph_id)
                 for i, result in enumerate(reranked_results, 1):
                     if result.source_node_uuid != center_node_uuid and result.target_node_uuid != center_node_uuid:
                         continue
-                    if len(episodes_contents) < episode_limit:
-                        episodes_content = await self.extract_episode_from_rel(result)
-                        episodes_contents.extend(episodes_content)
+                    if len(episode_uuids) < episode_limit:
+                        episode_uuids.extend(u for u in result.episodes if u not in episode_uuids)
                     fact_entry = f"{result.fact}"
                     
                     # Add time information if available
@@ -534,6 +746,8 @@ class MemoryTool:
                         fact_entry += f" ({', '.join(time_info)})"
                     
                     database_facts_text.append(fact_entry)
+            # One query for the episodes of every fact, instead of one per episode
+            episodes_contents = await self.fetch_episode_contents(episode_uuids) if episode_uuids else []
             facts = "\n".join(database_facts_text) if database_facts_text else ""
             episodes = "\n".join(episodes_contents) if episodes_contents else ""
             database_context = "Previous sessions:\n" + episodes + "\n\nFacts:\n" + facts
@@ -544,41 +758,62 @@ class MemoryTool:
             logging.error("Error searching database facts for %s: %s", self.graph_id, e)
             return ""
 
-    async def search_memories(self, query: str, user_limit: int = 5, database_limit: int = 10) -> str:
+    async def search_memories(self, query: str, user_limit: int = 5, database_limit: int = 10, budget: Optional[float] = None, lightweight: bool = False) -> str:
         """
-        Run both user summary and database facts searches concurrently for better performance.
+        Run the user summary, database facts and similar queries searches concurrently.
         Also builds a comprehensive memory context string for the analysis agent.
-        
+
+        With a time budget, sources that haven't finished when it runs out are
+        cancelled and left out of the context (and counted in
+        memory_search_stats), and below MEMORY_SEARCH_RERANK_MIN_SECONDS the
+        database facts are not reranked. In lightweight mode only similar
+        queries are searched, which needs no LLM calls.
+
         Args:
             query: Natural language query to search for database facts
             user_limit: Maximum number of results for user summary search
             database_limit: Maximum number of results for database facts search
-            
+            budget: Seconds to wait for the searches (None waits for all of them)
+            lightweight: Search only the Query nodes, not the Graphiti memory
+
         Returns:
-            Dict containing user_summary, database_facts, similar_queries, and memory_context
+            The memory context string
         """
         try:
-            # Run both searches concurrently using asyncio.gather
-            user_summary_task = self.search_user_summary(limit=user_limit)
-            database_facts_task = self.search_database_facts(query=query, limit=database_limit)
-            queries_task = self.retrieve_similar_queries(query=query, limit=5)
-            
-            # Wait for both to complete
-            user_summary, database_facts, similar_queries = await asyncio.gather(
-                user_summary_task,
-                database_facts_task,
-                queries_task,
-                return_exceptions=True
-            )
-            
-            # Handle potential exceptions
-            if isinstance(user_summary, Exception):
-                user_summary = ""
-            if isinstance(database_facts, Exception):
-                database_facts = ""
-            if isinstance(similar_queries, Exception):
-                similar_queries = []
-            
+            rerank = budget is None or budget >= Config.MEMORY_SEARCH_RERANK_MIN_SECONDS
+            tasks = {
+                "similar_queries": asyncio.create_task(self.retrieve_similar_queries(query=query, limit=5)),
+            }
+            if not lightweight:
+                tasks["user_summary"] = asyncio.create_task(self.search_user_summary(limit=user_limit))
+                tasks["database_facts"] = asyncio.create_task(
+                    self.search_database_facts(query=query, limit=database_limit, rerank=rerank)
+                )
+            _, pending = await asyncio.wait(tasks.values(), timeout=budget)
+            for task in pending:
+                task.cancel()
+
+            memory_search_stats["searches"] += 1
+            memory_search_stats["budgeted"] += budget is not None
+            memory_search_stats["unreranked"] += not rerank and not lightweight
+            dropped = [name for name, task in tasks.items() if task in pending]
+            for name in dropped:
+                memory_search_stats[f"dropped_{name}"] += 1
+            if dropped:
+                logging.warning("Memory search for %s exceeded its %.2fs budget, dropped: %s",
+                                self.graph_id, budget, ", ".join(dropped))
+
+            def _result(name, default):
+                task = tasks.get(name)
+                if task is None or task in pending or task.exception() is not None:
+                    return default
+                return task.result()
+
+            # Handle potential exceptions and dropped sources
+            user_summary = _result("user_summary", "")
+            database_facts = _result("database_facts", "")
+            similar_queries = _result("similar_queries", [])
+
             # Build comprehensive memory context
             memory_context = ""
             
@@ -619,30 +854,84 @@ class MemoryTool:
             logging.error("Error in concurrent memory search: %s", e)
             return ""
 
-    async def clean_memory(self, size: int = 10000) -> int:
+    async def _delete_batch(self, match: str, batch_size: int, **params) -> int:
+        """DETACH DELETE up to batch_size nodes matched by `match` (binding n); returns how many."""
+        result = await self.graphiti_client.driver.execute_query(
+            f"{match} AND NOT ({PINNED_ENTITY_CONDITION}) "
+            "WITH n LIMIT $batch_size DETACH DELETE n RETURN count(n) AS deleted",
+            user_name=self.user_id, batch_size=batch_size, **params,
+        )
+        return result[0][0]["deleted"] if result and result[0] else 0
+
+    async def _oldest_timestamped(self, label: str, since: int, limit: int) -> List[Tuple[int, int]]:
+        """Return (timestamp, node id) of the oldest `limit` unpinned `label` nodes from `since` on."""
+        result = await self.graphiti_client.driver.execute_query(
+            f"MATCH (n:{label}) WHERE n.timestamp >= $since AND NOT ({PINNED_ENTITY_CONDITION}) "
+            "RETURN n.timestamp AS ts, id(n) AS id ORDER BY n.timestamp ASC LIMIT $limit",
+            user_name=self.user_id, since=since, limit=limit,
+        )
+        return [(record["ts"], record["id"]) for record in result[0]] if result else []
+
+    async def clean_memory(self, size: Optional[int] = None, batch_size: Optional[int] = None) -> int:
         """
-        Clean up the memory by removing old nodes.
+        Trim the user's memory graph to its newest `size` nodes.
 
+        Graphiti's nodes without a timestamp go first, one label at a time,
+        then the oldest timestamped nodes. Each batch of those takes the
+        oldest nodes of every timestamped label, found through the label's
+        timestamp index from the last deleted timestamp on, and deletes the
+        oldest of them by id. Deletion runs in batches of `batch_size` nodes
+        so no single query locks the graph for long. The user and database
+        entity nodes are never removed.
+
+        Returns:
+            The number of nodes deleted
         """
+        size = Config.MEMORY_MAX_NODES if size is None else size
+        batch_size = batch_size or Config.MEMORY_CLEANUP_BATCH
         driver = self.graphiti_client.driver
-        query = """
-                MATCH (n)
-                WHERE NOT (n:Entity AND n.name = $pinned_user)
-                WITH n ORDER BY coalesce(n.timestamp, 0) DESC
-                SKIP $keep
-                DETACH DELETE n
-                """
+        deleted = 0
         try:
-            _, _, _stats = await driver.execute_query(
-                query,
-                pinned_user=f"User {self.user_id}",
-                keep=int(size),
-            )
-            # Stats may not be available; return 0 on success path
-            return 0
+            count_result = await driver.execute_query("MATCH (n) RETURN count(n) AS nodes")
+            excess = count_result[0][0]["nodes"] - size
+            if excess <= 0:
+                return 0
+
+            for label in GRAPHITI_LABELS:
+                while deleted < excess:
+                    removed = await self._delete_batch(
+                        f"MATCH (n:{label}) WHERE n.timestamp IS NULL",
+                        min(batch_size, excess - deleted),
+                    )
+                    deleted += removed
+                    if removed == 0:
+                        break
+
+            since = 0
+            while deleted < excess:
+                limit = min(batch_size, excess - deleted)
+                candidates = []
+                for label in TIMESTAMPED_LABELS:
+                    candidates += await self._oldest_timestamped(label, since, limit)
+                oldest = sorted(candidates)[:limit]
+                if not oldest:
+                    break
+                result = await driver.execute_query(
+                    "UNWIND $ids AS node_id MATCH (n) WHERE id(n) = node_id "
+                    "DETACH DELETE n RETURN count(n) AS deleted",
+                    ids=[node_id for _, node_id in oldest],
+                )
+                removed = result[0][0]["deleted"] if result and result[0] else 0
+                deleted += removed
+                if removed == 0:
+                    break
+                since = oldest[-1][0]
+
+            logging.info("Memory cleanup removed %d nodes from %s", deleted, self.memory_db)
+            return deleted
         except Exception as e:
             logging.error("Error cleaning memory: %s", e)
-            return 0
+            return deleted
 
     async def summarize_conversation(self, conversation: Dict[str, Any], history: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -654,20 +943,8 @@ class MemoryTool:
         Returns:
             Dict with 'database_summary' key containing direct text summary
         """
-        # Format conversation for summarization
-        conv_text = ""
-        conv_text += f"User: {conversation.get('question', '')}\n"
-        if conversation.get('generated_sql'):
-            conv_text += f"SQL: {conversation['generated_sql']}\n"
-        if conversation.get('error'):
-            conv_text += f"Error: {conversation['error']}\n"
-        if conversation.get('answer'):
-            conv_text += f"Assistant: {conversation['answer']}\n"
-
-        # Add success/failure status
-        success_status = conversation.get('success', True)
-        conv_text += f"Execution Status: {'Success' if success_status else 'Failed'}\n"
-        conv_text += "\n"
+        # Format conversation for summarization, with success/failure status
+        conv_text = format_conversation(conversation, with_status=True)
 
         prompt = f"""
                 Rewrite the following QueryWeaver question-answer interaction into a 
@@ -769,9 +1046,9 @@ def get_azure_openai_clients():
 
     return llm_client_azure, embedding_client_azure, config
 
-def create_graphiti_client(falkor_driver: FalkorDriver) -> Graphiti:
-    """Create a Graphiti client configured with Azure OpenAI."""
-    # Initialize Graphiti with Azure OpenAI clients
+@functools.lru_cache(maxsize=1)
+def _provider_clients() -> Dict[str, Any]:
+    """LLM, embedder and reranker clients, built once and shared by every Graphiti client."""
     if Config.AZURE_FLAG:
         # Get Azure OpenAI clients and config
         llm_client_azure, embedding_client_azure, config = get_azure_openai_clients()
@@ -782,36 +1059,39 @@ def create_graphiti_client(falkor_driver: FalkorDriver) -> Graphiti:
             model=config.llm_deployment,
         )
 
-        graphiti_client = Graphiti(
-            graph_driver=falkor_driver,
-            llm_client=OpenAIClient(config=azure_llm_config, client=llm_client_azure),
-            embedder=OpenAIEmbedder(
+        return {
+            "llm_client": OpenAIClient(config=azure_llm_config, client=llm_client_azure),
+            "embedder": OpenAIEmbedder(
                 config=OpenAIEmbedderConfig(
                     embedding_model=config.embedding_deployment,
                     embedding_dim=1536
                 ),
                 client=embedding_client_azure,
             ),
-            cross_encoder=OpenAIRerankerClient(
+            "cross_encoder": OpenAIRerankerClient(
                 config=LLMConfig(
                     model=azure_llm_config.small_model  # Use small model for reranking
                 ),
                 client=llm_client_azure,
             ),
-        )
-    else:  # Fallback to default OpenAI config but use Config's embedding model
-        # Extract just the model name without provider prefix for Graphiti
-        embedding_model_name = extract_embedding_model_name(Config.EMBEDDING_MODEL_NAME)
-            
-        graphiti_client = Graphiti(
-            graph_driver=falkor_driver,
-            embedder=OpenAIEmbedder(
-                config=OpenAIEmbedderConfig(
-                    embedding_model=embedding_model_name,
-                    embedding_dim=1536
-                )
-            ),
-        )
+        }
+
+    # Fallback to default OpenAI config but use Config's embedding model
+    # Extract just the model name without provider prefix for Graphiti
+    embedding_model_name = extract_embedding_model_name(Config.EMBEDDING_MODEL_NAME)
+    return {
+        # The clients Graphiti would otherwise create for each instance
+        "llm_client": OpenAIClient(),
+        "embedder": OpenAIEmbedder(
+            config=OpenAIEmbedderConfig(
+                embedding_model=embedding_model_name,
+                embedding_dim=1536
+            )
+        ),
+        "cross_encoder": OpenAIRerankerClient(),
+    }
 
-    return graphiti_client
 
+def create_graphiti_client(falkor_driver: FalkorDriver) -> Graphiti:
+    """Create a Graphiti client configured with Azure OpenAI (or OpenAI)."""
+    return Graphiti(graph_driver=falkor_driver, **_provider_clients())
@@ -0,0 +1,56 @@
+"""Memory modes: how much conversation memory a chat request uses.
+
+- "off": no memory tool is created; nothing is searched or saved.
+- "lightweight": only Query nodes (question, SQL, outcome) are saved and
+  retrieved by vector search, so no LLM calls are spent on memory.
+- "full": Query nodes plus the Graphiti conversation memory: summaries,
+  episodes with entity extraction, user facts and reranked fact search.
+
+The mode of a graph is its memory_mode setting, or MEMORY_MODE. An API token
+can be given a mode too; a request then uses the more restrictive of the two,
+so neither the graph owner's nor the integration's choice is overridden.
+"""
+
+import logging
+from typing import Dict, Optional
+
+from api.config import Config
+
+MEMORY_MODES = ("off", "lightweight", "full")
+
+# Per mode: chat requests, seconds the request path spent on memory (getting
+# the tool, template lookup and search), and the saves queued. Each
+# conversation save costs several LLM calls; query saves only an embedding.
+memory_mode_stats: Dict[str, Dict[str, float]] = {
+    mode: {"requests": 0, "seconds": 0.0, "query_saves": 0, "conversation_saves": 0}
+    for mode in MEMORY_MODES
+}
+
+
+def _known(mode: Optional[str]) -> Optional[str]:
+    if mode is not None and mode not in MEMORY_MODES:
+        logging.warning("Ignoring unknown memory mode %r", mode)
+        return None
+    return mode
+
+
+def resolve_memory_mode(graph_mode: Optional[str], token_mode: Optional[str] = None) -> str:
+    """
+    Return the memory mode of a request.
+
+    Args:
+        graph_mode: The graph's memory_mode setting (None = MEMORY_MODE)
+        token_mode: The API token's memory mode (None = no restriction)
+    """
+    mode = _known(graph_mode) or _known(Config.MEMORY_MODE) or "full"
+    token_mode = _known(token_mode)
+    if token_mode is not None:
+        mode = min(mode, token_mode, key=MEMORY_MODES.index)
+    return mode
+
+
+def record_memory(mode: str, **counters: float) -> None:
+    """Add to the counters of a memory mode, e.g. record_memory("full", requests=1)."""
+    stats = memory_mode_stats[mode]
+    for name, value in counters.items():
+        stats[name] += value
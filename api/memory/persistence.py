@@ -0,0 +1,183 @@
+"""Bounded write-behind queue for conversation memory.
+
+Saving a turn to memory means embedding the question, an LLM summary of
+the conversation, a Graphiti episode and an LLM update of the user summary.
+Rather than starting untracked tasks for each answer, turns are queued per
+(user, graph) and written by MEMORY_WRITE_WORKERS workers. Turns queued for
+the same (user, graph) while an earlier batch is being written are
+coalesced, so they are summarized in one LLM call. At most
+MEMORY_WRITE_QUEUE_SIZE turns wait at a time; beyond that new turns are
+dropped (and counted), since memory is best-effort and must not hold back
+answers. On shutdown the queue is flushed for a bounded time.
+"""
+
+import asyncio
+import contextvars
+import dataclasses
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from api.config import Config
+from api.memory.graphiti_tool import MemoryTool, merge_conversations
+from api.memory.sweeper import memory_sweeper
+
+
+@dataclasses.dataclass
+class _Batch:
+    """Turns waiting to be written for one (user, graph)."""
+
+    tool: MemoryTool
+    # Keyword arguments of save_query_memory calls
+    queries: List[Dict[str, Any]] = dataclasses.field(default_factory=list)
+    conversations: List[Dict[str, Any]] = dataclasses.field(default_factory=list)
+    history: Optional[Tuple[List[str], List[str]]] = None
+
+    @property
+    def size(self) -> int:
+        """Number of queued items."""
+        return len(self.queries) + len(self.conversations)
+
+
+class MemoryWriteQueue:  # pylint: disable=too-many-instance-attributes
+    """Writes conversation memory in the background with bounded concurrency."""
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        # (user_id, graph_id) -> batch not yet picked up by a worker, oldest first
+        self._batches: "OrderedDict[Tuple[str, str], _Batch]" = OrderedDict()
+        # Keys a worker is writing; their new turns wait until it finishes
+        self._writing: set = set()
+        self._pending = 0
+        # Set when a batch may have become ready to write, or on close
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._closed = False
+        self._counters = {"queued": 0, "dropped": 0, "coalesced": 0, "written": 0, "failed": 0}
+
+    def _ensure_workers(self) -> None:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._tasks = [task for task in self._tasks if not task.done()]
+        while len(self._tasks) < self.workers:
+            # A fresh context, so workers don't keep the submitting request's context alive
+            self._tasks.append(
+                asyncio.create_task(self._worker(), context=contextvars.Context())
+            )
+
+    def _enqueue(self, tool: MemoryTool) -> Optional[_Batch]:
+        if self._closed or self._pending >= self.max_pending:
+            self._counters["dropped"] += 1
+            return None
+        self._ensure_workers()
+        key = (tool.user_id, tool.graph_id)
+        batch = self._batches.get(key)
+        if batch is None:
+            batch = self._batches[key] = _Batch(tool)
+        self._pending += 1
+        self._counters["queued"] += 1
+        return batch
+
+    def submit_query(self, tool: MemoryTool, **query: Any) -> bool:
+        """
+        Queue a save_query_memory call.
+
+        Returns:
+            False if the queue is full and the query was dropped
+        """
+        batch = self._enqueue(tool)
+        if batch is None:
+            return False
+        batch.queries.append(query)
+        self._wakeup.set()
+        return True
+
+    def submit_conversation(
+        self, tool: MemoryTool, conversation: Dict[str, Any],
+        history: Tuple[List[str], List[str]],
+    ) -> bool:
+        """
+        Queue a conversation turn for summarization into memory.
+
+        Returns:
+            False if the queue is full and the turn was dropped
+        """
+        batch = self._enqueue(tool)
+        if batch is None:
+            return False
+        batch.conversations.append(conversation)
+        # The latest turn's history already contains the earlier turns
+        batch.history = history
+        self._wakeup.set()
+        return True
+
+    def _next_batch(self) -> Optional[Tuple[Tuple[str, str], _Batch]]:
+        for key in self._batches:
+            if key not in self._writing:
+                batch = self._batches.pop(key)
+                self._writing.add(key)
+                self._pending -= batch.size
+                return key, batch
+        return None
+
+    async def _write(self, batch: _Batch) -> None:
+        tool = batch.tool
+        for query in batch.queries:
+            if await tool.save_query_memory(**query):
+                self._counters["written"] += 1
+                memory_sweeper.record_save(tool)
+            else:
+                self._counters["failed"] += 1
+
+        if batch.conversations:
+            if len(batch.conversations) > 1:
+                self._counters["coalesced"] += len(batch.conversations) - 1
+            saved = await tool.add_new_memory(merge_conversations(batch.conversations),
+                                              batch.history)
+            self._counters["written" if saved else "failed"] += len(batch.conversations)
+
+    async def _worker(self) -> None:
+        while True:
+            item = self._next_batch()
+            if item is None:
+                if self._closed:
+                    # Nothing left to write
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            key, batch = item
+            try:
+                await self._write(batch)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                self._counters["failed"] += batch.size
+                logging.error("Writing memory for graph %s failed: %s", batch.tool.graph_id, e)
+            finally:
+                self._writing.discard(key)
+                # This key's newer turns (if any) can be written now
+                self._wakeup.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth and counters, safe to expose for monitoring."""
+        return {"pending": self._pending, "writing": len(self._writing), **self._counters}
+
+    async def flush(self, timeout: Optional[float] = None) -> None:
+        """Stop accepting turns, write what is queued, and cancel writes still
+        running after timeout seconds."""
+        self._closed = True
+        if self._wakeup is None:
+            return
+        self._wakeup.set()
+        tasks = [task for task in self._tasks if not task.done()]
+        if not tasks:
+            return
+        _, still_running = await asyncio.wait(tasks, timeout=timeout)
+        for task in still_running:
+            task.cancel()
+        if still_running:
+            logging.warning("Dropped %d queued memory writes on shutdown", self._pending)
+            await asyncio.wait(still_running)
+
+
+memory_writes = MemoryWriteQueue(Config.MEMORY_WRITE_WORKERS, Config.MEMORY_WRITE_QUEUE_SIZE)
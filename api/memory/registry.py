@@ -0,0 +1,87 @@
+"""Registry of initialized memory tools, one per (user, graph).
+
+Building a MemoryTool creates a Graphiti client and makes sure the user and
+database entity nodes and the Query vector index exist. The registry does
+this once per (user, graph) and hands the same tool to later questions, so
+per-question memory setup is a dictionary lookup. Tools unused for
+MEMORY_TOOL_IDLE_SECONDS are dropped, as are the least recently used ones
+beyond MEMORY_TOOL_MAX_INSTANCES.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from api.config import Config
+from api.memory.graphiti_tool import MemoryTool
+
+
+class MemoryToolRegistry:
+    """Keeps one initialized MemoryTool per (user, graph)."""
+
+    def __init__(self, idle_seconds: float, max_instances: int):
+        self.idle_seconds = idle_seconds
+        self.max_instances = max_instances
+        # (user_id, graph_id) -> (tool, last_used), least recently used first
+        self._tools: "OrderedDict[Tuple[str, str], Tuple[MemoryTool, float]]" = OrderedDict()
+        # Serializes the construction of one key's tool
+        self._creating: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._counters = {"hits": 0, "creations": 0, "evictions": 0}
+
+    def _evict_idle(self, now: float) -> None:
+        while self._tools:
+            key, (_, last_used) = next(iter(self._tools.items()))
+            if now - last_used <= self.idle_seconds and len(self._tools) <= self.max_instances:
+                break
+            del self._tools[key]
+            self._counters["evictions"] += 1
+
+    def _lookup(self, key: Tuple[str, str]) -> Optional[MemoryTool]:
+        entry = self._tools.get(key)
+        if entry is None:
+            return None
+        self._tools[key] = (entry[0], time.monotonic())
+        self._tools.move_to_end(key)
+        return entry[0]
+
+    async def get(self, user_id: str, graph_id: str) -> MemoryTool:
+        """Return the initialized memory tool of user_id's graph, creating it if needed."""
+        key = (user_id, graph_id)
+        self._evict_idle(time.monotonic())
+
+        tool = self._lookup(key)
+        if tool is None:
+            lock = self._creating.setdefault(key, asyncio.Lock())
+            try:
+                async with lock:
+                    # Another request may have created it while we waited
+                    tool = self._lookup(key)
+                    if tool is None:
+                        tool = await MemoryTool.create(user_id, graph_id)
+                        self._tools[key] = (tool, time.monotonic())
+                        self._counters["creations"] += 1
+                        self._evict_idle(time.monotonic())
+                        return tool
+            finally:
+                if not lock.locked():
+                    self._creating.pop(key, None)
+
+        self._counters["hits"] += 1
+        if not tool.entities_ready:
+            # Setup failed earlier (e.g. FalkorDB was briefly unreachable); retry it
+            await tool.ensure_setup()
+        return tool
+
+    def forget(self, user_id: str, graph_id: Optional[str] = None) -> None:
+        """Drop the tools of one of user_id's graphs (or of all of them)."""
+        for key in list(self._tools):
+            if key[0] == user_id and graph_id in (None, key[1]):
+                del self._tools[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return registry occupancy and counters, safe to expose for monitoring."""
+        return {"instances": len(self._tools), **self._counters}
+
+
+memory_tools = MemoryToolRegistry(Config.MEMORY_TOOL_IDLE_SECONDS, Config.MEMORY_TOOL_MAX_INSTANCES)
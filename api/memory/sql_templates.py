@@ -0,0 +1,251 @@
+"""Question/SQL templates derived from successful query memory.
+
+Users often ask the same question shape with different values ("sales for
+region North in 2023"). For a stored successful (question, SQL) pair, each
+SQL literal that also appears in the question becomes a slot: the question
+turns into a pattern with a capture group per slot, the SQL into the same
+statement with the literal replaced. A new question that matches the pattern
+in full gets the stored SQL with its own values filled in, without asking
+the LLM again.
+
+Templates are deliberately strict: everything in the question outside the
+slots must be the same (up to case and whitespace), slots can only be filled
+with values of the stored literal's kind, a text slot only with as many words
+as the stored value (so "customer Alice placed after 2024" doesn't fill the
+slot of "customer Bob" with "Alice placed after 2024"), and pairs whose SQL
+has literals derived from a slot value in another form (e.g. a date built
+from a year) yield no template. Only read statements are reused.
+"""
+
+import dataclasses
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+from api.loaders.execution_policy import is_read_statement
+
+# String literals, quoted identifiers and comments are matched (and skipped)
+# as a whole, so numbers inside them aren't taken for numeric literals
+_SQL_TOKEN = re.compile(
+    r"'(?P<string>(?:[^']|'')*)'"
+    r'|"(?:[^"]|"")*"|`[^`]*`|--[^\n]*|/\*.*?\*/'
+    r"|(?<![\w.$])(?P<number>\d+(?:\.\d+)?)(?![\w.])",
+    re.DOTALL,
+)
+_NUMBER = r"\d+(?:\.\d+)?"
+
+# How often templates were looked up and used, for monitoring
+sql_template_stats = {
+    "lookups": 0,
+    "hits": 0,
+    "misses": 0,
+}
+
+
+@dataclasses.dataclass
+class _Slot:
+    """A SQL literal filled with a value taken from the question."""
+
+    # Index of the question pattern's capture group holding the value
+    group: int
+    kind: str  # "string" or "number"
+    # Turns the value as written in the question into the stored literal's case
+    transform: Callable[[str], str]
+    # Text around the value inside the literal, e.g. the % of a LIKE pattern
+    prefix: str = ""
+    suffix: str = ""
+
+    def render(self, values: Tuple[str, ...]) -> str:
+        """Return the SQL literal for the values captured from the question."""
+        value = values[self.group].strip()
+        if self.kind == "number":
+            return value
+        text = self.prefix + self.transform(value) + self.suffix
+        return "'" + text.replace("'", "''") + "'"
+
+
+@dataclasses.dataclass
+class SqlTemplate:
+    """A question pattern and the SQL to produce for questions matching it."""
+
+    question: str
+    sql: str
+    pattern: "re.Pattern[str]"
+    # SQL text between literals; slots[i] is the literal between parts i and i + 1
+    sql_parts: List[str]
+    slots: List[_Slot]
+
+    def fill(self, question: str) -> Optional[str]:
+        """Return the SQL for question, or None if it doesn't match the template."""
+        match = self.pattern.fullmatch(question.strip())
+        if match is None:
+            return None
+        values = match.groups()
+        sql = self.sql_parts[0]
+        for slot, part in zip(self.slots, self.sql_parts[1:]):
+            sql += slot.render(values) + part
+        return sql
+
+
+def _case_transform(literal: str, written: str) -> Optional[Callable[[str], str]]:
+    """Return the case change turning the question's text into the SQL literal."""
+    for transform in (lambda v: v, str.lower, str.upper, str.title):
+        if transform(written) == literal:
+            return transform
+    return None
+
+
+def _find_in_question(question: str, value: str) -> List[Tuple[int, int]]:
+    """Return the spans where value occurs in question as a whole word or number."""
+    found = re.finditer(r"(?<![\w.])" + re.escape(value) + r"(?![\w]|\.\d)",
+                        question, re.IGNORECASE)
+    return [m.span() for m in found]
+
+
+def _static_pattern(text: str) -> str:
+    """Return a pattern for question text outside the slots."""
+    return r"\s+".join(re.escape(word) for word in text.split(" "))
+
+
+def _literal_slot(token: "re.Match[str]") -> Optional[Tuple[str, str, _Slot]]:
+    """
+    Return (literal, value, slot) for a SQL literal token, None for other tokens.
+
+    The value is the literal without the % wildcards of a LIKE pattern, which
+    the slot keeps as prefix and suffix. The slot's group and transform are
+    set once the value is found in the question.
+    """
+    kind = "string" if token.group("string") is not None else \
+        "number" if token.group("number") is not None else None
+    if kind is None:
+        return None
+    literal = value = token.group(kind)
+    prefix = suffix = ""
+    if kind == "string":
+        literal = literal.replace("''", "'")
+        value = literal.strip("%")
+        prefix = literal[:len(literal) - len(literal.lstrip("%"))]
+        suffix = literal[len(prefix) + len(value):]
+    return literal, value, _Slot(-1, kind, str, prefix, suffix)
+
+
+def _extract_slots(
+    question: str, sql: str
+) -> Optional[Tuple[Dict[Tuple[int, int], str], List[_Slot], List[str]]]:
+    """
+    Turn the SQL literals that appear in question into slots.
+
+    Returns:
+        (kind of the value at each question span, slots with their group set,
+        SQL text between the slots), or None if the pair can't be reused safely
+    """
+    kinds: Dict[Tuple[int, int], str] = {}  # question span -> kind of its value
+    slots: List[Tuple[Tuple[int, int], _Slot]] = []
+    sql_parts, constants = [], []
+    position = 0
+
+    for token in _SQL_TOKEN.finditer(sql):
+        found = _literal_slot(token)
+        if found is None:
+            continue
+        literal, value, slot = found
+        occurrences = _find_in_question(question, value) if value.strip() else []
+        if len(occurrences) > 1:
+            # Which occurrence the SQL uses is ambiguous
+            return None
+        if occurrences:
+            slot.transform = _case_transform(value, question[slice(*occurrences[0])])
+        if not occurrences or slot.transform is None:
+            constants.append(literal.lower())
+            continue
+
+        if kinds.setdefault(occurrences[0], slot.kind) != slot.kind:
+            return None
+        slots.append((occurrences[0], slot))
+        sql_parts.append(sql[position:token.start()])
+        position = token.end()
+
+    if any(question[slice(*span)].lower() in constant for constant in constants for span in kinds):
+        # A literal derived from a slot value (e.g. '2023-01-01' from 2023)
+        # would keep the stored value
+        return None
+    sql_parts.append(sql[position:])
+
+    # Capture groups are numbered in question order
+    spans = sorted(kinds)
+    for span, slot in slots:
+        slot.group = spans.index(span)
+    return kinds, [slot for _, slot in slots], sql_parts
+
+
+def _question_pattern(question: str, kinds: Dict[Tuple[int, int], str]) -> Optional[str]:
+    """Return the pattern matching question with a capture group per value span."""
+    spans = sorted(kinds)
+    pattern, end = "", 0
+    for index, span in enumerate(spans):
+        between = question[end:span[0]]
+        if index and not between.strip() and kinds[span] == kinds[spans[index - 1]] == "string":
+            # Two adjacent free-text values can't be told apart
+            return None
+        if between:
+            pattern += _static_pattern(between)
+        if kinds[span] == "number":
+            pattern += f"({_NUMBER})"
+        else:
+            words = len(question[slice(*span)].split())
+            pattern += rf"(\S+(?:\s+\S+){{{words - 1}}})"
+        end = span[1]
+    if question[end:]:
+        pattern += _static_pattern(question[end:])
+    return pattern
+
+
+def build_template(question: str, sql: str) -> Optional[SqlTemplate]:
+    """
+    Derive a template from a successful question and its SQL.
+
+    Returns:
+        None if no SQL literal comes from the question, or the pair can't be
+        turned into a template safely
+    """
+    question = " ".join(question.split())
+    extracted = _extract_slots(question, sql)
+    if extracted is None or not extracted[1]:
+        return None
+    kinds, slots, sql_parts = extracted
+    pattern = _question_pattern(question, kinds)
+    if pattern is None:
+        return None
+
+    return SqlTemplate(
+        question=question,
+        sql=sql,
+        pattern=re.compile(pattern, re.IGNORECASE | re.DOTALL),
+        sql_parts=sql_parts,
+        slots=slots,
+    )
+
+
+def fill_from_templates(
+    question: str, candidates: List[Dict[str, str]]
+) -> Optional[Dict[str, str]]:
+    """
+    Return the SQL for question from the first stored query whose template it matches.
+
+    Args:
+        question: The new question
+        candidates: Successful stored queries (user_query, sql_query), most similar first
+
+    Returns:
+        {"sql_query", "template_question"} or None if no template matches
+    """
+    for candidate in candidates:
+        # Writes always go through the analysis agent (and its confirmation)
+        if not is_read_statement(candidate["sql_query"]):
+            continue
+        template = build_template(candidate["user_query"], candidate["sql_query"])
+        if template is None:
+            continue
+        sql = template.fill(" ".join(question.split()))
+        if sql is not None:
+            return {"sql_query": sql, "template_question": candidate["user_query"]}
+    return None
@@ -0,0 +1,73 @@
+"""Background cleanup of users' memory graphs.
+
+Trimming a memory graph means counting its nodes, so instead of running after
+every question, cleanup is triggered by a per-graph counter of saved
+questions: once it reaches MEMORY_CLEANUP_CHECK_EVERY, a background sweep
+trims the graph to MEMORY_MAX_NODES and the counter starts over. The first
+save a process sees for a graph triggers a sweep too, so graphs that grew
+while the process was down are trimmed early. At most one sweep per graph
+runs at a time.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from api.config import Config
+from api.memory.graphiti_tool import MemoryTool
+
+
+class MemorySweeper:
+    """Schedules memory cleanups from counters of saved questions."""
+
+    def __init__(self, check_every: int):
+        self.check_every = max(1, check_every)
+        # Memory graph -> saved questions since its last sweep
+        self._pending: Dict[str, int] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._counters = {"sweeps": 0, "deleted": 0}
+
+    def record_save(self, tool: MemoryTool) -> Optional[asyncio.Task]:
+        """
+        Count a question saved to tool's memory graph, sweeping it if due.
+
+        Returns:
+            The sweep task, if one was started
+        """
+        graph = tool.memory_db
+        pending = self._pending.get(graph, self.check_every - 1) + 1
+        if pending < self.check_every or graph in self._running:
+            self._pending[graph] = pending
+            return None
+
+        self._pending[graph] = 0
+        task = asyncio.create_task(self._sweep(tool))
+        self._running[graph] = task
+        return task
+
+    async def _sweep(self, tool: MemoryTool) -> int:
+        try:
+            deleted = await tool.clean_memory()
+            self._counters["sweeps"] += 1
+            self._counters["deleted"] += deleted
+            return deleted
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logging.error("Memory cleanup of %s failed: %s", tool.memory_db, e)
+            return 0
+        finally:
+            self._running.pop(tool.memory_db, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return sweep counters, safe to expose for monitoring."""
+        return {"running": len(self._running), **self._counters}
+
+    async def shutdown(self, timeout: Optional[float] = None) -> None:
+        """Cancel running sweeps; deletions already made are kept."""
+        tasks = list(self._running.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+
+
+memory_sweeper = MemorySweeper(Config.MEMORY_CLEANUP_CHECK_EVERY)
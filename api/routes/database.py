@@ -1,9 +1,15 @@
 """Database connection routes for the text2sql API."""
 from fastapi import APIRouter, Request
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
 from api.auth.user_management import token_required
+from api.core.errors import InvalidArgumentError, JobNotFoundError
+from api.core.ingestion import (
+    get_ingestion_job,
+    resume_ingestion_job,
+    start_ingestion_job,
+)
 from api.core.schema_loader import load_database
 from api.routes.tokens import UNAUTHORIZED_RESPONSE
 
@@ -33,3 +39,47 @@ async def connect_database(request: Request, db_request: DatabaseConnectionReque
     """
     generator = await load_database(db_request.url, request.state.user_id)
     return StreamingResponse(generator, media_type="application/json")
+
+
+@database_router.post("/database/jobs", operation_id="start_database_ingestion", responses={
+    401: UNAUTHORIZED_RESPONSE
+})
+@token_required
+async def start_database_ingestion(request: Request, db_request: DatabaseConnectionRequest):
+    """
+    Start loading a database schema as a background job and return its id.
+    The job keeps running if the client disconnects; poll it with
+    GET /database/jobs/{job_id}. Submitting the same URL again while a job
+    for it is unfinished returns (or resumes) that job instead of starting over.
+    """
+    try:
+        job = await start_ingestion_job(db_request.url, request.state.user_id)
+        return JSONResponse(content=job, status_code=202)
+    except InvalidArgumentError as iae:
+        return JSONResponse(content={"error": str(iae)}, status_code=400)
+
+
+@database_router.get("/database/jobs/{job_id}", operation_id="get_database_ingestion",
+                     responses={401: UNAUTHORIZED_RESPONSE})
+@token_required
+async def get_database_ingestion(request: Request, job_id: str):
+    """Return the status and per-table progress of an ingestion job."""
+    try:
+        job = await get_ingestion_job(job_id, request.state.user_id)
+        return JSONResponse(content=job)
+    except JobNotFoundError as jnfe:
+        return JSONResponse(content={"error": str(jnfe)}, status_code=404)
+
+
+@database_router.post("/database/jobs/{job_id}/resume", operation_id="resume_database_ingestion",
+                      responses={401: UNAUTHORIZED_RESPONSE})
+@token_required
+async def resume_database_ingestion(request: Request, job_id: str):
+    """Resume a failed or interrupted ingestion job from its last checkpoint."""
+    try:
+        job = await resume_ingestion_job(job_id, request.state.user_id)
+        return JSONResponse(content=job, status_code=202)
+    except JobNotFoundError as jnfe:
+        return JSONResponse(content={"error": str(jnfe)}, status_code=404)
+    except InvalidArgumentError as iae:
+        return JSONResponse(content={"error": str(iae)}, status_code=409)
@@ -1,10 +1,17 @@
 """Graph-related routes for the text2sql API."""
 
-from fastapi import APIRouter, Request, HTTPException, UploadFile, File
-from fastapi.responses import JSONResponse, StreamingResponse
+import os
+
+from fastapi import APIRouter, Request, HTTPException, UploadFile, File, Form
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
+from starlette.background import BackgroundTask
 
 from api.core.schema_loader import list_databases
+from api.core.errors import JobNotFoundError
+from api.core.export import get_export_file, get_export_job, start_export_job
+from api.core.query_execution import COLUMNAR_MEDIA_TYPE
+from api.core.snapshot import export_snapshot, import_snapshot
 from api.core.text2sql import (
     GENERAL_PREFIX,
     ChatRequest,
@@ -14,9 +21,13 @@ from api.core.text2sql import (
     InvalidArgumentError,
     delete_database,
     execute_destructive_operation,
+    get_database_replicas,
+    get_database_settings,
     get_schema,
     query_database,
     refresh_database_schema,
+    update_database_replicas,
+    update_database_settings,
 )
 from api.auth.user_management import token_required
 from api.routes.tokens import UNAUTHORIZED_RESPONSE
@@ -34,6 +45,14 @@ class GraphData(BaseModel):
     database: str
 
 
+def _negotiate_result_format(request: Request, data: ChatRequest | ConfirmRequest) -> None:
+    """Switch to the columnar result format if the Accept header asks for it."""
+    if "result_format" not in data.model_fields_set and (
+        COLUMNAR_MEDIA_TYPE in request.headers.get("accept", "")
+    ):
+        data.result_format = "columnar"
+
+
 @graphs_router.get(
     "",
     operation_id="list_databases",
@@ -137,9 +156,15 @@ async def query_graph(
         Args:
             graph_id (str): The ID of the graph to query.
             chat_data (ChatRequest): The chat data containing user queries and context.
+
+    Query results are sent as lists of row objects unless result_format is
+    "columnar" or the Accept header asks for COLUMNAR_MEDIA_TYPE.
     """
+    _negotiate_result_format(request, chat_data)
     try:
-        generator = await query_database(request.state.user_id, graph_id, chat_data)
+        generator = await query_database(
+            request.state.user_id, graph_id, chat_data, request.state.memory_mode
+        )
         return StreamingResponse(generator, media_type="application/json")
     except InvalidArgumentError as iae:
         return JSONResponse(content={"error": str(iae)}, status_code=400)
@@ -156,9 +181,10 @@ async def confirm_destructive_operation(
     Handle user confirmation for destructive SQL operations
     """
 
+    _negotiate_result_format(request, confirm_data)
     try:
         generator = await execute_destructive_operation(
-            request.state.user_id, graph_id, confirm_data
+            request.state.user_id, graph_id, confirm_data, request.state.memory_mode
         )
         return StreamingResponse(generator, media_type="application/json")
     except InvalidArgumentError as iae:
@@ -200,3 +226,198 @@ async def delete_graph(request: Request, graph_id: str):
         return JSONResponse(content={"error": str(gnfe)}, status_code=404)
     except InternalError as ie:
         return JSONResponse(content={"error": str(ie)}, status_code=500)
+
+
+@graphs_router.get("/{graph_id}/snapshot", responses={401: UNAUTHORIZED_RESPONSE})
+@token_required
+async def export_graph_snapshot(request: Request, graph_id: str, dtype: str = "float32"):
+    """Download a portable snapshot of the graph, including its embeddings.
+
+    The snapshot can be restored with POST /graphs/{graph_id}/snapshot without
+    reconnecting to the source database or calling the embedding provider.
+
+        args:
+            dtype (str): Embedding storage type, "float32" (default) or "float16".
+    """
+    try:
+        path = await export_snapshot(request.state.user_id, graph_id, dtype)
+    except InvalidArgumentError as iae:
+        return JSONResponse(content={"error": str(iae)}, status_code=400)
+    except GraphNotFoundError as gnfe:
+        return JSONResponse(content={"error": str(gnfe)}, status_code=404)
+    except InternalError as ie:
+        return JSONResponse(content={"error": str(ie)}, status_code=500)
+
+    return FileResponse(
+        path,
+        media_type="application/zip",
+        filename=f"{graph_id}.qwsnapshot.zip",
+        background=BackgroundTask(os.unlink, path),
+    )
+
+
+@graphs_router.post("/{graph_id}/snapshot", responses={401: UNAUTHORIZED_RESPONSE})
+@token_required
+async def import_graph_snapshot(
+    request: Request, graph_id: str, file: UploadFile = File(...), url: str = Form(...)
+):
+    """Restore a graph from a snapshot, replacing the current graph atomically.
+
+    The snapshot must have been made with the embedding model this deployment uses.
+    Snapshots don't contain credentials, so url is the connection URL of the
+    database the restored graph queries.
+    """
+    try:
+        result = await import_snapshot(request.state.user_id, graph_id, file.file, url)
+        return JSONResponse(content=result)
+    except InvalidArgumentError as iae:
+        return JSONResponse(content={"error": str(iae)}, status_code=400)
+    except GraphNotFoundError as gnfe:
+        return JSONResponse(content={"error": str(gnfe)}, status_code=404)
+    except InternalError as ie:
+        return JSONResponse(content={"error": str(ie)}, status_code=500)
+
+
+class GraphSettingsUpdate(BaseModel):
+    """Query guardrail settings to change; null resets a setting to the default.
+
+    Args:
+        BaseModel (_type_): _description_
+    """
+
+    row_limit: int | None = None
+    statement_timeout_ms: int | None = None
+    read_only: bool | None = None
+    result_cache: bool | None = None
+    cost_gate: str | None = None
+    max_estimated_rows: int | None = None
+    max_estimated_cost: float | None = None
+    memory_mode: str | None = None
+
+
+@graphs_router.get("/{graph_id}/settings", responses={401: UNAUTHORIZED_RESPONSE})
+@token_required
+async def get_graph_settings(request: Request, graph_id: str):
+    """Return the graph's query guardrail settings and the values in effect."""
+    try:
+        return JSONResponse(
+            content=await get_database_settings(request.state.user_id, graph_id)
+        )
+    except GraphNotFoundError as gnfe:
+        return JSONResponse(content={"error": str(gnfe)}, status_code=404)
+
+
+@graphs_router.put("/{graph_id}/settings", responses={401: UNAUTHORIZED_RESPONSE})
+@token_required
+async def update_graph_settings(request: Request, graph_id: str, data: GraphSettingsUpdate):
+    """Change the query guardrails of the graph (limits, read-only mode, caching, cost gate)
+    and its memory mode ("off", "lightweight" or "full").
+
+    Only the fields present in the body are changed; 0 disables a limit or threshold.
+    """
+    try:
+        result = await update_database_settings(
+            request.state.user_id, graph_id, data.model_dump(exclude_unset=True)
+        )
+        return JSONResponse(content=result)
+    except InvalidArgumentError as iae:
+        return JSONResponse(content={"error": str(iae)}, status_code=400)
+    except GraphNotFoundError as gnfe:
+        return JSONResponse(content={"error": str(gnfe)}, status_code=404)
+
+
+class ReplicaUpdate(BaseModel):
+    """Read-replica connection URLs of a graph.
+
+    Args:
+        BaseModel (_type_): _description_
+    """
+
+    urls: list[str]
+
+
+@graphs_router.get("/{graph_id}/replicas", responses={401: UNAUTHORIZED_RESPONSE})
+@token_required
+async def get_graph_replicas(request: Request, graph_id: str):
+    """Return the graph's read replicas (passwords redacted) and their last known health."""
+    try:
+        return JSONResponse(
+            content=await get_database_replicas(request.state.user_id, graph_id)
+        )
+    except GraphNotFoundError as gnfe:
+        return JSONResponse(content={"error": str(gnfe)}, status_code=404)
+
+
+@graphs_router.put("/{graph_id}/replicas", responses={401: UNAUTHORIZED_RESPONSE})
+@token_required
+async def update_graph_replicas(request: Request, graph_id: str, data: ReplicaUpdate):
+    """Replace the graph's read replicas; an empty list sends all queries to the primary.
+
+    Read-only queries are spread across healthy replicas; writes and confirmed
+    operations always run on the primary.
+    """
+    try:
+        result = await update_database_replicas(request.state.user_id, graph_id, data.urls)
+        return JSONResponse(content=result)
+    except InvalidArgumentError as iae:
+        return JSONResponse(content={"error": str(iae)}, status_code=400)
+    except GraphNotFoundError as gnfe:
+        return JSONResponse(content={"error": str(gnfe)}, status_code=404)
+
+
+class ExportRequest(BaseModel):
+    """Export request model.
+
+    Args:
+        BaseModel (_type_): _description_
+    """
+
+    sql_query: str
+    format: str = "csv"
+
+
+@graphs_router.post("/{graph_id}/exports", responses={401: UNAUTHORIZED_RESPONSE})
+@token_required
+async def start_graph_export(request: Request, graph_id: str, data: ExportRequest):
+    """Export the full result of a read query to CSV or Parquet in the background.
+
+    Returns a job to poll with GET /graphs/{graph_id}/exports/{job_id}; once it
+    has completed the file can be fetched from .../download until it expires.
+    """
+    try:
+        job = await start_export_job(
+            request.state.user_id, graph_id, data.sql_query, data.format
+        )
+        return JSONResponse(content=job, status_code=202)
+    except InvalidArgumentError as iae:
+        return JSONResponse(content={"error": str(iae)}, status_code=400)
+    except GraphNotFoundError as gnfe:
+        return JSONResponse(content={"error": str(gnfe)}, status_code=404)
+
+
+@graphs_router.get("/{graph_id}/exports/{job_id}", responses={401: UNAUTHORIZED_RESPONSE})
+@token_required
+async def get_graph_export(request: Request, graph_id: str, job_id: str):
+    """Return the status and row count of an export job."""
+    try:
+        return JSONResponse(
+            content=await get_export_job(request.state.user_id, graph_id, job_id)
+        )
+    except JobNotFoundError as jnfe:
+        return JSONResponse(content={"error": str(jnfe)}, status_code=404)
+
+
+@graphs_router.get(
+    "/{graph_id}/exports/{job_id}/download", responses={401: UNAUTHORIZED_RESPONSE}
+)
+@token_required
+async def download_graph_export(request: Request, graph_id: str, job_id: str):
+    """Download a completed export; Range requests are supported for resuming."""
+    try:
+        path, filename, media_type = await get_export_file(
+            request.state.user_id, graph_id, job_id
+        )
+    except JobNotFoundError as jnfe:
+        return JSONResponse(content={"error": str(jnfe)}, status_code=404)
+
+    return FileResponse(path, media_type=media_type, filename=filename)
@@ -0,0 +1,60 @@
+"""Operational monitoring routes for the QueryWeaver API."""
+
+import secrets
+
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import JSONResponse
+
+from api.config import Config
+from api.loaders.connection_pool import pool_registry
+from api.loaders.result_cache import result_cache
+from api.memory.graphiti_tool import memory_search_stats
+from api.memory.modes import memory_mode_stats
+from api.memory.persistence import memory_writes
+from api.memory.registry import memory_tools
+from api.memory.sql_templates import sql_template_stats
+from api.memory.sweeper import memory_sweeper
+
+monitoring_router = APIRouter(tags=["Monitoring"])
+
+
+def _check_monitoring_token(request: Request) -> None:
+    """Allow access only with the MONITORING_TOKEN bearer token.
+
+    Stats span every tenant, so user tokens don't grant access; when no
+    MONITORING_TOKEN is configured the endpoints don't exist.
+    """
+    if not Config.MONITORING_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    auth = request.headers.get("Authorization", "")
+    if not secrets.compare_digest(auth, f"Bearer {Config.MONITORING_TOKEN}"):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+
+
+@monitoring_router.get("/pools", include_in_schema=False)
+async def connection_pool_stats(request: Request):
+    """Return occupancy and counters for every customer-database connection pool."""
+    _check_monitoring_token(request)
+    return JSONResponse(content={"pools": pool_registry.stats()})
+
+
+@monitoring_router.get("/result-cache", include_in_schema=False)
+async def result_cache_stats(request: Request):
+    """Return occupancy and hit/miss counters of the query result cache."""
+    _check_monitoring_token(request)
+    return JSONResponse(content=result_cache.stats())
+
+
+@monitoring_router.get("/memory-tools", include_in_schema=False)
+async def memory_tool_stats(request: Request):
+    """Return memory tool reuse, per-mode, search budget, SQL template, background
+    write and cleanup counters."""
+    _check_monitoring_token(request)
+    return JSONResponse(content={
+        **memory_tools.stats(),
+        "modes": memory_mode_stats,
+        "search": memory_search_stats,
+        "templates": sql_template_stats,
+        "writes": memory_writes.stats(),
+        "cleanup": memory_sweeper.stats(),
+    })
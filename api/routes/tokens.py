@@ -2,7 +2,7 @@
 
 import logging
 import secrets
-from typing import List
+from typing import List, Literal, Optional
 
 from fastapi import APIRouter, Request, HTTPException, status
 from fastapi.responses import JSONResponse
@@ -25,12 +25,21 @@ class TokenListResponse(BaseModel):
     """Response model for token list"""
     tokens: List[TokenListItem]
 
+class TokenOptions(BaseModel):
+    """Options of a new token"""
+    # Restricts the memory mode of the token's requests (the graph's mode still applies)
+    memory_mode: Optional[Literal["off", "lightweight", "full"]] = None
+
 @tokens_router.post("/generate", response_model=TokenListItem, responses={
     401: UNAUTHORIZED_RESPONSE
 })
 @token_required
-async def generate_token(request: Request) -> TokenListItem:
-    """Generate a new API token for the authenticated user"""
+async def generate_token(request: Request, options: Optional[TokenOptions] = None) -> TokenListItem:
+    """Generate a new API token for the authenticated user.
+
+    High-volume integrations can pass memory_mode "off" or "lightweight" to skip
+    the LLM calls of conversation memory for the token's requests.
+    """
     try:
         user_email = request.state.user_email
 
@@ -49,6 +58,13 @@ async def generate_token(request: Request) -> TokenListItem:
             # Call the registered handler (await if async)
             await handler('api', user_data, api_token)
 
+            if options and options.memory_mode:
+                organizations_graph = db.select_graph("Organizations")
+                await organizations_graph.query(
+                    "MATCH (t:Token {id: $api_token}) SET t.memory_mode = $memory_mode",
+                    {"api_token": api_token, "memory_mode": options.memory_mode},
+                )
+
             logging.info("Token generated for user: %s", user_email)  # nosemgrep
 
             return TokenListItem(
@@ -48,7 +48,8 @@ export async function sendMessage() {
             body: JSON.stringify({
                 chat: state.questions_history,
                 result: state.result_history,
-                instructions: DOM.expInstructions?.value
+                instructions: DOM.expInstructions?.value,
+                result_format: 'columnar'
             }),
             signal: state.currentRequestController.signal
         });
@@ -117,7 +118,7 @@ function handleStreamMessage(step: any) {
         state.result_history.push(step.message);
     }
     
-    if (step.type === 'reasoning_step') {
+    if (step.type === 'reasoning_step' || step.type === 'query_policy' || step.type === 'query_cost') {
         addMessage(step.message);
         moveLoadingMessageToBottom();
     } else if (step.type === 'final_result') {
@@ -128,9 +129,13 @@ function handleStreamMessage(step: any) {
         handleFollowupQuestions(step);
     } else if (step.type === 'query_result') {
         handleQueryResult(step);
+    } else if (step.type === 'query_result_chunk') {
+        handleQueryResultChunk(step);
+    } else if (step.type === 'query_result_end') {
+        handleQueryResultEnd(step);
     } else if (step.type === 'ai_response') {
         addMessage(step.message, "final-result");
-    } else if (step.type === 'destructive_confirmation') {
+    } else if (step.type === 'destructive_confirmation' || step.type === 'cost_confirmation') {
         addDestructiveConfirmationMessage(step);
     } else if (step.type === 'operation_cancelled') {
         addMessage(step.message, "followup");
@@ -138,7 +143,8 @@ function handleStreamMessage(step: any) {
         addMessage(step.message || JSON.stringify(step));
     }
 
-    if (step.type !== 'reasoning_step') {
+    // Result chunks arrive mid-stream; the request is still in progress
+    if (!STREAMING_STEP_TYPES.has(step.type)) {
         resetUIState();
     }
 }
@@ -183,6 +189,56 @@ function handleFollowupQuestions(step: any) {
     addMessage(step.message, "followup");
 }
 
+const STREAMING_STEP_TYPES = new Set([
+    'reasoning_step', 'query_policy', 'query_cost', 'query_result_chunk', 'query_result_end',
+]);
+
+// Body of the result table that streamed chunks are appended to
+let streamingResultBody: HTMLTableSectionElement | null = null;
+// Column names of a columnar result, sent with its first chunk
+let streamingColumns: string[] = [];
+
+function chunkRows(step: any): any[] {
+    if (step.format !== 'columnar') return step.data || [];
+    if (step.columns) streamingColumns = step.columns;
+    return (step.rows || []).map((row: any[]) =>
+        Object.fromEntries(streamingColumns.map((column, i) => [column, row[i]]))
+    );
+}
+
+function handleQueryResultChunk(step: any) {
+    const rows = chunkRows(step);
+    if (rows.length === 0) return;
+
+    if (step.chunk === 0 || !streamingResultBody) {
+        const messageDiv = addMessage("Query Result", "query-final-result", false, null, rows);
+        streamingResultBody = messageDiv.querySelector('tbody');
+        moveLoadingMessageToBottom();
+        return;
+    }
+
+    rows.forEach((row: any) => {
+        const tableRow = document.createElement('tr');
+        Object.values(row).forEach((value: any) => {
+            const cell = document.createElement('td');
+            cell.textContent = value;
+            tableRow.appendChild(cell);
+        });
+        streamingResultBody?.appendChild(tableRow);
+    });
+}
+
+function handleQueryResultEnd(step: any) {
+    streamingResultBody = null;
+    if (step.cached) {
+        addMessage('Served from the result cache.', "followup");
+    }
+    if (step.truncated) {
+        addMessage(`Showing the first ${step.row_count} rows; the result was truncated.`, "followup");
+        moveLoadingMessageToBottom();
+    }
+}
+
 function handleQueryResult(step: any) {
     if (step.data) {
         addMessage("Query Result", "query-final-result", false, null, step.data);
@@ -276,7 +332,8 @@ export async function handleDestructiveConfirmation(confirmation: string, sqlQue
             body: JSON.stringify({
                 confirmation: confirmation,
                 sql_query: sqlQuery,
-                chat: state.questions_history
+                chat: state.questions_history,
+                result_format: 'columnar'
             })
         });
 
@@ -1,8 +1,10 @@
-"""Playwright configuration for E2E tests."""
+"""Shared pytest fixtures: Playwright configuration for E2E tests and test doubles."""
 
 import os
 import subprocess
 import time
+from collections import OrderedDict
+from unittest.mock import MagicMock
 
 import pytest
 import requests
@@ -112,3 +114,20 @@ def authenticated_page(page, app_url):  # pylint: disable=redefined-outer-name
     page.app_url = app_url
     page.goto(app_url, wait_until="domcontentloaded", timeout=60000)
     yield page
+
+
+@pytest.fixture
+def memory_tool():
+    """Build MemoryTool instances without Graphiti or a FalkorDB connection."""
+    # Imported lazily so the E2E fixtures above don't load the memory stack
+    from api.memory.graphiti_tool import MemoryTool  # pylint: disable=import-outside-toplevel
+
+    def _make(driver=None):
+        tool = MemoryTool.__new__(MemoryTool)
+        tool.user_id, tool.graph_id, tool.memory_db = "u1", "shop", "u1-memory"
+        tool.database_uuid = "db-uuid"
+        tool._episode_cache = OrderedDict()  # pylint: disable=protected-access
+        tool.graphiti_client = MagicMock(driver=driver)
+        return tool
+
+    return _make
@@ -0,0 +1,235 @@
+"""Tests for the guardrails applied to generated SQL."""
+
+import unittest
+from unittest.mock import patch
+
+import psycopg2.extensions
+
+from api.loaders.base_loader import QueryCancelHandle
+from api.loaders.execution_policy import (
+    ExecutionPolicy, QueryCancelledError, QueryTimeoutError, apply_row_limit, is_read_statement
+)
+from api.loaders.mysql_loader import MySQLLoader
+from api.loaders.postgres_loader import PostgresLoader
+
+
+class TestApplyRowLimit(unittest.TestCase):
+    """Test cases for apply_row_limit"""
+
+    def test_limit_is_injected(self):
+        """A SELECT without a LIMIT gets one appended"""
+        self.assertEqual(
+            apply_row_limit("SELECT * FROM orders;", 100),
+            ("SELECT * FROM orders\nLIMIT 100", "injected"),
+        )
+
+    def test_larger_limit_is_clamped(self):
+        """A LIMIT above the row limit is lowered, keeping any OFFSET"""
+        self.assertEqual(
+            apply_row_limit("SELECT * FROM orders LIMIT 50000 OFFSET 10", 100),
+            ("SELECT * FROM orders LIMIT 100 OFFSET 10", "clamped"),
+        )
+
+    def test_smaller_limit_is_kept(self):
+        """A LIMIT within the row limit is left alone"""
+        sql = "SELECT * FROM orders LIMIT 5"
+        self.assertEqual(apply_row_limit(sql, 100), (sql, None))
+
+    def test_aggregates_are_not_limited(self):
+        """Grouping or aggregating queries are left alone"""
+        for sql in (
+            "SELECT COUNT(*) FROM orders",
+            "SELECT status, SUM(total) FROM orders GROUP BY status",
+        ):
+            with self.subTest(sql=sql):
+                self.assertEqual(apply_row_limit(sql, 100), (sql, None))
+
+    def test_window_aggregates_are_limited(self):
+        """An aggregate with OVER keeps every row, so it still gets a LIMIT"""
+        for sql in (
+            "SELECT a, SUM(x) OVER (PARTITION BY a) FROM big",
+            "SELECT a, COUNT(*) FILTER (WHERE x > 0) OVER () FROM big",
+        ):
+            with self.subTest(sql=sql):
+                self.assertEqual(apply_row_limit(sql, 100), (f"{sql}\nLIMIT 100", "injected"))
+
+    def test_parameterized_limit_is_kept(self):
+        """A LIMIT given as a bind parameter counts as present"""
+        for sql in (
+            "SELECT * FROM orders LIMIT $1",
+            "SELECT * FROM orders LIMIT ?",
+            "SELECT * FROM orders LIMIT ?, ?",
+            "SELECT * FROM orders LIMIT :n OFFSET :skip",
+            "SELECT * FROM orders LIMIT %s",
+        ):
+            with self.subTest(sql=sql):
+                self.assertEqual(apply_row_limit(sql, 100), (sql, None))
+
+    def test_nested_limit_does_not_count(self):
+        """Only the outer query's LIMIT is considered"""
+        rewritten, action = apply_row_limit("SELECT * FROM (SELECT id FROM t LIMIT 10) o", 100)
+
+        self.assertEqual(action, "injected")
+        self.assertTrue(rewritten.endswith("\nLIMIT 100"))
+
+    def test_writes_and_strings_are_untouched(self):
+        """Non-SELECT statements and LIMITs inside literals are ignored"""
+        self.assertEqual(apply_row_limit("DELETE FROM orders", 100), ("DELETE FROM orders", None))
+        self.assertEqual(
+            apply_row_limit("SELECT 'LIMIT 5' AS note FROM orders", 100)[1], "injected"
+        )
+
+
+class TestExecutionPolicy(unittest.TestCase):
+    """Test cases for ExecutionPolicy"""
+
+    def test_graph_settings_override_defaults(self):
+        """Settings set on the graph win, missing ones use Config"""
+        policy = ExecutionPolicy.from_settings({"row_limit": 10, "read_only": None})
+
+        self.assertEqual(policy.row_limit, 10)
+        self.assertTrue(policy.read_only)
+
+    def test_writes_get_no_read_guardrails(self):
+        """Write statements are neither read-only nor timed out"""
+        _, report = ExecutionPolicy(row_limit=10).prepare("UPDATE orders SET total = 0")
+
+        self.assertEqual(
+            report,
+            {"limit": None, "limit_action": None, "read_only": False, "statement_timeout_ms": 0},
+        )
+
+    def test_data_modifying_ctes_are_writes(self):
+        """A WITH statement that writes, in its main statement or a CTE, isn't a read"""
+        for sql in (
+            # PostgreSQL
+            "WITH old AS (SELECT id FROM orders WHERE placed < '2020-01-01') "
+            "DELETE FROM orders WHERE id IN (SELECT id FROM old) RETURNING id",
+            "WITH moved AS (DELETE FROM orders RETURNING *) "
+            "INSERT INTO archive SELECT * FROM moved",
+            "WITH d AS (UPDATE orders SET total = 0 RETURNING id) SELECT count(*) FROM d",
+            # MySQL 8
+            "WITH stale AS (SELECT id FROM orders WHERE total = 0) "
+            "UPDATE orders JOIN stale ON orders.id = stale.id SET orders.status = 'void'",
+            "WITH stale AS (SELECT id FROM orders) DELETE orders FROM orders JOIN stale USING (id)",
+        ):
+            with self.subTest(sql=sql):
+                self.assertFalse(is_read_statement(sql))
+                self.assertEqual(
+                    ExecutionPolicy(row_limit=1000).prepare(sql),
+                    (sql, {"limit": None, "limit_action": None, "read_only": False,
+                           "statement_timeout_ms": 0}),
+                )
+
+        # Words inside literals and row locks don't make a read a write
+        self.assertTrue(is_read_statement("WITH a AS (SELECT 'delete' AS x) SELECT * FROM a"))
+        self.assertTrue(is_read_statement("WITH a AS (SELECT * FROM t FOR UPDATE) SELECT * FROM a"))
+
+    @patch("api.loaders.postgres_loader.psycopg2.connect")
+    def test_postgres_runs_reads_read_only_with_timeout(self, mock_connect):
+        """The transaction is made read-only and timed out before the query runs"""
+        conn = mock_connect.return_value
+        session = conn.cursor.return_value.__enter__.return_value
+        url = "postgresql://u:p@localhost:5432/policytest"
+        policy = ExecutionPolicy(row_limit=0, statement_timeout_ms=1500)
+
+        conn.cursor.return_value.description = [("one", 23)]
+        conn.cursor.return_value.fetchmany.side_effect = [[(1,)], []]
+
+        try:
+            list(PostgresLoader.execute_sql_query_stream("SELECT 1", url, 10, policy))
+        finally:
+            PostgresLoader.connection_pool(url).close_all()
+
+        self.assertEqual(
+            [c.args for c in session.execute.call_args_list],
+            [("SET TRANSACTION READ ONLY",), ("SET LOCAL statement_timeout = %s", (1500,))],
+        )
+
+    @patch("api.loaders.postgres_loader.psycopg2.connect")
+    def test_postgres_cancellation_raises_timeout(self, mock_connect):
+        """A query cancelled by statement_timeout surfaces as QueryTimeoutError"""
+        mock_connect.return_value.cursor.return_value.execute.side_effect = (
+            psycopg2.extensions.QueryCanceledError("canceling statement due to statement timeout")
+        )
+        url = "postgresql://u:p@localhost:5432/policytimeout"
+
+        try:
+            with self.assertRaises(QueryTimeoutError):
+                list(PostgresLoader.execute_sql_query_stream(
+                    "SELECT pg_sleep(10)", url, 10, ExecutionPolicy(read_only=False)
+                ))
+        finally:
+            PostgresLoader.connection_pool(url).close_all()
+
+
+    @patch("api.loaders.postgres_loader.psycopg2.connect")
+    def test_postgres_client_cancel_is_not_a_timeout(self, mock_connect):
+        """A statement we cancelled ourselves surfaces as QueryCancelledError"""
+        mock_connect.return_value.cursor.return_value.execute.side_effect = (
+            psycopg2.extensions.QueryCanceledError("canceling statement due to user request")
+        )
+        url = "postgresql://u:p@localhost:5432/policyclientcancel"
+        handle = QueryCancelHandle()
+        handle.cancel()
+
+        try:
+            with self.assertRaises(QueryCancelledError):
+                list(PostgresLoader.execute_sql_query_stream(
+                    "SELECT pg_sleep(10)", url, 10, ExecutionPolicy(read_only=False), handle
+                ))
+        finally:
+            PostgresLoader.connection_pool(url).close_all()
+
+class TestCostGate(unittest.TestCase):
+    """Test cases for the EXPLAIN-based cost gate"""
+
+    def test_violations_name_each_exceeded_threshold(self):
+        """Only thresholds that are set and exceeded are reported"""
+        policy = ExecutionPolicy(cost_gate="reject", max_estimated_rows=1000)
+        estimate = {"estimated_rows": 5000, "estimated_cost": 1e9}
+
+        self.assertTrue(policy.checks_cost)
+        self.assertEqual(policy.cost_violations(estimate), ["~5,000 rows (limit 1,000)"])
+        self.assertFalse(ExecutionPolicy(cost_gate="off", max_estimated_rows=1).checks_cost)
+
+    @patch("api.loaders.postgres_loader.psycopg2.connect")
+    def test_postgres_plan_is_summarized(self, mock_connect):
+        """The largest step estimate and the root cost are extracted from the plan"""
+        plan = [{"Plan": {
+            "Node Type": "Limit", "Plan Rows": 100, "Total Cost": 4321.5,
+            "Plans": [{"Node Type": "Seq Scan", "Relation Name": "orders", "Plan Rows": 2500000}],
+        }}]
+        cursor = mock_connect.return_value.cursor.return_value.__enter__.return_value
+        cursor.fetchone.return_value = (plan,)
+        url = "postgresql://u:p@localhost:5432/explaintest"
+
+        try:
+            estimate = PostgresLoader.explain_sql_query("SELECT * FROM orders LIMIT 100", url)
+        finally:
+            PostgresLoader.connection_pool(url).close_all()
+
+        cursor.execute.assert_called_once_with(
+            "EXPLAIN (FORMAT JSON) SELECT * FROM orders LIMIT 100"
+        )
+        self.assertEqual(estimate["estimated_rows"], 2500000)
+        self.assertEqual(estimate["estimated_cost"], 4321.5)
+        self.assertEqual(
+            estimate["plan"], "Limit (~100 rows)\n  Seq Scan on orders (~2,500,000 rows)"
+        )
+
+    def test_mysql_plan_tables_are_found_in_nested_loops(self):
+        """Table steps are collected from joins at any depth"""
+        block = {"nested_loop": [
+            {"table": {"table_name": "o", "access_type": "ALL", "rows_examined_per_scan": 900}},
+            {"table": {"table_name": "c", "access_type": "eq_ref", "rows_examined_per_scan": 1}},
+        ]}
+
+        self.assertEqual(
+            [t["table_name"] for t in MySQLLoader._plan_tables(block)],  # pylint: disable=protected-access
+            ["o", "c"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+"""Tests for background CSV/Parquet exports."""
+
+import asyncio
+import os
+import tempfile
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from api.config import Config
+from api.core import export
+from api.core.errors import InvalidArgumentError, JobNotFoundError
+
+
+class _FakeRedis:
+    """Just enough of the redis.asyncio API for the job store."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def hset(self, key, mapping):
+        """Set hash fields."""
+        self.data.setdefault(key, {}).update(mapping)
+
+    async def hgetall(self, key):
+        """Return all hash fields."""
+        return dict(self.data.get(key, {}))
+
+    async def expire(self, key, seconds):
+        """Expiry isn't simulated."""
+
+
+def _loader(chunks):
+    async def _stream(*_args, **_kwargs):
+        for rows in chunks:
+            yield rows, False
+
+    return MagicMock(stream_sql_query=_stream)
+
+
+class TestExports:
+    """Test cases for export jobs."""
+
+    def test_rows_are_written_to_csv_incrementally(self):
+        """Every chunk is appended to the file and the job records the row count."""
+        fake = _FakeRedis()
+        chunks = [[{"id": 1, "name": "a"}, {"id": 2, "name": None}], [{"id": 3, "name": "c,d"}]]
+
+        with tempfile.TemporaryDirectory() as export_dir, \
+                patch.object(Config, "EXPORT_DIR", export_dir), \
+                patch.object(export, "db", MagicMock(connection=fake)):
+            asyncio.run(export._run_export(  # pylint: disable=protected-access
+                "job1", "csv", _loader(chunks), "", "SELECT * FROM t", policy=MagicMock()
+            ))
+            with open(os.path.join(export_dir, "job1.csv"), encoding="utf-8") as f:
+                content = f.read()
+
+        assert content.splitlines() == ["id,name", "1,a", "2,", '3,"c,d"']
+        job = fake.data[export._job_key("job1")]  # pylint: disable=protected-access
+        assert job["status"] == "completed" and job["rows"] == "3"
+
+    def test_failed_export_removes_partial_file(self):
+        """A query failing mid-stream leaves no file behind."""
+        fake = _FakeRedis()
+
+        async def _failing(*_args, **_kwargs):
+            yield [{"id": 1}], False
+            raise RuntimeError("connection lost")
+
+        with tempfile.TemporaryDirectory() as export_dir, \
+                patch.object(Config, "EXPORT_DIR", export_dir), \
+                patch.object(export, "db", MagicMock(connection=fake)):
+            asyncio.run(export._run_export(  # pylint: disable=protected-access
+                "job2", "csv", MagicMock(stream_sql_query=_failing), "", "SELECT 1",
+                policy=MagicMock(),
+            ))
+            assert not os.listdir(export_dir)
+
+        assert fake.data[export._job_key("job2")]["status"] == "failed"  # pylint: disable=protected-access
+
+    def test_only_read_queries_can_be_exported(self):
+        """Writes are rejected before any job is created."""
+        with pytest.raises(InvalidArgumentError):
+            asyncio.run(export.start_export_job("u1", "shop", "DELETE FROM orders"))
+
+    def test_unfinished_export_cannot_be_downloaded(self):
+        """Downloading a running export is a not-found error."""
+        fake = _FakeRedis()
+        fake.data[export._job_key("job3")] = {  # pylint: disable=protected-access
+            "user_id": "u1", "graph_id": "u1_shop", "format": "csv", "status": "running",
+        }
+
+        with patch.object(export, "db", MagicMock(connection=fake)):
+            with pytest.raises(JobNotFoundError):
+                asyncio.run(export.get_export_file("u1", "shop", "job3"))
+
+    @patch.object(Config, "EXPORT_TTL_SECONDS", 60)
+    def test_expired_files_are_cleaned_up(self):
+        """Files older than the TTL are deleted, fresh ones kept."""
+        with tempfile.TemporaryDirectory() as export_dir, \
+                patch.object(Config, "EXPORT_DIR", export_dir):
+            old, fresh = os.path.join(export_dir, "old.csv"), os.path.join(export_dir, "new.csv")
+            for path in (old, fresh):
+                open(path, "w", encoding="utf-8").close()  # pylint: disable=consider-using-with
+            os.utime(old, (time.time() - 120, time.time() - 120))
+
+            assert export.cleanup_expired_exports() == 1
+            assert os.listdir(export_dir) == ["new.csv"]
+
+    @patch.object(Config, "EXPORT_TTL_SECONDS", 60)
+    def test_expired_files_are_cleaned_up_without_new_exports(self):
+        """The cleanup started at startup runs right away and stops on shutdown."""
+        with tempfile.TemporaryDirectory() as export_dir, \
+                patch.object(Config, "EXPORT_DIR", export_dir):
+            old = os.path.join(export_dir, "old.csv")
+            open(old, "w", encoding="utf-8").close()  # pylint: disable=consider-using-with
+            os.utime(old, (time.time() - 120, time.time() - 120))
+
+            async def _run():
+                export.start_export_cleanup()
+                for _ in range(100):
+                    if not os.path.exists(old):
+                        break
+                    await asyncio.sleep(0.01)
+                await export.shutdown_export_jobs(timeout=1)
+                return export._cleanup_tasks[0]  # pylint: disable=protected-access
+
+            task = asyncio.run(_run())
+
+            assert not os.listdir(export_dir)
+            assert task.cancelled()
+
+    def test_parquet_columns_take_the_type_of_their_first_values(self):
+        """A column NULL in the first chunk still gets the type of its later values."""
+        pq = pytest.importorskip("pyarrow.parquet")
+        fake = _FakeRedis()
+        chunks = [
+            [{"id": 1, "amount": None, "meta": {"a": 1}}],
+            [{"id": 2, "amount": 2.0, "meta": None}],
+            [{"id": 3, "amount": 2.5, "meta": [1, 2]}],
+        ]
+
+        with tempfile.TemporaryDirectory() as export_dir, \
+                patch.object(Config, "EXPORT_DIR", export_dir), \
+                patch.object(export, "db", MagicMock(connection=fake)):
+            asyncio.run(export._run_export(  # pylint: disable=protected-access
+                "job4", "parquet", _loader(chunks), "", "SELECT * FROM t", policy=MagicMock()
+            ))
+            table = pq.read_table(os.path.join(export_dir, "job4.parquet"))
+
+        assert [str(field.type) for field in table.schema] == ["int64", "double", "string"]
+        assert table.to_pydict() == {
+            "id": [1, 2, 3], "amount": [None, 2.0, 2.5], "meta": ['{"a": 1}', None, "[1, 2]"],
+        }
+        assert fake.data[export._job_key("job4")]["status"] == "completed"  # pylint: disable=protected-access
+
+    def test_parquet_columns_that_stay_null_are_strings(self):
+        """After the probe, untyped columns are written as strings and later values converted."""
+        pq = pytest.importorskip("pyarrow.parquet")
+        fake = _FakeRedis()
+        chunks = [[{"id": 1, "note": None}], [{"id": 2, "note": 7}]]
+
+        with tempfile.TemporaryDirectory() as export_dir, \
+                patch.object(Config, "EXPORT_DIR", export_dir), \
+                patch.object(export, "_PARQUET_TYPE_PROBE_ROWS", 1), \
+                patch.object(export, "db", MagicMock(connection=fake)):
+            asyncio.run(export._run_export(  # pylint: disable=protected-access
+                "job5", "parquet", _loader(chunks), "", "SELECT * FROM t", policy=MagicMock()
+            ))
+            table = pq.read_table(os.path.join(export_dir, "job5.parquet"))
+
+        assert table.to_pydict() == {"id": [1, 2], "note": [None, "7"]}
@@ -0,0 +1,205 @@
+"""Tests for the graph loader: blue/green reloads and column keys."""
+
+import asyncio
+import os
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from redis.exceptions import WatchError
+
+from api.loaders import graph_loader
+from api.loaders.graph_loader import (
+    column_key,
+    create_references,
+    create_schema_indexes,
+    is_internal_graph_name,
+    load_to_graph,
+    staging_graph_name,
+)
+
+
+class TestGraphLoaderSwap:
+    """Test cases for staging builds and graph swaps."""
+
+    def test_internal_graph_names(self):
+        """Staging and retired graphs are hidden, user graphs are not."""
+        assert is_internal_graph_name(staging_graph_name("user_shop"))
+        assert is_internal_graph_name("user_shop__retired_1700000000000")
+        assert not is_internal_graph_name("user_shop")
+        assert not is_internal_graph_name("user_shop__retired")
+
+    @patch.object(graph_loader, "_carry_over_settings", new_callable=AsyncMock)
+    @patch.object(graph_loader, "swap_graph", new_callable=AsyncMock)
+    @patch.object(graph_loader, "_drop_graph", new_callable=AsyncMock)
+    @patch.object(graph_loader, "_build_graph", new_callable=AsyncMock)
+    def test_successful_load_swaps_staging_in(
+        self, mock_build, mock_drop, mock_swap, mock_carry_over
+    ):
+        """A complete build is swapped over the live graph."""
+        with patch.object(graph_loader, "db", MagicMock(connection=AsyncMock())):
+            asyncio.run(load_to_graph("user_shop", {}, {}, db_name="shop"))
+
+        mock_build.assert_awaited_once()
+        mock_drop.assert_awaited_once_with("user_shop__staging")
+        mock_swap.assert_awaited_once_with("user_shop__staging", "user_shop")
+        mock_carry_over.assert_awaited_once_with("user_shop", "user_shop__staging")
+
+    @patch.object(graph_loader, "swap_graph", new_callable=AsyncMock)
+    @patch.object(graph_loader, "_drop_graph", new_callable=AsyncMock)
+    @patch.object(graph_loader, "_build_graph", new_callable=AsyncMock)
+    def test_failed_load_keeps_live_graph(self, mock_build, mock_drop, mock_swap):
+        """A failed build drops the staging graph and never touches the live one."""
+        mock_build.side_effect = RuntimeError("embedding provider down")
+
+        with patch.object(graph_loader, "db", MagicMock(connection=AsyncMock())):
+            with pytest.raises(RuntimeError):
+                asyncio.run(load_to_graph("user_shop", {}, {}, db_name="shop"))
+
+        mock_swap.assert_not_awaited()
+        assert all(
+            call.args[0] == "user_shop__staging" for call in mock_drop.await_args_list
+        )
+        assert not graph_loader._reload_locks  # pylint: disable=protected-access
+
+    def test_swap_is_retried_when_the_live_graph_changes(self):
+        """A live graph deleted between WATCH and EXEC doesn't leave a half-applied swap"""
+        pipe = MagicMock()
+        pipe.watch = AsyncMock()
+        pipe.exists = AsyncMock(side_effect=[1, 0])
+        pipe.execute = AsyncMock(side_effect=[WatchError(), [True]])
+        conn = MagicMock()
+        conn.pipeline.return_value.__aenter__ = AsyncMock(return_value=pipe)
+        conn.pipeline.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        with patch.object(graph_loader, "db", MagicMock(connection=conn)), \
+                patch.object(graph_loader, "_retire_later") as retire_later:
+            asyncio.run(graph_loader.swap_graph("user_shop__staging", "user_shop"))
+
+        renames = [c.args for c in pipe.rename.call_args_list]
+        assert renames[-1] == ("user_shop__staging", "user_shop")
+        assert len(renames) == 3  # retire + swap, then the swap alone on retry
+        retire_later.assert_not_called()
+
+    @patch.object(graph_loader, "_drop_graph", new_callable=AsyncMock)
+    @patch.object(graph_loader, "_retire_later")
+    def test_startup_cleanup_drops_abandoned_graphs(self, retire_later, mock_drop):
+        """Leftovers are dropped; graphs being built or resumable are kept"""
+        retired_at = int((time.time() - 3600) * 1000)
+        db = MagicMock()
+        db.list_graphs = AsyncMock(return_value=[
+            "u_shop", f"u_shop__retired_{retired_at}", "u_crm__staging",
+            "u_hr__staging", "u_erp__staging",
+        ])
+        db.connection.exists = AsyncMock(side_effect=lambda key: key == "graph:building:u_hr")
+
+        with patch.object(graph_loader, "db", db):
+            asyncio.run(graph_loader.cleanup_internal_graphs(keep_staging={"u_erp"}))
+
+        retire_later.assert_called_once_with(f"u_shop__retired_{retired_at}", 0.0)
+        mock_drop.assert_awaited_once_with("u_crm__staging")
+
+
+class TestColumnKeys:
+    """Test cases for table-qualified column keys."""
+
+    def test_references_are_created_by_qualified_key_in_batches(self):
+        """Edges are matched on Column.qualified_name, one query per batch."""
+        graph = MagicMock(query=AsyncMock())
+        rows = [
+            {"source": column_key("orders", f"c{i}"), "target": column_key("users", "id"),
+             "rel_name": f"fk{i}", "note": ""}
+            for i in range(5)
+        ]
+
+        asyncio.run(create_references(graph, rows, batch_size=2))
+
+        assert graph.query.await_count == 3
+        query, params = graph.query.await_args_list[0].args
+        assert "qualified_name: row.source" in query
+        assert params["rows"][0]["source"] == "orders.c0"
+
+    def test_failed_batch_is_retried_row_by_row(self):
+        """One bad row costs only its own edge, not the rest of its batch."""
+        calls = []
+
+        async def _query(_query, params):
+            calls.append(params["rows"])
+            if len(params["rows"]) > 1 or params["rows"][0]["rel_name"] == "bad":
+                raise RuntimeError("invalid property value")
+
+        rows = [
+            {"source": column_key("orders", col), "target": column_key("users", "id"),
+             "rel_name": rel, "note": ""}
+            for col, rel in (("a", "fk_a"), ("b", "bad"), ("c", "fk_c"))
+        ]
+
+        with patch.object(graph_loader.logging, "warning") as warning:
+            asyncio.run(create_references(MagicMock(query=_query), rows, batch_size=3))
+
+        assert calls[1:] == [[row] for row in rows]
+        assert warning.call_count == 2
+        assert warning.call_args_list[0].args[1:4] == (0, 2, 3)
+
+
+@pytest.mark.slow
+@pytest.mark.skipif(not os.getenv("FALKORDB_URL"), reason="requires a FalkorDB server")
+class TestColumnKeyBenchmark:  # pylint: disable=too-few-public-methods
+    """Batched edge creation on a 50k-column synthetic schema, with and without
+    the Column.qualified_name index."""
+
+    TABLES = 500
+    COLUMNS_PER_TABLE = 100
+    EDGES = 2000
+
+    async def _seed(self, graph, index_keys):
+        if index_keys:
+            await create_schema_indexes(graph, 4)
+        else:
+            # The same lookup indexes, minus the qualified key
+            await graph.query("CREATE INDEX FOR (p:Table) ON (p.name)")
+            await graph.query("CREATE INDEX FOR (c:Column) ON (c.name)")
+        for start in range(0, self.TABLES, 50):
+            await graph.query(
+                """
+                UNWIND range($start, $end) AS t
+                CREATE (tbl:Table {name: 't' + toString(t)})
+                WITH tbl
+                UNWIND range(0, $cols - 1) AS c
+                WITH tbl, CASE c WHEN 0 THEN 'id' ELSE 'c' + toString(c) END AS col
+                CREATE (:Column {name: col, qualified_name: tbl.name + '.' + col})
+                    -[:BELONGS_TO]->(tbl)
+                """,
+                {"start": start, "end": start + 49, "cols": self.COLUMNS_PER_TABLE},
+            )
+
+    def _edges(self):
+        return [
+            {"source": column_key(f"t{i % self.TABLES}", "c1"),
+             "target": column_key(f"t{(i + 1) % self.TABLES}", "id"),
+             "rel_name": f"fk{i}", "note": ""}
+            for i in range(self.EDGES)
+        ]
+
+    async def _time_references(self, client, graph_name, index_keys):
+        graph = client.select_graph(graph_name)
+        try:
+            await self._seed(graph, index_keys)
+            started = time.perf_counter()
+            await create_references(graph, self._edges())
+            return time.perf_counter() - started
+        finally:
+            await graph.delete()
+
+    async def _run(self):
+        from falkordb.asyncio import FalkorDB  # pylint: disable=import-outside-toplevel
+
+        client = FalkorDB.from_url(os.environ["FALKORDB_URL"])
+        unindexed = await self._time_references(client, "bench_column_keys_scan", False)
+        indexed = await self._time_references(client, "bench_column_keys_seek", True)
+        return unindexed, indexed
+
+    def test_key_index_speeds_up_batched_edge_creation(self):
+        """The same batched edge creation is faster with the qualified-key index."""
+        unindexed, indexed = asyncio.run(self._run())
+        assert indexed < unindexed
@@ -0,0 +1,162 @@
+"""Tests for resumable background ingestion jobs."""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from api.core import ingestion
+
+
+class _FakeRedis:
+    """Just enough of the redis.asyncio API for the job store."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def hset(self, key, mapping):
+        """Merge fields into a hash."""
+        self.data.setdefault(key, {}).update(mapping)
+
+    async def hgetall(self, key):
+        """Return a copy of a hash."""
+        return dict(self.data.get(key, {}))
+
+    async def hincrby(self, key, field, amount):
+        """Increment a hash field."""
+        value = int(self.data.setdefault(key, {}).get(field, 0)) + amount
+        self.data[key][field] = str(value)
+
+    async def get(self, key):
+        """Return a string value."""
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):  # pylint: disable=unused-argument
+        """Set a value, honouring nx."""
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def sadd(self, key, member):
+        """Add a member to a set."""
+        self.data.setdefault(key, set()).add(member)
+
+    async def smembers(self, key):
+        """Return a copy of a set."""
+        return set(self.data.get(key, set()))
+
+    async def scard(self, key):
+        """Return the size of a set."""
+        return len(self.data.get(key, set()))
+
+    async def exists(self, key):
+        """Return 1 if the key exists."""
+        return int(key in self.data)
+
+    async def expire(self, key, seconds):
+        """TTLs are not modelled."""
+
+    async def hdel(self, key, *fields):
+        """Remove fields from a hash."""
+        for field in fields:
+            self.data.get(key, {}).pop(field, None)
+
+    async def delete(self, *keys):
+        """Remove keys."""
+        for key in keys:
+            self.data.pop(key, None)
+
+
+class TestIngestionJobs:
+    """Test cases for job checkpointing and resume."""
+
+    def test_resume_skips_extraction_and_completed_tables(self):
+        """A resumed job reuses the catalog checkpoint and the written tables."""
+        fake = _FakeRedis()
+        job_key = ingestion._job_key("job1")  # pylint: disable=protected-access
+        fake.data[job_key] = {
+            "user_id": "u1",
+            "url": "postgresql://u:p@localhost/shop",
+            "status": "failed",
+        }
+        catalog = {
+            "db_name": "shop",
+            "entities": {"users": {}, "orders": {}},
+            "relationships": {},
+        }
+        fake.data[f"{job_key}:catalog"] = json.dumps(catalog)
+        fake.data[f"{job_key}:tables"] = {"users"}
+        fake.data["u1_shop__staging"] = "graph"
+
+        loader = MagicMock()
+        loader.extract_schema = AsyncMock()
+
+        async def _fake_load(graph_id, *_args, completed_tables, on_table_loaded, **_kwargs):
+            assert graph_id == "u1_shop"
+            assert completed_tables == {"users"}
+            await on_table_loaded("orders")
+
+        async def _run():
+            await ingestion.resume_ingestion_job("job1", "u1")
+            await asyncio.gather(*ingestion._running_jobs.values())  # pylint: disable=protected-access
+
+        with patch.object(ingestion, "db", MagicMock(connection=fake)), \
+                patch.object(ingestion, "detect_loader", return_value=("postgresql", loader)), \
+                patch.object(ingestion, "load_to_graph", side_effect=_fake_load):
+            asyncio.run(_run())
+
+        loader.extract_schema.assert_not_awaited()
+        assert fake.data[job_key]["status"] == "completed"
+        assert fake.data[job_key]["tables_done"] == "2"
+        assert f"{job_key}:catalog" not in fake.data
+        assert "url" not in fake.data[job_key]
+
+    def test_new_job_starts_from_an_empty_staging_graph(self):
+        """A fresh run never continues leftovers, and drops staging if nothing was written"""
+        fake = _FakeRedis()
+        loader = MagicMock()
+        loader.extract_schema = AsyncMock(return_value=("shop", {"users": {}}, {}))
+        load = AsyncMock(side_effect=RuntimeError("embedding provider down"))
+        drop = AsyncMock()
+
+        async def _run():
+            job = await ingestion.start_ingestion_job("postgresql://u:p@localhost/shop", "u1")
+            await asyncio.gather(*ingestion._running_jobs.values())  # pylint: disable=protected-access
+            return job["job_id"]
+
+        with patch.object(ingestion, "db", MagicMock(connection=fake)), \
+                patch.object(ingestion, "detect_loader", return_value=("postgresql", loader)), \
+                patch.object(ingestion, "load_to_graph", load), \
+                patch.object(ingestion, "drop_staging_graph", drop):
+            job_id = asyncio.run(_run())
+
+        assert load.await_args.kwargs["completed_tables"] is None
+        drop.assert_awaited_once_with("u1_shop")
+        assert fake.data[ingestion._job_key(job_id)]["status"] == "failed"  # pylint: disable=protected-access
+
+    def test_job_owned_by_another_process_is_not_run_twice(self):
+        """A live owner lock makes start return the job instead of resuming it"""
+        fake = _FakeRedis()
+        url = "postgresql://u:p@localhost/shop"
+        job_key = ingestion._job_key("job1")  # pylint: disable=protected-access
+        fake.data[job_key] = {"user_id": "u1", "url": url, "status": "running",
+                              "updated_at": "0"}
+        fake.data[ingestion._source_key("u1", url)] = "job1"  # pylint: disable=protected-access
+        fake.data[f"{job_key}:owner"] = "other-process"
+        load = AsyncMock()
+
+        async def _run():
+            job = await ingestion.start_ingestion_job(url, "u1")
+            # A direct run (e.g. a racing resume) backs off too
+            await ingestion._run_job("job1", resume=True)  # pylint: disable=protected-access
+            return job
+
+        with patch.object(ingestion, "db", MagicMock(connection=fake)), \
+                patch.object(ingestion, "detect_loader",
+                             return_value=("postgresql", MagicMock())), \
+                patch.object(ingestion, "load_to_graph", load):
+            job = asyncio.run(_run())
+
+        assert job["status"] == "running"
+        load.assert_not_awaited()
+        assert fake.data[f"{job_key}:owner"] == "other-process"
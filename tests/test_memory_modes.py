@@ -0,0 +1,79 @@
+"""Tests for memory modes."""
+
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from pydantic import ValidationError
+
+from api.core.graph_settings import GraphSettings
+from api.memory import modes
+from api.memory.modes import record_memory, resolve_memory_mode
+
+
+class TestMemoryModes(unittest.TestCase):
+    """Test cases for resolving and recording memory modes"""
+
+    @patch.object(modes.Config, "MEMORY_MODE", "full")
+    def test_graph_setting_overrides_the_default(self):
+        """Graphs without a memory_mode use MEMORY_MODE"""
+        self.assertEqual(resolve_memory_mode(None), "full")
+        self.assertEqual(resolve_memory_mode("lightweight"), "lightweight")
+
+    @patch.object(modes.Config, "MEMORY_MODE", "full")
+    def test_token_mode_can_only_restrict(self):
+        """A request uses the more restrictive of the graph's and the token's mode"""
+        self.assertEqual(resolve_memory_mode(None, "off"), "off")
+        self.assertEqual(resolve_memory_mode("lightweight", "full"), "lightweight")
+        self.assertEqual(resolve_memory_mode("off", "lightweight"), "off")
+
+    @patch.object(modes.Config, "MEMORY_MODE", "everything")
+    def test_unknown_modes_are_ignored(self):
+        """A misconfigured default or stale token value falls back to full memory"""
+        self.assertEqual(resolve_memory_mode(None, "minimal"), "full")
+
+    def test_graph_settings_accept_only_known_modes(self):
+        """memory_mode is validated like the other graph settings"""
+        self.assertEqual(GraphSettings(memory_mode="off").memory_mode, "off")
+        with self.assertRaises(ValidationError):
+            GraphSettings(memory_mode="partial")
+
+    def test_counters_are_kept_per_mode(self):
+        """Requests, memory time and saves add up under their own mode"""
+        stats = {mode: dict.fromkeys(values, 0) for mode, values in
+                 modes.memory_mode_stats.items()}
+
+        with patch.dict(modes.memory_mode_stats, stats):
+            record_memory("lightweight", requests=1, seconds=0.25)
+            record_memory("lightweight", seconds=0.5, query_saves=1)
+            lightweight = dict(modes.memory_mode_stats["lightweight"])
+            full = dict(modes.memory_mode_stats["full"])
+
+        self.assertEqual(lightweight, {"requests": 1, "seconds": 0.75, "query_saves": 1,
+                                       "conversation_saves": 0})
+        self.assertEqual(full["requests"], 0)
+
+
+class TestLightweightSearch:  # pylint: disable=too-few-public-methods
+    """Test cases for search_memories in lightweight mode"""
+
+    def test_only_similar_queries_are_searched(self, memory_tool):
+        """The Graphiti searches (LLM reranking, user summary) are skipped"""
+        tool = memory_tool()
+        tool.search_user_summary = AsyncMock(return_value="Prefers EUR")
+        tool.search_database_facts = AsyncMock(return_value="Facts:\norders has 10 rows")
+        tool.retrieve_similar_queries = AsyncMock(return_value=[
+            {"user_query": "How many orders?", "sql_query": "SELECT count(*) FROM orders",
+             "success": True},
+        ])
+
+        context = asyncio.run(tool.search_memories("How many orders today?", lightweight=True))
+
+        assert "SELECT count(*) FROM orders" in context
+        assert "Prefers EUR" not in context
+        tool.search_user_summary.assert_not_called()
+        tool.search_database_facts.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""Tests for the write-behind memory queue."""
+
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from api.memory.persistence import MemoryWriteQueue
+
+
+def _tool(user_id="u1", graph_id="shop"):
+    return MagicMock(
+        user_id=user_id, graph_id=graph_id,
+        save_query_memory=AsyncMock(return_value=True),
+        add_new_memory=AsyncMock(return_value=True),
+    )
+
+
+@patch("api.memory.persistence.memory_sweeper", MagicMock())
+class TestMemoryWriteQueue(unittest.TestCase):
+    """Test cases for MemoryWriteQueue"""
+
+    def test_turns_queued_during_a_write_are_coalesced(self):
+        """Turns arriving while a graph's batch is written are summarized together"""
+        queue = MemoryWriteQueue(workers=1, max_pending=10)
+        tool = _tool()
+        release = asyncio.Event()
+
+        async def _slow_add(_conversation, _history):
+            await release.wait()
+            return True
+
+        tool.add_new_memory.side_effect = _slow_add
+
+        async def _run():
+            queue.submit_conversation(tool, {"question": "q1"}, (["q1"], []))
+            await asyncio.sleep(0.01)  # the worker picks up q1
+            queue.submit_conversation(tool, {"question": "q2"}, (["q1", "q2"], ["a1"]))
+            queue.submit_conversation(tool, {"question": "q3"}, (["q1", "q2", "q3"], ["a1", "a2"]))
+            release.set()
+            await queue.flush(timeout=5)
+
+        asyncio.run(_run())
+
+        calls = tool.add_new_memory.await_args_list
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(calls[0].args[0], {"question": "q1"})
+        self.assertEqual([t["question"] for t in calls[1].args[0]["turns"]], ["q2", "q3"])
+        self.assertEqual(calls[1].args[1], (["q1", "q2", "q3"], ["a1", "a2"]))
+        self.assertEqual(queue.stats()["coalesced"], 1)
+        self.assertEqual(queue.stats()["written"], 3)
+
+    def test_full_queue_drops_new_turns(self):
+        """Beyond max_pending waiting items, submissions are dropped and counted"""
+        queue = MemoryWriteQueue(workers=1, max_pending=1)
+        tool = _tool()
+
+        async def _run():
+            accepted = [
+                queue.submit_query(tool, query="q", sql_query="SELECT 1", success=True),
+                queue.submit_conversation(tool, {"question": "q"}, (["q"], [])),
+            ]
+            await queue.flush(timeout=5)
+            return accepted
+
+        self.assertEqual(asyncio.run(_run()), [True, False])
+        self.assertEqual(queue.stats()["dropped"], 1)
+        tool.save_query_memory.assert_awaited_once_with(query="q", sql_query="SELECT 1",
+                                                        success=True)
+
+    def test_flush_writes_every_graph_then_rejects_new_turns(self):
+        """Shutdown drains all queued graphs; later submissions are dropped"""
+        queue = MemoryWriteQueue(workers=2, max_pending=10)
+        tools = [_tool(graph_id=g) for g in ("a", "b", "c")]
+
+        async def _run():
+            for tool in tools:
+                queue.submit_conversation(tool, {"question": tool.graph_id}, ([], []))
+            await queue.flush(timeout=5)
+            return queue.submit_conversation(tools[0], {"question": "late"}, ([], []))
+
+        self.assertFalse(asyncio.run(_run()))
+        for tool in tools:
+            tool.add_new_memory.assert_awaited_once()
+        self.assertEqual(queue.stats()["pending"], 0)
+
+
+    def test_submitting_starts_no_task_per_turn(self):
+        """Only the worker tasks run; a submission just wakes them"""
+        queue = MemoryWriteQueue(workers=2, max_pending=10)
+        tool = _tool()
+
+        async def _run():
+            before = len(asyncio.all_tasks())
+            for i in range(5):
+                queue.submit_query(tool, query=f"q{i}", sql_query="SELECT 1", success=True)
+            started = len(asyncio.all_tasks()) - before
+            await queue.flush(timeout=5)
+            return started
+
+        self.assertEqual(asyncio.run(_run()), 2)
+        self.assertEqual(tool.save_query_memory.await_count, 5)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+"""Tests for the per-(user, graph) memory tool registry."""
+
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from api.memory.registry import MemoryToolRegistry
+
+
+def _fake_create():
+    async def _create(user_id, graph_id):
+        await asyncio.sleep(0)
+        return MagicMock(user_id=user_id, graph_id=graph_id, entities_ready=True)
+
+    return AsyncMock(side_effect=_create)
+
+
+class TestMemoryToolRegistry(unittest.TestCase):
+    """Test cases for MemoryToolRegistry"""
+
+    def test_tool_is_built_once_per_user_and_graph(self):
+        """Repeated and concurrent questions share one initialized tool"""
+        registry = MemoryToolRegistry(idle_seconds=60, max_instances=10)
+
+        async def _run():
+            first = await asyncio.gather(*(registry.get("u1", "shop") for _ in range(5)))
+            other = await registry.get("u1", "crm")
+            return first, other
+
+        with patch("api.memory.registry.MemoryTool.create", _fake_create()) as create:
+            tools, other = asyncio.run(_run())
+
+        self.assertEqual(create.await_count, 2)
+        self.assertTrue(all(tool is tools[0] for tool in tools))
+        self.assertIsNot(other, tools[0])
+        self.assertEqual(registry.stats(), {"instances": 2, "hits": 4, "creations": 2,
+                                            "evictions": 0})
+
+    def test_idle_and_excess_tools_are_evicted(self):
+        """Tools unused past the idle time, or beyond the cap, are rebuilt on next use"""
+        registry = MemoryToolRegistry(idle_seconds=60, max_instances=2)
+
+        with patch("api.memory.registry.MemoryTool.create", _fake_create()) as create, \
+                patch("api.memory.registry.time.monotonic") as clock:
+            clock.return_value = 0
+            for graph in ("a", "b", "c"):
+                asyncio.run(registry.get("u1", graph))
+            self.assertEqual(registry.stats()["instances"], 2)
+
+            clock.return_value = 1000
+            asyncio.run(registry.get("u1", "c"))
+
+        self.assertEqual(create.await_count, 4)
+        self.assertEqual(registry.stats()["instances"], 1)
+
+    def test_failed_setup_is_retried(self):
+        """A tool whose entity setup failed is set up again on the next question"""
+        registry = MemoryToolRegistry(idle_seconds=60, max_instances=10)
+        tool = MagicMock(entities_ready=False, ensure_setup=AsyncMock())
+
+        with patch("api.memory.registry.MemoryTool.create", AsyncMock(return_value=tool)):
+            asyncio.run(registry.get("u1", "shop"))
+            asyncio.run(registry.get("u1", "shop"))
+
+        tool.ensure_setup.assert_awaited_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""Tests for counter-triggered, batched memory cleanup."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from api.memory.sweeper import MemorySweeper
+
+
+class TestCleanMemory:
+    """Test cases for MemoryTool.clean_memory"""
+
+    def test_excess_is_deleted_in_batches_oldest_first(self, memory_tool):
+        """Untimestamped nodes go first, by label, then the oldest timestamped ones"""
+        driver = MagicMock()
+        driver.execute_query = AsyncMock(side_effect=[
+            ([{"nodes": 1010}], ["nodes"], None),  # node count
+            ([{"deleted": 3}], ["deleted"], None),  # untimestamped Episodic batch (partial)
+            ([{"deleted": 0}], ["deleted"], None),  # no Episodic left without a timestamp
+            ([{"deleted": 0}], ["deleted"], None),  # no such Community
+            ([{"deleted": 0}], ["deleted"], None),  # no such Entity
+            # First batch: the oldest 5 of each timestamped label
+            ([{"ts": 10, "id": 1}, {"ts": 30, "id": 3}, {"ts": 50, "id": 5},
+              {"ts": 60, "id": 6}, {"ts": 70, "id": 7}], ["ts", "id"], None),
+            ([{"ts": 20, "id": 2}, {"ts": 40, "id": 4}], ["ts", "id"], None),
+            ([{"deleted": 5}], ["deleted"], None),
+            # Second batch, from the last deleted timestamp on
+            ([{"ts": 60, "id": 6}, {"ts": 70, "id": 7}], ["ts", "id"], None),
+            ([], ["ts", "id"], None),
+            ([{"deleted": 2}], ["deleted"], None),
+        ])
+
+        deleted = asyncio.run(memory_tool(driver).clean_memory(size=1000, batch_size=5))
+
+        assert deleted == 10
+        calls = driver.execute_query.await_args_list
+        assert [c.args[0].split(")")[0] for c in calls[1:5]] == (
+            ["MATCH (n:Episodic"] * 2 + ["MATCH (n:Community", "MATCH (n:Entity"]
+        )
+        assert all("IS NULL" in c.args[0] for c in calls[1:5])
+        assert calls[7].kwargs["ids"] == [1, 2, 3, 4, 5]
+        assert calls[10].kwargs["ids"] == [6, 7]
+        assert [c.kwargs["since"] for c in (calls[5], calls[8])] == [0, 50]
+        assert calls[8].kwargs["limit"] == 2
+        # Every scan is bounded by a label, and the user's own entity node
+        # is pinned by its real name
+        assert all(c.args[0].startswith("MATCH (n:") for c in calls[1:7])
+        assert all(c.kwargs["user_name"] == "u1" for c in calls[1:7])
+
+    def test_nothing_is_deleted_under_the_limit(self, memory_tool):
+        """Only the node count runs when the graph is small enough"""
+        driver = MagicMock()
+        driver.execute_query = AsyncMock(return_value=([{"nodes": 10}], ["nodes"], None))
+
+        assert asyncio.run(memory_tool(driver).clean_memory(size=1000)) == 0
+        driver.execute_query.assert_awaited_once()
+
+
+class TestMemorySweeper:
+    """Test cases for MemorySweeper"""
+
+    def test_sweeps_run_on_first_save_then_every_n(self, memory_tool):
+        """A graph is swept on its first save and then once per check_every saves"""
+        sweeper = MemorySweeper(check_every=3)
+        tool = memory_tool()
+        tool.clean_memory = AsyncMock(return_value=7)
+
+        async def _run():
+            started = []
+            for _ in range(7):
+                task = sweeper.record_save(tool)
+                started.append(task is not None)
+                if task:
+                    await task
+            return started
+
+        assert asyncio.run(_run()) == [True, False, False, True, False, False, True]
+        assert sweeper.stats() == {"running": 0, "sweeps": 3, "deleted": 21}
+
+    def test_one_sweep_per_graph_at_a_time(self, memory_tool):
+        """Saves while a sweep runs don't start another one"""
+        sweeper = MemorySweeper(check_every=1)
+        tool = memory_tool()
+        release = asyncio.Event()
+
+        async def _slow_clean():
+            await release.wait()
+            return 0
+
+        tool.clean_memory = _slow_clean
+
+        async def _run():
+            first = sweeper.record_save(tool)
+            second = sweeper.record_save(tool)
+            release.set()
+            await first
+            return second
+
+        assert asyncio.run(_run()) is None
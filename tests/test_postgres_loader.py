@@ -6,6 +6,7 @@ This script provides basic tests for the PostgreSQL loader functionality.
 """
 
 import asyncio
+import threading
 import unittest
 from unittest.mock import Mock, patch
 
@@ -74,6 +75,28 @@ class TestPostgreSQLLoader(unittest.TestCase):
         self.assertFalse(success)
         self.assertIn("Error loading PostgreSQL schema", message)
 
+    @patch("api.loaders.postgres_loader.load_to_graph")
+    @patch("api.loaders.postgres_loader.psycopg2.connect")
+    def test_extraction_runs_off_event_loop(self, mock_connect, mock_load_to_graph):
+        """Test that catalog extraction runs on the schema loader executor"""
+        mock_connect.return_value = Mock()
+        mock_load_to_graph.return_value = None
+        threads = []
+
+        def _record_thread(*_args):
+            threads.append(threading.current_thread().name)
+            return {}
+
+        with patch.object(PostgresLoader, "extract_tables_info", side_effect=_record_thread), \
+                patch.object(PostgresLoader, "extract_relationships", side_effect=_record_thread):
+            success, _ = asyncio.run(
+                _consume_loader(PostgresLoader.load(self.test_graph_id, self.test_connection_url))
+            )
+
+        self.assertTrue(success)
+        self.assertEqual(len(threads), 2)
+        self.assertTrue(all(name.startswith("schema-loader") for name in threads))
+
     def test_extract_columns_info(self):
         """Test column information extraction"""
         # Mock cursor with column data
@@ -0,0 +1,191 @@
+"""Tests for Query memory nodes and memory search."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from api.memory import graphiti_tool
+from api.memory.graphiti_tool import query_memory_hash
+
+
+class TestQueryMemory:
+    """Test cases for saving and retrieving Query memory nodes"""
+
+    def test_hash_ignores_case_and_whitespace_differences(self):
+        """Equivalent questions and SQL share a key; other databases don't"""
+        key = query_memory_hash("shop", "How many  orders?", "SELECT count(*)\n FROM orders;")
+
+        assert key == query_memory_hash("shop", " how many orders? ",
+                                        "SELECT count(*) FROM orders")
+        assert key != query_memory_hash("crm", "How many orders?",
+                                        "SELECT count(*) FROM orders")
+
+    def test_known_query_is_not_embedded_or_written(self, memory_tool):
+        """A save of an existing question is a single index lookup"""
+        driver = MagicMock()
+        driver.execute_query = AsyncMock(return_value=([{"uuid": "q1"}], ["uuid"], None))
+
+        with patch("api.memory.graphiti_tool.Config.EMBEDDING_MODEL") as model:
+            assert asyncio.run(
+                memory_tool(driver).save_query_memory("How many orders?", "SELECT 1", True)
+            )
+
+        driver.execute_query.assert_awaited_once()
+        model.embed.assert_not_called()
+
+    def test_new_query_is_merged_with_parameters(self, memory_tool):
+        """Question text is passed as parameters, never spliced into the Cypher"""
+        driver = MagicMock()
+        driver.execute_query = AsyncMock(side_effect=[
+            ([], [], None),
+            ([{"query_uuid": "q1"}], ["query_uuid"], None),
+        ])
+        question = 'Who said "it\'s late"?'
+
+        with patch("api.memory.graphiti_tool.Config.EMBEDDING_MODEL") as model:
+            model.embed.return_value = [[0.1, 0.2]]
+            assert asyncio.run(
+                memory_tool(driver).save_query_memory(question, "SELECT 1", False, "boom")
+            )
+
+        merge = driver.execute_query.await_args_list[1]
+        assert question not in merge.args[0]
+        assert "MERGE (q:Query {hash: $hash})" in merge.args[0]
+        assert "[r:FAILED]" in merge.args[0]
+        assert merge.kwargs["user_query"] == question
+        assert merge.kwargs["database_uuid"] == "db-uuid"
+        assert merge.kwargs["hash"] == query_memory_hash("shop", question, "SELECT 1")
+
+    def test_old_query_nodes_get_their_hash_and_duplicates_go(self, memory_tool):
+        """Nodes saved without a hash are keyed like new saves; repeats are deleted"""
+        kept = query_memory_hash("crm", "How many orders?", "SELECT 1")
+        driver = MagicMock()
+        driver.execute_query = AsyncMock(side_effect=[
+            ([{"id": 1, "database": "Database crm", "user_query": "How many orders?",
+               "sql_query": "SELECT 1"},
+              {"id": 2, "database": "Database crm", "user_query": "how many  orders?",
+               "sql_query": "SELECT 1;"},
+              {"id": 3, "database": "Database shop", "user_query": "Top customers",
+               "sql_query": "SELECT 2"}], ["id", "database", "user_query", "sql_query"], None),
+            # Node 3 repeats a query that was already saved with a hash
+            ([{"hash": query_memory_hash("shop", "Top customers", "SELECT 2")}], ["hash"], None),
+            ([], [], None),  # SET
+            ([], [], None),  # DETACH DELETE
+            ([], ["id", "database", "user_query", "sql_query"], None),
+        ])
+
+        done = asyncio.run(memory_tool(driver)._backfill_query_hashes())  # pylint: disable=protected-access
+
+        assert done == 3
+        calls = driver.execute_query.await_args_list
+        assert "q.hash IS NULL" in calls[0].args[0]
+        assert calls[2].kwargs["nodes"] == [{"id": 1, "hash": kept}]
+        assert sorted(calls[3].kwargs["ids"]) == [2, 3]
+
+    def test_similar_queries_use_the_cached_database_uuid(self, memory_tool):
+        """Retrieval is one vector query, without searching for the database node"""
+        driver = MagicMock()
+        driver.execute_query = AsyncMock(return_value=(
+            [{"query": {"user_query": "q", "sql_query": "SELECT 1"}}], ["query"], None
+        ))
+        tool = memory_tool(driver)
+
+        with patch("api.memory.graphiti_tool.Config.EMBEDDING_MODEL") as model:
+            model.embed.return_value = [[0.1, 0.2]]
+            similar = asyncio.run(tool.retrieve_similar_queries("q"))
+
+        assert similar == [{"user_query": "q", "sql_query": "SELECT 1"}]
+        driver.execute_query.assert_awaited_once()
+        assert driver.execute_query.await_args.kwargs["database_node_uuid"] == "db-uuid"
+        tool.graphiti_client.search_.assert_not_called()
+
+
+class TestMemorySearchBudget:
+    """Test cases for time-budgeted search_memories"""
+
+    @pytest.fixture
+    def search_tool(self, memory_tool):
+        """A tool whose database facts arrive after facts_delay seconds"""
+        def _make(facts_delay):
+            tool = memory_tool(MagicMock())
+
+            async def _facts(**_kwargs):
+                await asyncio.sleep(facts_delay)
+                return "Facts:\norders has 10 rows"
+
+            tool.search_user_summary = AsyncMock(return_value="Prefers EUR")
+            tool.search_database_facts = AsyncMock(side_effect=_facts)
+            tool.retrieve_similar_queries = AsyncMock(return_value=[])
+            return tool
+
+        return _make
+
+    def test_slow_sources_are_dropped_at_the_budget(self, search_tool):
+        """Sources finishing within the budget are used, later ones are left out"""
+        tool = search_tool(facts_delay=5)
+        stats = dict.fromkeys(graphiti_tool.memory_search_stats, 0)
+
+        with patch.dict(graphiti_tool.memory_search_stats, stats):
+            context = asyncio.run(tool.search_memories("q", budget=0.05))
+            dropped = graphiti_tool.memory_search_stats["dropped_database_facts"]
+
+        assert "Prefers EUR" in context
+        assert "orders has 10 rows" not in context
+        assert dropped == 1
+
+    def test_tight_budget_skips_reranking(self, search_tool):
+        """Below the rerank threshold, database facts are fused without reranking"""
+        tool = search_tool(facts_delay=0)
+
+        with patch.object(graphiti_tool.Config, "MEMORY_SEARCH_RERANK_MIN_SECONDS", 1.0):
+            context = asyncio.run(tool.search_memories("q", budget=0.5))
+            asyncio.run(tool.search_memories("q", budget=2))
+
+        assert "orders has 10 rows" in context
+        assert [c.kwargs["rerank"] for c in tool.search_database_facts.await_args_list] == [
+            False, True,
+        ]
+
+
+class TestEpisodeContents:
+    """Test cases for batched episode retrieval"""
+
+    def test_episodes_of_all_facts_are_fetched_in_one_query(self, memory_tool):
+        """Every fact's episodes come from a single query, in fact order"""
+        driver = MagicMock()
+        driver.execute_query = AsyncMock(return_value=(
+            [{"uuid": "e2", "content": "second"}, {"uuid": "e1", "content": "first"}],
+            ["uuid", "content"], None,
+        ))
+        edges = [
+            MagicMock(source_node_uuid="db-uuid", target_node_uuid="x", episodes=["e1"],
+                      fact="f1", valid_at=None, invalid_at=None),
+            MagicMock(source_node_uuid="y", target_node_uuid="db-uuid", episodes=["e1", "e2"],
+                      fact="f2", valid_at=None, invalid_at=None),
+        ]
+        tool = memory_tool(driver)
+
+        with patch("api.memory.graphiti_tool.graphiti_search",
+                   AsyncMock(return_value=MagicMock(edges=edges))), \
+                patch("api.memory.graphiti_tool.embed_question", AsyncMock(return_value=[0.1])):
+            context = asyncio.run(tool.search_database_facts("q"))
+
+        driver.execute_query.assert_awaited_once()
+        assert driver.execute_query.await_args.kwargs["uuids"] == ["e1", "e2"]
+        assert context == "Previous sessions:\nfirst\nsecond\n\nFacts:\nf1\nf2"
+
+    def test_cached_episodes_are_not_fetched_again(self, memory_tool):
+        """Only episodes missing from the LRU are queried"""
+        driver = MagicMock()
+        driver.execute_query = AsyncMock(side_effect=[
+            ([{"uuid": "e1", "content": "first"}], ["uuid", "content"], None),
+            ([{"uuid": "e2", "content": "second"}], ["uuid", "content"], None),
+        ])
+        tool = memory_tool(driver)
+
+        asyncio.run(tool.fetch_episode_contents(["e1"]))
+        contents = asyncio.run(tool.fetch_episode_contents(["e1", "e2"]))
+
+        assert contents == ["first", "second"]
+        assert driver.execute_query.await_args.kwargs["uuids"] == ["e2"]
@@ -0,0 +1,203 @@
+"""Tests for chunked streaming of SQL query results."""
+
+import asyncio
+import json
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from api.config import Config
+from api.loaders.base_loader import _target_semaphore
+from api.loaders.connection_pool import PoolTimeoutError
+from api.core.query_execution import MESSAGE_DELIMITER, stream_query_results
+from api.loaders.execution_policy import ExecutionPolicy
+from api.loaders.postgres_loader import PostgresLoader
+from api.loaders.result_cache import ResultCache
+
+
+def _fake_stream(total_rows):
+    """Stand-in for execute_sql_query_stream producing total_rows rows."""
+
+    def _stream(_sql_query, _db_url, chunk_size, _policy=None, _cancel_handle=None):
+        for start in range(0, total_rows, chunk_size):
+            yield [{"id": i} for i in range(start, min(start + chunk_size, total_rows))]
+
+    return _stream
+
+
+def _collect(total_rows, policy=None, sql_query="SELECT id FROM t", result_format="rows"):
+    async def _run():
+        result = {}
+        frames = [
+            json.loads(frame[: -len(MESSAGE_DELIMITER)])
+            async for frame in stream_query_results(
+                PostgresLoader, sql_query, "postgresql://u@db/shop", result, policy,
+                result_format=result_format,
+            )
+        ]
+        return frames, result
+
+    with patch.object(
+        PostgresLoader, "execute_sql_query_stream", side_effect=_fake_stream(total_rows)
+    ) as mock_stream:
+        frames, result = asyncio.run(_run())
+    result["executed_sql"] = mock_stream.call_args.args[0] if mock_stream.called else None
+    return frames, result
+
+
+class TestQueryResultStreaming:
+    """Test cases for query_result_chunk frames."""
+
+    @patch.object(Config, "SQL_RESULT_CHUNK_ROWS", 10)
+    @patch.object(Config, "SQL_RESULT_MAX_ROWS", 25)
+    @patch.object(Config, "SQL_RESULT_PREVIEW_ROWS", 5)
+    def test_large_result_is_chunked_and_truncated(self):
+        """Rows arrive in chunks, stop at the cap and only a preview is kept."""
+        frames, result = _collect(100)
+
+        chunks = [f for f in frames if f["type"] == "query_result_chunk"]
+        assert [len(f["data"]) for f in chunks] == [10, 10, 5]
+        assert frames[-1] == {
+            "type": "query_result_end", "row_count": 25, "truncated": True,
+            "max_rows": 25, "cached": False, "final_response": False,
+        }
+        assert result["preview"] == [{"id": i} for i in range(5)]
+
+    @patch.object(Config, "SQL_RESULT_CHUNK_ROWS", 10)
+    @patch.object(Config, "SQL_RESULT_MAX_ROWS", 20)
+    def test_result_ending_at_cap_is_not_truncated(self):
+        """A result exactly as large as the cap is complete, not truncated."""
+        frames, result = _collect(20)
+
+        assert result["row_count"] == 20
+        assert frames[-1]["truncated"] is False
+
+    def test_empty_result_sends_no_frames(self):
+        """A query returning no rows produces no result frames."""
+        frames, result = _collect(0)
+
+        assert not frames
+        assert result["row_count"] == 0
+
+    @patch.object(Config, "SQL_RESULT_CHUNK_ROWS", 10)
+    def test_policy_limit_is_reported_and_marks_truncation(self):
+        """The injected LIMIT is announced up front and a full page counts as truncated."""
+        frames, result = _collect(15, ExecutionPolicy(row_limit=15, statement_timeout_ms=5000))
+
+        assert frames[0]["type"] == "query_policy"
+        assert frames[0]["limit_action"] == "injected"
+        assert frames[0]["statement_timeout_ms"] == 5000
+        assert result["executed_sql"] == "SELECT id FROM t\nLIMIT 15"
+        assert frames[-1]["truncated"] is True
+        assert frames[-1]["max_rows"] == 15
+
+    def test_repeated_query_is_served_from_cache_until_a_write(self):
+        """A repeated read is replayed from the cache; a write invalidates it."""
+        policy = ExecutionPolicy(row_limit=0, result_cache=True)
+        cache = ResultCache(ttl=60, max_bytes=1 << 20, max_entry_bytes=1 << 20)
+
+        with patch("api.core.query_execution.result_cache", cache):
+            _, first = _collect(3, policy)
+            frames, second = _collect(3, policy)
+            _collect(0, policy, sql_query="DELETE FROM t")
+            _, third = _collect(3, policy)
+
+        assert first["executed_sql"] == "SELECT id FROM t"
+        assert second["executed_sql"] is None
+        assert frames[-1]["cached"] is True and second["row_count"] == 3
+        assert third["executed_sql"] == "SELECT id FROM t"
+
+    @patch.object(Config, "SQL_RESULT_CHUNK_ROWS", 2)
+    def test_columnar_format_sends_header_once(self):
+        """Columnar chunks carry rows as lists; only the first has columns and types."""
+        frames, result = _collect(3, result_format="columnar")
+
+        first, second = frames[0], frames[1]
+        assert first["columns"] == ["id"] and first["types"] == ["integer"]
+        assert first["rows"] == [[0], [1]] and "data" not in first
+        assert second["rows"] == [[2]] and "columns" not in second
+        assert result["preview"] == [{"id": 0}, {"id": 1}, {"id": 2}]
+
+
+
+class TestQueryExecution:
+    """Test cases for concurrency control and cancellation in stream_sql_query."""
+
+    @patch.object(Config, "SQL_MAX_CONCURRENT_PER_TARGET", 1)
+    @patch.object(Config, "DB_POOL_CHECKOUT_TIMEOUT", 0.05)
+    def test_busy_target_times_out_without_a_worker(self):
+        """A query beyond the per-target limit gives up after the checkout timeout."""
+
+        async def _run():
+            running = PostgresLoader.stream_sql_query("SELECT 1", "postgresql://u@db/busy")
+            await running.__anext__()
+            try:
+                with pytest.raises(PoolTimeoutError):
+                    await PostgresLoader.stream_sql_query(
+                        "SELECT 1", "postgresql://u@db/busy"
+                    ).__anext__()
+            finally:
+                await running.aclose()
+
+        with patch.object(PostgresLoader, "execute_sql_query_stream", side_effect=_fake_stream(5)):
+            asyncio.run(_run())
+
+    def test_abandoned_query_is_cancelled_on_the_server(self):
+        """Cancelling the consumer mid-fetch interrupts the running statement."""
+        interrupted, closed = threading.Event(), threading.Event()
+
+        def _slow_stream(_sql_query, _db_url, _chunk_size, _policy=None, cancel_handle=None):
+            cancel_handle.attach(interrupted.set)
+            try:
+                interrupted.wait(5)
+                yield [{"id": 1}]
+            finally:
+                closed.set()
+
+        async def _run():
+            task = asyncio.create_task(
+                PostgresLoader.stream_sql_query("SELECT pg_sleep(60)", "").__anext__()
+            )
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        with patch.object(PostgresLoader, "execute_sql_query_stream", side_effect=_slow_stream):
+            asyncio.run(_run())
+
+        assert interrupted.wait(1) and closed.wait(1)
+
+    @patch.object(Config, "SQL_MAX_CONCURRENT_PER_TARGET", 1)
+    @patch.object(Config, "DB_POOL_CHECKOUT_TIMEOUT", 0.05)
+    def test_abandoned_query_holds_its_slot_until_the_fetch_returns(self):
+        """The next query waits while the cancelled statement is still running."""
+        release = threading.Event()
+
+        def _stuck_stream(_sql_query, _db_url, _chunk_size, _policy=None, _cancel_handle=None):
+            release.wait(5)
+            yield [{"id": 1}]
+
+        async def _run():
+            db_url = "postgresql://u@db/stuck"
+            task = asyncio.create_task(
+                PostgresLoader.stream_sql_query("SELECT 1", db_url).__anext__()
+            )
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            with pytest.raises(PoolTimeoutError):
+                await PostgresLoader.stream_sql_query("SELECT 1", db_url).__anext__()
+
+            release.set()
+            for _ in range(100):
+                if not _target_semaphore(db_url).locked():
+                    break
+                await asyncio.sleep(0.01)
+            rows, _ = await PostgresLoader.stream_sql_query("SELECT 1", db_url).__anext__()
+            return rows
+
+        with patch.object(PostgresLoader, "execute_sql_query_stream", side_effect=_stuck_stream):
+            assert asyncio.run(_run()) == [{"id": 1}]
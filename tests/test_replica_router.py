@@ -0,0 +1,59 @@
+"""Tests for read-replica routing."""
+
+import asyncio
+from unittest.mock import MagicMock, patch
+
+from api.config import Config
+from api.loaders.replica_router import ReplicaRouter
+
+PRIMARY = "postgresql://u:p@primary/shop"
+REPLICAS = ["postgresql://u:p@replica-a/shop", "postgresql://u:p@replica-b/shop"]
+
+
+def _loader(in_use=None, down=()):
+    """A loader whose pools report in_use connections and fail to connect to down URLs."""
+    in_use = in_use or {}
+    loader = MagicMock()
+
+    def _pool(url):
+        pool = MagicMock()
+        pool.stats.return_value = {"in_use": in_use.get(url, 0)}
+        if url in down:
+            pool.connection.side_effect = ConnectionError("connection refused")
+        return pool
+
+    loader.connection_pool.side_effect = _pool
+    return loader
+
+
+class TestReplicaRouter:
+    """Test cases for ReplicaRouter"""
+
+    def test_least_busy_replica_is_chosen(self):
+        """Reads go to the replica with the fewest connections in use."""
+        loader = _loader(in_use={REPLICAS[0]: 3, REPLICAS[1]: 1})
+
+        chosen = asyncio.run(ReplicaRouter().choose(loader, PRIMARY, REPLICAS))
+
+        assert chosen == REPLICAS[1]
+
+    def test_idle_replicas_take_turns(self):
+        """Equally busy replicas are used round-robin."""
+        router, loader = ReplicaRouter(), _loader()
+
+        chosen = [asyncio.run(router.choose(loader, PRIMARY, REPLICAS)) for _ in range(4)]
+
+        assert chosen == REPLICAS * 2
+
+    @patch.object(Config, "DB_REPLICA_HEALTHCHECK_INTERVAL", 60)
+    def test_unhealthy_replicas_fall_back_to_primary(self):
+        """With every replica down, reads use the primary and the failure is remembered."""
+        router, loader = ReplicaRouter(), _loader(down=REPLICAS)
+
+        assert asyncio.run(router.choose(loader, PRIMARY, REPLICAS)) == PRIMARY
+        assert [r["healthy"] for r in router.status(REPLICAS)] == [False, False]
+        assert all("u:p@" not in r["url"] for r in router.status(REPLICAS))
+
+    def test_no_replicas_uses_primary(self):
+        """Graphs without replicas always use the primary."""
+        assert asyncio.run(ReplicaRouter().choose(_loader(), PRIMARY, [])) == PRIMARY
@@ -0,0 +1,61 @@
+"""Tests for the per-request context shared by the text-to-SQL stages."""
+
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from api.core.request_context import RequestContext, embed_question, set_request_context
+
+
+class TestRequestContext(unittest.TestCase):
+    """Test cases for RequestContext"""
+
+    @patch("api.core.request_context.Config.EMBEDDING_MODEL")
+    def test_question_is_embedded_once_per_request(self, model):
+        """Stages and the tasks they start share one embedding of the question"""
+        model.embed.side_effect = lambda text: [[float(len(text))]]
+
+        async def _run():
+            context = RequestContext(user_id="u1", graph_id="u1_shop", question="How many?")
+            set_request_context(context)
+            context.prefetch_question_embedding()
+            shared = await asyncio.gather(
+                embed_question("How many?"),
+                asyncio.create_task(embed_question("How many?")),
+            )
+            other = await embed_question("Something else")
+            return shared, other, context.cached_question_embedding()
+
+        shared, other, cached = asyncio.run(_run())
+
+        self.assertEqual(shared, [[9.0], [9.0]])
+        self.assertEqual(cached, [9.0])
+        self.assertEqual(other, [14.0])
+        self.assertEqual([c.args for c in model.embed.call_args_list],
+                         [("How many?",), ("Something else",)])
+
+    @patch("api.core.request_context.Config.EMBEDDING_MODEL")
+    def test_cancelled_stage_does_not_cancel_the_shared_embedding(self, model):
+        """A stage giving up leaves the embedding available to later stages"""
+        model.embed.return_value = [[1.0]]
+
+        async def _run():
+            context = RequestContext(user_id="u1", graph_id="u1_shop", question="q")
+            set_request_context(context)
+            waiter = asyncio.create_task(embed_question("q"))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            return await embed_question("q")
+
+        self.assertEqual(asyncio.run(_run()), [1.0])
+        model.embed.assert_called_once()
+
+    def test_nothing_is_cached_before_the_embedding_is_computed(self):
+        """cached_question_embedding never blocks or triggers the computation"""
+        context = RequestContext(user_id="u1", graph_id="u1_shop", question="q")
+
+        self.assertIsNone(context.cached_question_embedding())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""Tests for column-wise conversion of query results."""
+
+import datetime
+import decimal
+import time
+import unittest
+
+import pytest
+
+from api.loaders.mysql_loader import MySQLLoader
+from api.loaders.postgres_loader import PostgresLoader
+from api.loaders.result_conversion import (
+    column_converters, convert_dict_rows, convert_rows, serialize_value
+)
+
+
+class TestColumnConverters(unittest.TestCase):
+    """Test cases for converter selection and application"""
+
+    def test_postgres_types_are_converted_per_column(self):
+        """Each column gets the converter of its type OID; plain types pass through"""
+        # int4, text, numeric, timestamp, bytea
+        converters = column_converters([23, 25, 1700, 1114, 17], PostgresLoader.COLUMN_CONVERTERS)
+        at = datetime.datetime(2024, 1, 2, 3, 4)
+        rows = [
+            (1, "a", decimal.Decimal("2.50"), at, memoryview(b"\x01")),
+            (2, None, None, None, None),
+        ]
+
+        self.assertEqual(converters[:2], [None, None])
+        self.assertEqual(
+            convert_rows(["id", "name", "total", "at", "raw"], rows, converters),
+            [
+                {"id": 1, "name": "a", "total": 2.5, "at": "2024-01-02T03:04:00", "raw": "AQ=="},
+                {"id": 2, "name": None, "total": None, "at": None, "raw": None},
+            ],
+        )
+
+    def test_unknown_types_fall_back_to_per_value_check(self):
+        """A type code without a converter is serialized value by value"""
+        converters = column_converters([1231], PostgresLoader.COLUMN_CONVERTERS)
+
+        self.assertIs(converters[0], serialize_value)
+        self.assertEqual(convert_rows(["v"], [(decimal.Decimal("1.5"),)], converters), [{"v": 1.5}])
+
+    def test_mysql_dict_rows_are_converted_in_place(self):
+        """Dict rows keep their keys; TIME and binary strings become text"""
+        # LONG, TIME, VAR_STRING
+        converters = column_converters([3, 11, 253], MySQLLoader.COLUMN_CONVERTERS)
+        rows = [{"id": 1, "t": datetime.timedelta(hours=12), "s": b"\xff"},
+                {"id": 2, "t": None, "s": "text"}]
+
+        self.assertEqual(
+            convert_dict_rows(rows, converters),
+            [{"id": 1, "t": "12:00:00", "s": "/w=="}, {"id": 2, "t": None, "s": "text"}],
+        )
+
+
+@pytest.mark.slow
+class TestConversionBenchmark:  # pylint: disable=too-few-public-methods
+    """100k x 20 result set, per-cell isinstance chain vs. per-column converters."""
+
+    ROWS = 100_000
+    COLUMNS = [f"c{i}" for i in range(20)]
+    # int4, text, float8, numeric, timestamp, repeated
+    TYPES = [23, 25, 701, 1700, 1114] * 4
+    # Best of a few runs, so a scheduling hiccup doesn't decide the comparison
+    REPEATS = 3
+
+    @classmethod
+    def _best_time(cls, func):
+        timings = []
+        for _ in range(cls.REPEATS):
+            start = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - start)
+        return result, min(timings)
+
+    def test_columnwise_conversion_is_faster(self):
+        """Column-wise conversion beats the per-cell chain with identical output"""
+        sample = (1, "text", 1.5, decimal.Decimal("2.50"), datetime.datetime(2024, 1, 1, 12))
+        rows = [sample * 4 for _ in range(self.ROWS)]
+        columns = self.COLUMNS
+
+        per_cell, per_cell_time = self._best_time(lambda: [
+            {columns[i]: serialize_value(row[i]) for i in range(len(columns))} for row in rows
+        ])
+        columnwise, columnwise_time = self._best_time(lambda: convert_rows(
+            columns, rows, column_converters(self.TYPES, PostgresLoader.COLUMN_CONVERTERS)
+        ))
+
+        assert columnwise == per_cell
+        assert columnwise_time < per_cell_time
+
+
+if __name__ == "__main__":
+    unittest.main()
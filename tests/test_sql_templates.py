@@ -0,0 +1,110 @@
+"""Tests for SQL templates derived from successful query memory."""
+
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from api.memory import sql_templates
+from api.memory.sql_templates import build_template, fill_from_templates
+
+SALES_QUESTION = "Total sales for region North in 2023?"
+SALES_SQL = ("SELECT SUM(amount) FROM sales "
+             "WHERE region = 'North' AND year = 2023 AND city LIKE '%north%'")
+
+
+class TestSqlTemplates(unittest.TestCase):
+    """Test cases for building and filling templates"""
+
+    def test_values_of_a_matching_question_are_filled_in(self):
+        """Each literal gets the new value in the stored literal's form"""
+        template = build_template(SALES_QUESTION, SALES_SQL)
+
+        self.assertEqual(
+            template.fill("total sales for region  South in 2024?"),
+            "SELECT SUM(amount) FROM sales "
+            "WHERE region = 'South' AND year = 2024 AND city LIKE '%south%'",
+        )
+
+    def test_string_values_are_escaped(self):
+        """A quote in the question can't end the SQL literal"""
+        template = build_template(SALES_QUESTION, SALES_SQL)
+
+        sql = template.fill("Total sales for region O'Brien in 2024?")
+
+        self.assertIn("region = 'O''Brien'", sql)
+
+    def test_questions_differing_outside_the_values_do_not_match(self):
+        """Other wording, or a non-number for a number, yields no SQL"""
+        template = build_template(SALES_QUESTION, SALES_SQL)
+
+        self.assertIsNone(template.fill("Average sales for region South in 2024?"))
+        self.assertIsNone(template.fill("Total sales for region South in last year?"))
+
+    def test_text_values_have_the_stored_values_word_count(self):
+        """A trailing text slot doesn't absorb the rest of a longer question"""
+        template = build_template("Show orders from customer Bob",
+                                  "SELECT * FROM orders WHERE customer = 'Bob'")
+
+        self.assertIsNone(template.fill(
+            "Show orders from customer Alice placed after 2024 sorted by total"
+        ))
+        self.assertIsNone(template.fill("Show orders from customer Bob and Carol"))
+        self.assertIn("customer = 'Alice'", template.fill("Show orders from customer Alice"))
+
+        city = build_template("Stores in New York", "SELECT * FROM stores WHERE city = 'New York'")
+        self.assertIn("city = 'Los Angeles'", city.fill("Stores in Los Angeles"))
+        self.assertIsNone(city.fill("Stores in Boston"))
+
+    def test_pairs_that_cannot_be_reused_safely_yield_no_template(self):
+        """No literals from the question, derived literals and ambiguous values"""
+        self.assertIsNone(build_template("How many orders?", "SELECT count(*) FROM orders"))
+        self.assertIsNone(build_template(
+            "Orders in 2023", "SELECT * FROM orders WHERE year = 2023 AND d < '2023-12-31'"
+        ))
+        self.assertIsNone(build_template(
+            "Orders of 10 customers with 10 items", "SELECT * FROM orders LIMIT 10"
+        ))
+
+    def test_only_read_statements_are_reused(self):
+        """Candidates writing to the database are skipped"""
+        candidates = [
+            {"user_query": "Delete order 7", "sql_query": "DELETE FROM orders WHERE id = 7"},
+            {"user_query": "Show order 7", "sql_query": "SELECT * FROM orders WHERE id = 7"},
+        ]
+
+        self.assertIsNone(fill_from_templates("Delete order 8", candidates))
+        self.assertEqual(
+            fill_from_templates("Show order 8", candidates),
+            {"sql_query": "SELECT * FROM orders WHERE id = 8", "template_question": "Show order 7"},
+        )
+
+
+class TestFindTemplateSql:  # pylint: disable=too-few-public-methods
+    """Test cases for MemoryTool.find_template_sql"""
+
+    def test_similar_successful_queries_are_tried_as_templates(self, memory_tool):
+        """One vector query within the distance, counted as a hit"""
+        driver = MagicMock()
+        driver.execute_query = AsyncMock(return_value=(
+            [{"user_query": SALES_QUESTION, "sql_query": SALES_SQL}],
+            ["user_query", "sql_query"], None,
+        ))
+        tool = memory_tool(driver)
+        stats = dict.fromkeys(sql_templates.sql_template_stats, 0)
+
+        with patch.dict(sql_templates.sql_template_stats, stats), \
+                patch("api.memory.graphiti_tool.embed_question", AsyncMock(return_value=[0.1])):
+            found = asyncio.run(tool.find_template_sql("Total sales for region East in 2022?", 0.3))
+            missed = asyncio.run(tool.find_template_sql("Which products sell best?", 0.3))
+            counters = dict(sql_templates.sql_template_stats)
+
+        assert "region = 'East' AND year = 2022" in found["sql_query"]
+        assert found["template_question"] == SALES_QUESTION
+        assert missed is None
+        assert "[:SUCCESS]" in driver.execute_query.await_args.args[0]
+        assert driver.execute_query.await_args.kwargs["max_distance"] == 0.3
+        assert counters == {"lookups": 2, "hits": 1, "misses": 1}
+
+
+if __name__ == "__main__":
+    unittest.main()